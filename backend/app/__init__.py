@@ -29,6 +29,33 @@ def configure_logging(app):
     app.logger.setLevel(logging.INFO)
     app.logger.info('Emergency service startup')
 
+def start_emergency_warmer(app):
+    """Keep per-cell SOS guidance warm for the current and next hour.
+
+    Started with the other background workers by the server entrypoint,
+    so tests and CLI commands never spend model calls on warming.
+    """
+    if not Config.EMERGENCY_WARM_ENABLED:
+        return
+    from .routes.emergency_routes import emergency_service
+    from .services.emergency_warmer import EmergencyCacheWarmer
+    app.emergency_warmer = EmergencyCacheWarmer(emergency_service)
+    app.emergency_warmer.start()
+
+def start_background_workers(app):
+    """Start the server's daemon threads.
+
+    Refreshes the emergency resource snapshot, delivers queued contact
+    notifications and (when enabled) warms SOS guidance. Called by the
+    server entrypoint only, so apps built by tests and CLI commands never
+    download snapshots or poll the outbox.
+    """
+    from .services.resource_index import get_resource_index
+    from .services.notification_dispatcher import get_notification_dispatcher
+    get_resource_index().start_refresh()
+    get_notification_dispatcher().start()
+    start_emergency_warmer(app)
+
 def create_app():
     app = Flask(__name__)
     configure_logging(app)
@@ -62,13 +89,17 @@ def create_app():
          allow_credentials=True)
     
     # Configure SQLAlchemy
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///go_guardian.db'
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///go_guardian.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev')
     
     # Initialize database
     db.init_app(app)
 
+    # Reserve threads and DB connections for SOS traffic
+    from .utils.emergency_lane import emergency_lane
+    emergency_lane.init_app(app, db)
+
     
 
     # Debug route
@@ -125,6 +156,37 @@ def create_app():
     app.register_blueprint(monitoring_bp, url_prefix='/api/monitoring')
     app.register_blueprint(voice_bp, url_prefix='/api/voice')
     
+    @app.cli.command('preload-geocodes')
+    def preload_geocodes():
+        """Warm the geocode cache from route history."""
+        import asyncio
+        from .services.geocoding_service import GeocodingService
+        geocoder = GeocodingService(app.config['GOOGLE_MAPS_API_KEY'])
+        count = asyncio.run(geocoder.preload_from_route_history())
+        print(f"Preloaded {count} geocodes")
+
+    @app.cli.command('refresh-emergency-resources')
+    def refresh_emergency_resources():
+        """Download the police, hospital and safe place snapshot used by SOS."""
+        from .services.resource_index import get_resource_index
+        index = get_resource_index()
+        if index.refresh():
+            print(f"Refreshed emergency resources: {index.stats()['counts']}")
+        else:
+            print("Emergency resource refresh failed; kept the previous snapshot")
+
+    @app.cli.command('warm-emergency-cache')
+    def warm_emergency_cache():
+        """Generate SOS guidance for every populated grid cell, this hour and next."""
+        from .routes.emergency_routes import emergency_service
+        from .services.emergency_warmer import EmergencyCacheWarmer
+        warmed = EmergencyCacheWarmer(emergency_service).warm()
+        print(f"Warmed emergency guidance for {warmed} cell/hour entries")
+
+    # Queued emergency contact notifications are written through the dispatcher's own pool
+    from .services.notification_dispatcher import get_notification_dispatcher
+    get_notification_dispatcher().init_app(app, db)
+
     @app.route('/health')
     def health_check():
         return {
@@ -138,6 +200,25 @@ def create_app():
             "version": "1.0.0"
         }
 
+    @app.route('/metrics')
+    def metrics_snapshot():
+        """In-memory metrics, LLM usage by call site, scheduler queues and cache stats."""
+        from .utils.metrics import metrics
+        from .services.llm_usage import usage_summary
+        from .services.llm_scheduler import llm_scheduler
+        from .services.response_cache import get_response_cache
+        return jsonify({
+            'llm': {
+                'usage': usage_summary(),
+                'scheduler': llm_scheduler.stats()
+            },
+            'response_cache': get_response_cache().stats(),
+            'emergency_lane': emergency_lane.stats(),
+            'notifications': get_notification_dispatcher().stats(),
+            'emergency_warmer': app.emergency_warmer.stats() if hasattr(app, 'emergency_warmer') else None,
+            'metrics': metrics.snapshot()
+        })
+
     # Global error handler
     @app.errorhandler(Exception)
     def handle_error(error):
@@ -7,11 +7,151 @@ load_dotenv()
 
 class Config:
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+    GOOGLE_MAPS_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY')
     SQLALCHEMY_DATABASE_URI = 'sqlite:///go_guardian.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev')
     DEBUG = os.getenv('FLASK_DEBUG', '0') == '1'
 
+    # Safe route alternatives
+    ROUTE_ALTERNATIVES_K = int(os.getenv('ROUTE_ALTERNATIVES_K', '3'))
+    ROUTE_ALTERNATIVES_BUDGET_MS = int(os.getenv('ROUTE_ALTERNATIVES_BUDGET_MS', '250'))
+    ROUTE_ALTERNATIVES_MAX_OVERLAP = float(os.getenv('ROUTE_ALTERNATIVES_MAX_OVERLAP', '0.8'))
+    ROUTE_DETOUR_SEEDS = int(os.getenv('ROUTE_DETOUR_SEEDS', '2'))
+
+    # Route segment score cache
+    SEGMENT_SCORE_TTL_SECONDS = int(os.getenv('SEGMENT_SCORE_TTL_SECONDS', '1800'))
+    SEGMENT_SCORE_CACHE_SIZE = int(os.getenv('SEGMENT_SCORE_CACHE_SIZE', '50000'))
+
+    # Corridor scoring
+    CORRIDOR_BUFFER_METERS = float(os.getenv('CORRIDOR_BUFFER_METERS', '50'))
+
+    # Upstream HTTP thread pools
+    MAPS_POOL_SIZE = int(os.getenv('MAPS_POOL_SIZE', '8'))
+    SODA_POOL_SIZE = int(os.getenv('SODA_POOL_SIZE', '12'))
+    SODA_TIMEOUT_SECONDS = float(os.getenv('SODA_TIMEOUT_SECONDS', '10'))
+
+    # Execution lane reserved for SOS traffic (threads, DB and HTTP connections)
+    EMERGENCY_POOL_SIZE = int(os.getenv('EMERGENCY_POOL_SIZE', '8'))
+    EMERGENCY_DB_POOL_SIZE = int(os.getenv('EMERGENCY_DB_POOL_SIZE', '2'))
+    EMERGENCY_DB_POOL_TIMEOUT_SECONDS = float(os.getenv('EMERGENCY_DB_POOL_TIMEOUT_SECONDS', '5'))
+    EMERGENCY_HTTP_CONNECTIONS = int(os.getenv('EMERGENCY_HTTP_CONNECTIONS', '4'))
+
+    # Outbox dispatch of emergency contact notifications
+    NOTIFY_POOL_SIZE = int(os.getenv('NOTIFY_POOL_SIZE', '8'))
+    CACHE_POOL_SIZE = int(os.getenv('CACHE_POOL_SIZE', '4'))
+    NOTIFY_DB_POOL_SIZE = int(os.getenv('NOTIFY_DB_POOL_SIZE', '2'))
+    NOTIFY_BATCH_SIZE = int(os.getenv('NOTIFY_BATCH_SIZE', '50'))
+    NOTIFY_MAX_ATTEMPTS = int(os.getenv('NOTIFY_MAX_ATTEMPTS', '5'))
+    NOTIFY_RETRY_BASE_SECONDS = float(os.getenv('NOTIFY_RETRY_BASE_SECONDS', '2'))
+    NOTIFY_LEASE_SECONDS = float(os.getenv('NOTIFY_LEASE_SECONDS', '60'))
+    NOTIFY_POLL_SECONDS = float(os.getenv('NOTIFY_POLL_SECONDS', '5'))
+    NOTIFY_LOCAL_OUTBOX_PATH = os.getenv('NOTIFY_LOCAL_OUTBOX_PATH', 'logs/notifications.jsonl')
+
+    # Alert deduplication: repeats within the window update the open alert
+    ALERT_BURST_WINDOW_SECONDS = float(os.getenv('ALERT_BURST_WINDOW_SECONDS', '60'))
+    ALERT_IDEMPOTENCY_TTL_SECONDS = float(os.getenv('ALERT_IDEMPOTENCY_TTL_SECONDS', '86400'))
+    ALERT_BURST_WAIT_SECONDS = float(os.getenv('ALERT_BURST_WAIT_SECONDS', '10'))
+
+    # Persisted route analysis memoization
+    SAFETY_DATA_VERSION = os.getenv('SAFETY_DATA_VERSION', '1')
+    DATA_VERSION_PATH = os.getenv('DATA_VERSION_PATH', 'instance/data_version.json')
+    ROUTE_ANALYSIS_TTL_HOURS = float(os.getenv('ROUTE_ANALYSIS_TTL_HOURS', '336'))
+
+    # Geocode cache
+    GEOCODE_TTL_DAYS = float(os.getenv('GEOCODE_TTL_DAYS', '90'))
+    GEOCODE_HIT_FLUSH_EVERY = int(os.getenv('GEOCODE_HIT_FLUSH_EVERY', '100'))
+
+    # Concurrent in-flight Gemini calls per model
+    GEMINI_CONCURRENCY = {
+        'gemini-pro': int(os.getenv('GEMINI_TEXT_CONCURRENCY', '8')),
+        'gemini-pro-vision': int(os.getenv('GEMINI_VISION_CONCURRENCY', '4')),
+        'default': int(os.getenv('GEMINI_DEFAULT_CONCURRENCY', '4'))
+    }
+    LLM_POOL_SIZE = int(os.getenv('LLM_POOL_SIZE', '16'))
+    GEMINI_TIMEOUT_SECONDS = float(os.getenv('GEMINI_TIMEOUT_SECONDS', '30'))
+
+    # LLM call scheduling: shared quota, per-class concurrency, shedding
+    LLM_RATE_PER_SECOND = float(os.getenv('LLM_RATE_PER_SECOND', '1'))
+    LLM_BURST = int(os.getenv('LLM_BURST', '10'))
+    LLM_CLASS_CONCURRENCY = {
+        'emergency': int(os.getenv('LLM_EMERGENCY_CONCURRENCY', '8')),
+        'monitoring': int(os.getenv('LLM_MONITORING_CONCURRENCY', '4')),
+        'interactive': int(os.getenv('LLM_INTERACTIVE_CONCURRENCY', '6')),
+        'background': int(os.getenv('LLM_BACKGROUND_CONCURRENCY', '2'))
+    }
+    LLM_QUEUE_LIMITS = {
+        'emergency': None,
+        'monitoring': 50,
+        'interactive': 100,
+        'background': 20
+    }
+    LLM_MAX_WAIT_SECONDS = {
+        'emergency': None,
+        'monitoring': 10.0,
+        'interactive': 20.0,
+        'background': 30.0
+    }
+
+    # Per-call-site LLM deadlines and hedging
+    LLM_DEADLINES_MS = {
+        'route_analysis': float(os.getenv('LLM_DEADLINE_ROUTE_MS', '8000')),
+        'area_analysis': float(os.getenv('LLM_DEADLINE_AREA_MS', '6000')),
+        'segment_analysis': float(os.getenv('LLM_DEADLINE_SEGMENT_MS', '6000')),
+        'emergency_guidance': float(os.getenv('LLM_DEADLINE_EMERGENCY_MS', '3000')),
+        'monitoring_check': float(os.getenv('LLM_DEADLINE_MONITORING_MS', '4000')),
+        'voice_command': float(os.getenv('LLM_DEADLINE_VOICE_MS', '4000')),
+        'camera_analysis': float(os.getenv('LLM_DEADLINE_CAMERA_MS', '10000')),
+        'default': float(os.getenv('LLM_DEADLINE_DEFAULT_MS', '8000'))
+    }
+    # Response size budgets (max_output_tokens) and prompt context budget
+    LLM_OUTPUT_TOKENS = {
+        'route_analysis': int(os.getenv('LLM_OUTPUT_TOKENS_ROUTE', '512')),
+        'area_analysis': int(os.getenv('LLM_OUTPUT_TOKENS_AREA', '400')),
+        'area_batch': int(os.getenv('LLM_OUTPUT_TOKENS_AREA_BATCH', '1600')),
+        'segment_analysis': int(os.getenv('LLM_OUTPUT_TOKENS_SEGMENT', '300')),
+        'emergency_guidance': int(os.getenv('LLM_OUTPUT_TOKENS_EMERGENCY', '400')),
+        'monitoring_check': int(os.getenv('LLM_OUTPUT_TOKENS_MONITORING', '200')),
+        'voice_command': int(os.getenv('LLM_OUTPUT_TOKENS_VOICE', '256')),
+        'camera_analysis': int(os.getenv('LLM_OUTPUT_TOKENS_CAMERA', '400')),
+        'default': int(os.getenv('LLM_OUTPUT_TOKENS_DEFAULT', '1024'))
+    }
+    LLM_CONTEXT_TOKENS = int(os.getenv('LLM_CONTEXT_TOKENS', '200'))
+    LLM_HEDGING = os.getenv('LLM_HEDGING', '1') == '1'
+    LLM_HEDGE_MIN_SAMPLES = int(os.getenv('LLM_HEDGE_MIN_SAMPLES', '20'))
+
+    # Semantic-key Gemini response cache
+    RESPONSE_CACHE_PATH = os.getenv('RESPONSE_CACHE_PATH', 'instance/response_cache.db')
+    RESPONSE_CACHE_TTL_SECONDS = float(os.getenv('RESPONSE_CACHE_TTL_SECONDS', '21600'))
+    RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '20000'))
+    RESPONSE_CACHE_CELL_DEGREES = float(os.getenv('RESPONSE_CACHE_CELL_DEGREES', '0.002'))
+    RESPONSE_CACHE_HOUR_BUCKET = int(os.getenv('RESPONSE_CACHE_HOUR_BUCKET', '1'))
+
+    # Area analysis micro-batching
+    AREA_BATCH_WINDOW_MS = float(os.getenv('AREA_BATCH_WINDOW_MS', '50'))
+    AREA_BATCH_MAX_ITEMS = int(os.getenv('AREA_BATCH_MAX_ITEMS', '4'))
+
+    # Instant local area scores (model enrichment follows in the background)
+    AREA_LOCAL_RADIUS_METERS = float(os.getenv('AREA_LOCAL_RADIUS_METERS', '150'))
+    AREA_LOCAL_BUDGET_MS = float(os.getenv('AREA_LOCAL_BUDGET_MS', '300'))
+
+    # Local snapshot of police stations, hospitals and safe places for SOS
+    EMERGENCY_SNAPSHOT_PATH = os.getenv('EMERGENCY_SNAPSHOT_PATH', 'instance/emergency_resources.json')
+    EMERGENCY_SNAPSHOT_REFRESH_SECONDS = float(os.getenv('EMERGENCY_SNAPSHOT_REFRESH_SECONDS', '86400'))
+    EMERGENCY_SNAPSHOT_LIMIT = int(os.getenv('EMERGENCY_SNAPSHOT_LIMIT', '50000'))
+    EMERGENCY_SNAPSHOT_PAGE_SIZE = int(os.getenv('EMERGENCY_SNAPSHOT_PAGE_SIZE', '10000'))
+    EMERGENCY_RESOURCES_PER_KIND = int(os.getenv('EMERGENCY_RESOURCES_PER_KIND', '3'))
+
+    # SOS answers from local data within this budget; model guidance follows by poll
+    SOS_BUDGET_MS = float(os.getenv('SOS_BUDGET_MS', '100'))
+    SOS_GUIDANCE_TTL_SECONDS = float(os.getenv('SOS_GUIDANCE_TTL_SECONDS', '600'))
+
+    # Background warming of per-cell SOS guidance for the current and next hour bucket
+    # (off by default: each pass can cost up to 2 x EMERGENCY_WARM_MAX_CELLS model calls)
+    EMERGENCY_WARM_ENABLED = os.getenv('EMERGENCY_WARM_ENABLED', 'false').lower() == 'true'
+    EMERGENCY_WARM_INTERVAL_SECONDS = float(os.getenv('EMERGENCY_WARM_INTERVAL_SECONDS', '900'))
+    EMERGENCY_WARM_MAX_CELLS = int(os.getenv('EMERGENCY_WARM_MAX_CELLS', '300'))
+
     @staticmethod
     def validate():
         """Validate required configuration"""
@@ -44,6 +44,45 @@ class Route(db.Model):
             'created_at': self.created_at.isoformat()
         }
 
+class RouteAnalysis(db.Model):
+    """Memoized route analysis keyed by snapped endpoints and hour of week"""
+    id = db.Column(db.Integer, primary_key=True)
+    origin_key = db.Column(db.String(200), nullable=False)
+    destination_key = db.Column(db.String(200), nullable=False)
+    mode = db.Column(db.String(20), nullable=False, default='walking')
+    hour_bucket = db.Column(db.Integer, nullable=False)  # 0-167, Monday 00:00 = 0
+    data_version = db.Column(db.String(64), nullable=False)
+    analysis = db.Column(db.Text, nullable=False)  # JSON
+    hits = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            'origin_key', 'destination_key', 'mode', 'hour_bucket',
+            name='uq_route_analysis_key'
+        ),
+    )
+
+class GeocodeCache(db.Model):
+    """Cached forward ('fwd:<address>') and reverse ('rev:<lat>,<lng>') lookups"""
+    id = db.Column(db.Integer, primary_key=True)
+    query_key = db.Column(db.String(300), unique=True, nullable=False, index=True)
+    lat = db.Column(db.Float, nullable=False)
+    lng = db.Column(db.Float, nullable=False)
+    formatted_address = db.Column(db.String(300))
+    hits = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def to_dict(self):
+        return {
+            'lat': self.lat,
+            'lng': self.lng,
+            'formatted_address': self.formatted_address
+        }
+
 class Alert(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -54,6 +93,35 @@ class Alert(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     resolved_at = db.Column(db.DateTime)
 
+class AlertBurst(db.Model):
+    """Repeated alerts from one user collapsed into a single alert (or SOS response)"""
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(20), nullable=False)  # 'alert' or 'sos'
+    user_id = db.Column(db.String(64), nullable=False)
+    alert_id = db.Column(db.Integer, db.ForeignKey('alert.id'))
+    idempotency_keys = db.Column(db.Text)  # JSON list
+    update_count = db.Column(db.Integer, default=0)
+    last_location = db.Column(db.String(200))
+    status = db.Column(db.String(20), default='open')  # open, closed
+    first_seen_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_seen_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class NotificationOutbox(db.Model):
+    """One notification to one contact over one channel, written with the alert it belongs to"""
+    id = db.Column(db.Integer, primary_key=True)
+    idempotency_key = db.Column(db.String(200), unique=True, nullable=False)  # '<alert ref>:<contact>:<channel>'
+    alert_ref = db.Column(db.String(100), nullable=False, index=True)  # e.g. 'alert:12', 'alert_history:7'
+    channel = db.Column(db.String(20), nullable=False)
+    recipient = db.Column(db.String(120), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    payload = db.Column(db.Text)  # JSON
+    status = db.Column(db.String(20), default='pending', index=True)  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
 class EmergencyContact(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
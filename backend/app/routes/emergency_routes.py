@@ -4,10 +4,15 @@ from flask import Blueprint, request, jsonify, current_app, make_response
 from ..models import db, Alert, EmergencyContact
 from datetime import datetime
 from ..services.emergency_service import EmergencyService
-from ..services.search_service import LocationSearchService
 from ..services.sf_data_service import SFDataService
+from ..services.resource_index import get_resource_index
+from ..services.notification_dispatcher import get_notification_dispatcher
+from ..services.alert_dedupe import alert_deduper
+from ..utils.emergency_lane import emergency_lane
+from .monitoring_routes import get_monitoring_service
+import asyncio
 import os
-from flask_cors import cross_origin
+from ..config import Config
 
 emergency_bp = Blueprint('emergency', __name__)
 emergency_service = EmergencyService(api_key=os.getenv('GEMINI_API_KEY'))
@@ -20,6 +25,40 @@ def create_alert():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
+        # Retries and repeats within the burst window update the open alert
+        idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+
+        # On the emergency lane's threads and reserved DB connections
+        return jsonify(emergency_lane.run(_submit_alert, data, idempotency_key))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _submit_alert(data, idempotency_key=None):
+    burst, opener = alert_deduper.claim('alert', 1, idempotency_key, data.get('location'))  # Hardcoded user_id
+    if not opener:
+        original = burst['result'].result(timeout=Config.ALERT_BURST_WAIT_SECONDS)
+        return {
+            'status': 'success',
+            'alert_id': original['alert_id'],
+            'message': 'Emergency alert updated',
+            'duplicate': True,
+            'update_count': burst['update_count'],
+            'contacts_notified': 0,
+            'notifications_queued': 0,
+            'timestamp': datetime.now().isoformat()
+        }
+
+    try:
+        result = _create_alert(data)
+    except BaseException as e:
+        alert_deduper.abandon(burst, e)
+        raise
+    alert_deduper.opened(burst, result, result['alert_id'])
+    return result
+
+def _create_alert(data):
+    with emergency_lane.session() as session:
         # Create new alert
         new_alert = Alert(
             user_id=1,  # Hardcoded for now
@@ -28,26 +67,31 @@ def create_alert():
             description=data.get('description', ''),
             status='active'
         )
-        
-        db.session.add(new_alert)
-        db.session.commit()
-        
+        session.add(new_alert)
+        session.flush()
+
         # Get emergency contacts
-        contacts = EmergencyContact.query.filter_by(user_id=1).all()  # Hardcoded user_id
-        
-        # In a real app, you would send actual notifications here
-        # For now, we'll just return the alert details
-        return jsonify({
-            'status': 'success',
-            'alert_id': new_alert.id,
-            'message': 'Emergency alert created',
-            'contacts_notified': len(contacts),
-            'timestamp': datetime.now().isoformat()
-        })
-        
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+        contacts = session.query(EmergencyContact).filter_by(user_id=1).all()  # Hardcoded user_id
+
+        # Notifications are committed with the alert and sent by the dispatcher
+        dispatcher = get_notification_dispatcher()
+        queued = dispatcher.enqueue(session, dispatcher.notifications_for(
+            f"alert:{new_alert.id}",
+            [{'id': c.id, 'name': c.name, 'phone': c.phone, 'email': c.email} for c in contacts],
+            f"{new_alert.type.upper()} alert: {new_alert.description or 'Emergency alert triggered'} "
+            f"Location: {new_alert.location}",
+            {'alert_id': new_alert.id, 'type': new_alert.type, 'location': data['location']}
+        ))
+    dispatcher.wake()
+
+    return {
+        'status': 'success',
+        'alert_id': new_alert.id,
+        'message': 'Emergency alert created',
+        'contacts_notified': len(contacts),
+        'notifications_queued': queued,
+        'timestamp': datetime.now().isoformat()
+    }
 
 @emergency_bp.route('/alerts', methods=['GET'])
 def get_alerts():
@@ -79,6 +123,8 @@ def update_alert(alert_id):
             alert.resolved_at = datetime.now()
         
         db.session.commit()
+        if alert.status != 'active':
+            alert_deduper.close('alert', alert.id)
         
         return jsonify({
             'message': 'Alert updated successfully',
@@ -142,8 +188,48 @@ def manage_contacts():
             db.session.rollback()
             return jsonify({'error': str(e)}), 500
 
+@emergency_bp.route('/emergency-alert', methods=['POST'])
+async def emergency_alert():
+    """SOS from the app: local guidance within the SOS budget.
+
+    A `guidance_status` of 'pending' comes with a `guidance_id` to poll at
+    /emergency-guidance/<id> for the personalized guidance.
+    """
+    data = request.get_json()
+    if not data or not data.get('location'):
+        return jsonify({'error': 'Location is required'}), 400
+
+    # On the emergency lane, away from analysis traffic
+    result = await emergency_lane.run_async(
+        get_monitoring_service().handle_sos,
+        1,  # Hardcoded user_id
+        data['location'],
+        data.get('message'),
+        request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+    )
+    return jsonify(result)
+
+@emergency_bp.route('/emergency-guidance/<guidance_id>', methods=['GET'])
+async def get_emergency_guidance(guidance_id):
+    """Poll for the personalized guidance after an SOS answered from local data.
+
+    `wait` (seconds, max 20) holds the request open until the guidance
+    lands; 202 means it is still being generated.
+    """
+    try:
+        wait = min(float(request.args.get('wait', 0)), 20.0)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid wait: {str(e)}'}), 400
+
+    guidance = await emergency_service.personalized_guidance(guidance_id, wait)
+    if guidance is None:
+        return jsonify({'error': 'Unknown or expired guidance id'}), 404
+    if guidance['guidance_status'] == 'pending':
+        return jsonify(guidance), 202
+    return jsonify(guidance)
+
+# CORS comes from the app-wide /api/* config; cross_origin cannot wrap async views
 @emergency_bp.route('/emergency-resources', methods=['POST'])
-@cross_origin(origins=['http://localhost:3000'], supports_credentials=True)
 async def get_emergency_resources():
     try:
         data = request.get_json()
@@ -168,79 +254,13 @@ async def get_emergency_resources():
             
         current_app.logger.info(f"Fetching emergency resources for location: {location}")
         
-        # Get safety data from SFDataService
-        safety_data = await sf_data_service.get_area_safety_data(
-            lat=location['lat'],
-            lng=location['lng'],
-            radius_meters=1000,
-            time_window_days=30
-        )
-        
-        # Use LocationSearchService for place data
-        search_service = LocationSearchService()
-        resources = await search_service.search_nearby_places(
-            "emergency services",
-            location,
-            radius_meters=1000
-        )
-        
-        # Combine safety data with place results
-        processed_resources = {
-            'police': [],
-            'hospitals': [],
-            'safe_places': []
-        }
-        
-        for place in resources:
-            safety_score = safety_data.get('safety_score', 70)
-            base_info = {
-                'id': f"{place['name']}-{place['place_id']}",  # Add unique ID
-                'name': place['name'],
-                'address': place['formatted_address'],
-                'distance': place['distance'],
-                'safety_score': safety_score,
-                'phone': place.get('phone', ''),
-                'hours': place.get('hours', '')
-            }
-            
-            if 'police' in place['name'].lower():
-                processed_resources['police'].append({
-                    **base_info,
-                    'type': 'police',
-                    'infrastructure': {
-                        'total_lights': safety_data.get('infrastructure', {}).get('total_lights', 50),
-                        'working_lights': safety_data.get('infrastructure', {}).get('working_lights', 42)
-                    }
-                })
-            elif 'hospital' in place['name'].lower():
-                processed_resources['hospitals'].append({
-                    **base_info,
-                    'type': 'hospital',
-                    'emergency': True
-                })
-            else:
-                processed_resources['safe_places'].append({
-                    **base_info,
-                    'type': 'safe_place'
-                })
-        
-        # Add safety metrics to response
-        response_data = {
-            **processed_resources,
-            'safety_metrics': {
-                'overall_score': safety_data.get('safety_score', 85),
-                'infrastructure': {
-                    'coverage_score': safety_data.get('infrastructure', {}).get('coverage_score', 75),
-                    'working_lights': safety_data.get('infrastructure', {}).get('working_lights', 42),
-                    'total_lights': safety_data.get('infrastructure', {}).get('total_lights', 50)
-                }
-            }
-        }
+        # On the emergency lane's event loop and reserved HTTP connections
+        response_data = await emergency_lane.run_async(_emergency_resources, location)
         
         current_app.logger.info(
-            f"Found resources: Police: {len(processed_resources['police'])}, "
-            f"Hospitals: {len(processed_resources['hospitals'])}, "
-            f"Safe Places: {len(processed_resources['safe_places'])}"
+            f"Found resources: Police: {len(response_data['police'])}, "
+            f"Hospitals: {len(response_data['hospitals'])}, "
+            f"Safe Places: {len(response_data['safe_places'])}"
         )
         
         return jsonify(response_data)
@@ -253,4 +273,69 @@ async def get_emergency_resources():
             'hospitals': [],
             'safe_places': [],
             '_error': str(e)
-        }), 500
\ No newline at end of file
+        }), 500
+
+async def _emergency_resources(location):
+    """Nearest resources from the local index, scored with the area's safety data"""
+    # Get safety data from SFDataService
+    try:
+        safety_data = await asyncio.wait_for(sf_data_service.get_area_safety_data(
+            lat=location['lat'],
+            lng=location['lng'],
+            radius_meters=1000,
+            time_window_days=30,
+            session=emergency_lane.http
+        ), Config.SODA_TIMEOUT_SECONDS)
+    except Exception:
+        # Resources matter more than their scores
+        safety_data = {}
+    safety_score = safety_data.get('safety_score', 70)
+    infrastructure = safety_data.get('infrastructure', {})
+
+    nearest = get_resource_index().nearby(location)
+
+    def base_info(kind, place, name_field='name'):
+        name = place.get(name_field) or kind.replace('_', ' ').title()
+        return {
+            'id': f"{name}-{place['distance_m']}",  # Add unique ID
+            'name': name,
+            'address': place.get('address', ''),
+            'distance': place['distance'],
+            'safety_score': safety_score,
+            'phone': place.get('phone', ''),
+            'hours': place.get('hours', '')
+        }
+
+    # Combine safety data with place results
+    processed_resources = {
+        'police': [{
+            **base_info('police', place),
+            'type': 'police',
+            'infrastructure': {
+                'total_lights': infrastructure.get('total_lights', 50),
+                'working_lights': infrastructure.get('working_lights', 42)
+            }
+        } for place in nearest['police']],
+        'hospitals': [{
+            **base_info('hospital', place),
+            'type': 'hospital',
+            'emergency': True
+        } for place in nearest['hospitals']],
+        'safe_places': [{
+            **base_info('safe_place', place, 'business_name'),
+            'type': 'safe_place'
+        } for place in nearest['safe_places']]
+    }
+
+    # Add safety metrics to response
+    return {
+        **processed_resources,
+        'safety_metrics': {
+            'overall_score': safety_data.get('safety_score', 85),
+            'infrastructure': {
+                'coverage_score': infrastructure.get('coverage_score', 75),
+                'working_lights': infrastructure.get('working_lights', 42),
+                'total_lights': infrastructure.get('total_lights', 50)
+            }
+        }
+    }
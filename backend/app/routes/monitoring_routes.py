@@ -4,12 +4,19 @@ from flask import Blueprint, request, jsonify, current_app
 from ..models import db
 from ..services.monitoring_service import MonitoringService
 from ..services.motion_detector import MotionDetector
+from ..utils.emergency_lane import emergency_lane
 from datetime import datetime
 import logging
 
 monitoring_bp = Blueprint('monitoring', __name__)
 logger = logging.getLogger(__name__)
 
+def get_monitoring_service():
+    # Shared so active sessions survive across requests
+    if not hasattr(current_app, 'monitoring_service'):
+        current_app.monitoring_service = MonitoringService(current_app.config['GEMINI_API_KEY'])
+    return current_app.monitoring_service
+
 @monitoring_bp.route('/start', methods=['POST'])
 async def start_monitoring():
     try:
@@ -17,7 +24,7 @@ async def start_monitoring():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
 
-        monitoring_service = MonitoringService(current_app.config['GEMINI_API_KEY'])
+        monitoring_service = get_monitoring_service()
         result = await monitoring_service.start_monitoring(
             data['user_id'],
             data['route'],
@@ -37,7 +44,7 @@ async def update_location():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
 
-        monitoring_service = MonitoringService(current_app.config['GEMINI_API_KEY'])
+        monitoring_service = get_monitoring_service()
         result = await monitoring_service.update_location(
             data['user_id'],
             data['location']
@@ -64,11 +71,14 @@ async def analyze_motion():
         
         # If emergency detected, trigger monitoring service alert
         if result['is_emergency']:
-            monitoring_service = MonitoringService(current_app.config['GEMINI_API_KEY'])
-            alert_result = await monitoring_service.handle_sos(
+            monitoring_service = get_monitoring_service()
+            # On the emergency lane, away from analysis traffic
+            alert_result = await emergency_lane.run_async(
+                monitoring_service.handle_sos,
                 data['user_id'],
                 data['location'],
-                "Emergency detected from motion"
+                "Emergency detected from motion",
+                request.headers.get('Idempotency-Key') or data.get('idempotency_key')
             )
             result['emergency_response'] = alert_result
         
@@ -85,7 +95,7 @@ async def stop_monitoring():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
 
-        monitoring_service = MonitoringService(current_app.config['GEMINI_API_KEY'])
+        monitoring_service = get_monitoring_service()
         result = await monitoring_service.stop_monitoring(
             data['user_id']
         )
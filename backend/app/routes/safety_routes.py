@@ -1,10 +1,17 @@
 # backend/app/routes/safety_routes.py
 
-from flask import Blueprint, make_response, request, jsonify, current_app
+from flask import Blueprint, make_response, request, jsonify, current_app, Response, stream_with_context
 from ..services.gemini_service import GeminiService
+from ..services.route_service import RouteService
+from ..services.route_analysis_store import RouteAnalysisStore
+from ..services.geocoding_service import GeocodingService
+from ..services.analysis_tiers import ANALYSIS_TIERS, resolve_tier, record_tier
+from ..utils.streaming import sse_event, iter_async
 from ..models import db, Alert, Route  # Add Route import here
 from datetime import datetime
+import asyncio
 import re
+import time
 import traceback
 import logging
 from typing import Dict, Any
@@ -33,11 +40,57 @@ CORS(safety_bp, resources={
 # Add at the top of the file
 ALLOWED_ORIGINS = ['http://localhost:3000']
 
+route_analysis_store = RouteAnalysisStore()
+
 def get_gemini_service():
     if not hasattr(current_app, 'gemini_service'):
         raise RuntimeError("Gemini service not initialized")
     return current_app.gemini_service
 
+def get_route_service():
+    if not hasattr(current_app, 'route_service'):
+        current_app.route_service = RouteService(
+            current_app.config['GOOGLE_MAPS_API_KEY'],
+            current_app.config['GEMINI_API_KEY']
+        )
+    return current_app.route_service
+
+def get_geocoding_service():
+    if not hasattr(current_app, 'geocoding_service'):
+        current_app.geocoding_service = GeocodingService(current_app.config['GOOGLE_MAPS_API_KEY'])
+    return current_app.geocoding_service
+
+async def resolve_endpoints(data: Dict[str, Any], upstream: bool = True) -> Dict[str, Any]:
+    """Fill in start_coords/end_coords from the free-text locations when missing.
+
+    Coordinates already in the request are used as they are. Addresses
+    are geocoded concurrently; with upstream=False (the fast tier) only
+    cached geocodes are used, so nothing waits on the Maps API.
+    """
+    pending = []
+    for prefix in ('start', 'end'):
+        location = data.get(f'{prefix}_location')
+        if isinstance(location, dict) and 'lat' in location and 'lng' in location:
+            # The map UI sends {lat, lng, address}: nothing to geocode
+            if not data.get(f'{prefix}_coords'):
+                data[f'{prefix}_coords'] = {'lat': float(location['lat']), 'lng': float(location['lng'])}
+            data[f'{prefix}_location'] = location.get('address') or f"{location['lat']},{location['lng']}"
+            continue
+        if data.get(f'{prefix}_coords') or not location:
+            continue
+        pending.append(prefix)
+
+    if pending:
+        geocoder = get_geocoding_service()
+        resolved = await asyncio.gather(*(
+            geocoder.geocode(str(data[f'{prefix}_location']), cached_only=not upstream)
+            for prefix in pending
+        ))
+        for prefix, result in zip(pending, resolved):
+            if result:
+                data[f'{prefix}_coords'] = {'lat': result['lat'], 'lng': result['lng']}
+    return data
+
 def parse_distance(distance_str: str) -> float:
     """Parse distance string to float value."""
     logger.debug(f"Parsing distance string: {distance_str}")
@@ -65,6 +118,9 @@ def prepare_route_data(data: Dict[str, Any]) -> Dict[str, Any]:
             'time_of_day': datetime.now().strftime('%H:%M'),
             'weather': str(data.get('weather', 'Unknown'))
         }
+        for key in ('start_coords', 'end_coords'):
+            if data.get(key):
+                route_data[key] = data[key]
         logger.debug(f"Prepared route data: {route_data}")
         return route_data
     except Exception as e:
@@ -72,33 +128,61 @@ def prepare_route_data(data: Dict[str, Any]) -> Dict[str, Any]:
         raise
 
 @safety_bp.route('/analyze-route', methods=['POST'])
-def analyze_route():
+async def analyze_route():
+    started = time.monotonic()
     try:
         # Add CORS headers to all responses
         response = make_response()
         response.headers.add('Access-Control-Allow-Credentials', 'true')
         
         data = request.get_json()
+        tier = resolve_tier(data.get('tier') or request.args.get('tier'))
+        data = await resolve_endpoints(data, upstream=ANALYSIS_TIERS[tier]['llm'] is not None)
         route_data = prepare_route_data(data)
         
-        # Get Gemini service from app context
-        gemini_service = get_gemini_service()
-        analysis = gemini_service.analyze_route(route_data)
+        if ANALYSIS_TIERS[tier]['llm'] is None:
+            # Fast tier: local scores only, no model call
+            analysis = await local_route_analysis(data, ANALYSIS_TIERS[tier]['data_budget_ms'])
+            served_from = 'local'
+        else:
+            use_cache = ANALYSIS_TIERS[tier]['llm'] == 'cached'
+            origin = data.get('start_coords') or route_data['start_location']
+            destination = data.get('end_coords') or route_data['end_location']
+            mode = data.get('mode', 'walking')
+
+            # Commutes repeat, so check the persisted analyses first
+            analysis = route_analysis_store.get(origin, destination, mode) if use_cache else None
+            served_from = 'store'
+
+            if analysis is None:
+                # Get Gemini service from app context
+                gemini_service = get_gemini_service()
+                local = None
+                if data.get('start_coords') and data.get('end_coords'):
+                    # Local scores ground the prompt and back up a missed deadline
+                    local = await get_route_service().local_route_analysis(
+                        data['start_coords'],
+                        data['end_coords'],
+                        ANALYSIS_TIERS[tier]['data_budget_ms']
+                    )
+                    route_data['local_analysis'] = local
+
+                analysis = await gemini_service.analyze_route(route_data, use_cache=use_cache)
+                served_from = 'model'
+                if analysis != gemini_service._get_fallback_analysis():
+                    route_analysis_store.put(origin, destination, analysis, mode)
+                elif local is not None:
+                    # Model missed its deadline: local scores beat a canned answer
+                    analysis = await local_route_analysis(data, local=local)
+                    served_from = 'local'
          
         response = jsonify({
             'status': 'success',
             'data': {
-                'analysis': {
-                    'safety_score': analysis.get('safety_score', 70),
-                    'risk_level': analysis.get('risk_level', 'medium'),
-                    'primary_concerns': analysis.get('primary_concerns', []),
-                    'recommendations': analysis.get('recommendations', []),
-                    'safe_spots': analysis.get('safe_spots', []),
-                    'emergency_resources': analysis.get('emergency_resources', []),
-                    'safer_alternatives': analysis.get('safer_alternatives', []),
-                    'confidence_score': analysis.get('confidence_score', 0.8)
-                },
-                'route_id': 1
+                'analysis': format_route_analysis(analysis),
+                'route_id': 1,
+                'served_from': served_from,
+                'tier': record_tier('analyze-route', tier, started)
             }
         })
         
@@ -114,7 +198,217 @@ def analyze_route():
         })
         response.headers.add('Access-Control-Allow-Origin', request.origin or ALLOWED_ORIGINS[0])
         response.headers.add('Access-Control-Allow-Credentials', 'true')
-        return response, 500
+        return response, 400 if isinstance(e, ValueError) else 500
+
+def format_route_analysis(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """The analyze-route response schema, with defaults for missing fields."""
+    return {
+        'safety_score': analysis.get('safety_score', 70),
+        'risk_level': analysis.get('risk_level', 'medium'),
+        'primary_concerns': analysis.get('primary_concerns', []),
+        'recommendations': analysis.get('recommendations', []),
+        'safe_spots': analysis.get('safe_spots', []),
+        'emergency_resources': analysis.get('emergency_resources', []),
+        'safer_alternatives': analysis.get('safer_alternatives', []),
+        'confidence_score': analysis.get('confidence_score', 0.8)
+    }
+
+def analysis_events(analysis: Dict[str, Any]):
+    """Field and result events for an analysis that is already complete."""
+    for key, value in analysis.items():
+        yield 'field', {key: value}
+    yield 'result', analysis
+
+def sse_response(events, endpoint: str, tier: str = None) -> Response:
+    """Stream (event, data) pairs from an async generator as SSE, ending with done."""
+    def generate():
+        started = time.monotonic()
+        try:
+            for event, data in iter_async(events):
+                if event == 'chunk':
+                    data = {'text': data}
+                yield sse_event(event, data)
+
+            done = {'status': 'success'}
+            if tier is not None:
+                done['tier'] = record_tier(endpoint, tier, started)
+            yield sse_event('done', done)
+
+        except Exception as e:
+            logger.error(f"{endpoint} stream error: {str(e)}", exc_info=True)
+            yield sse_event('error', {'status': 'error', 'error': str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+@safety_bp.route('/analyze-route/stream', methods=['POST'])
+def stream_analyze_route():
+    """analyze-route over SSE: model chunks and each field as soon as it parses, then the result."""
+    data = request.get_json() or {}
+    try:
+        tier = resolve_tier(data.get('tier') or request.args.get('tier'))
+        if not data.get('start_location') or not data.get('end_location'):
+            raise ValueError('start_location and end_location are required')
+    except ValueError as e:
+        return jsonify({'status': 'error', 'error': f'Invalid request: {str(e)}'}), 400
+
+    async def events():
+        await resolve_endpoints(data, upstream=ANALYSIS_TIERS[tier]['llm'] is not None)
+        route_data = prepare_route_data(data)
+
+        if ANALYSIS_TIERS[tier]['llm'] is None:
+            analysis = await local_route_analysis(data, ANALYSIS_TIERS[tier]['data_budget_ms'])
+            for event in analysis_events(format_route_analysis(analysis)):
+                yield event
+            return
+
+        use_cache = ANALYSIS_TIERS[tier]['llm'] == 'cached'
+        origin = data.get('start_coords') or route_data['start_location']
+        destination = data.get('end_coords') or route_data['end_location']
+        mode = data.get('mode', 'walking')
+
+        stored = route_analysis_store.get(origin, destination, mode) if use_cache else None
+        if stored is not None:
+            for event in analysis_events(format_route_analysis(stored)):
+                yield event
+            return
+
+        gemini_service = get_gemini_service()
+        local = None
+        if data.get('start_coords') and data.get('end_coords'):
+            local = await get_route_service().local_route_analysis(
+                data['start_coords'],
+                data['end_coords'],
+                ANALYSIS_TIERS[tier]['data_budget_ms']
+            )
+            route_data['local_analysis'] = local
+
+        async for event, payload in gemini_service.stream_route_analysis(route_data, use_cache=use_cache):
+            if event != 'result':
+                yield event, payload
+                continue
+            if payload != gemini_service._get_fallback_analysis():
+                route_analysis_store.put(origin, destination, payload, mode)
+            elif local is not None:
+                # Model missed its deadline: local scores beat a canned answer
+                payload = await local_route_analysis(data, local=local)
+            yield 'result', format_route_analysis(payload)
+
+    return sse_response(events(), 'analyze-route-stream', tier)
+
+async def local_route_analysis(
+    data: Dict[str, Any],
+    budget_ms: float = None,
+    local: Dict[str, Any] = None
+) -> Dict[str, Any]:
+    """Route analysis from local corridor scores, in the analyze-route schema."""
+    start, end = data.get('start_coords'), data.get('end_coords')
+    if local is not None or (start and end):
+        if local is None:
+            local = await get_route_service().local_route_analysis(start, end, budget_ms)
+        confidence = 0.6
+    else:
+        local = get_route_service()._get_fallback_route_analysis()
+        confidence = 0.3
+
+    return {
+        'safety_score': local['safety_score'],
+        'risk_level': local['risk_level'],
+        'primary_concerns': local['risks'][:3],
+        'recommendations': local['recommendations'],
+        'safe_spots': local['safe_spaces'],
+        'emergency_resources': [],
+        'safer_alternatives': [],
+        'confidence_score': confidence
+    }
+
+@safety_bp.route('/geocode', methods=['GET'])
+async def geocode():
+    """Resolve an address to coordinates, served from the geocode cache when possible."""
+    address = request.args.get('address', '').strip()
+    if not address:
+        return jsonify({'status': 'error', 'error': 'address is required'}), 400
+
+    result = await get_geocoding_service().geocode(address)
+    if result is None:
+        return jsonify({'status': 'error', 'error': 'Address not found'}), 404
+    return jsonify({'status': 'success', 'data': result})
+
+@safety_bp.route('/reverse-geocode', methods=['GET'])
+async def reverse_geocode():
+    """Display address for a coordinate pair."""
+    try:
+        location = {
+            'lat': float(request.args['lat']),
+            'lng': float(request.args['lng'])
+        }
+    except (KeyError, ValueError) as e:
+        return jsonify({'status': 'error', 'error': f'Invalid request: {str(e)}'}), 400
+
+    result = await get_geocoding_service().reverse_geocode(location)
+    if result is None:
+        return jsonify({'status': 'error', 'error': 'No address found'}), 404
+    return jsonify({'status': 'success', 'data': result})
+
+@safety_bp.route('/safe-route/stream', methods=['GET'])
+@cross_origin(supports_credentials=True, origins=ALLOWED_ORIGINS)
+def stream_safe_route():
+    """Stream route candidates, per-route safety and the AI narrative over SSE."""
+    try:
+        start = {
+            'lat': float(request.args['start_lat']),
+            'lng': float(request.args['start_lng'])
+        }
+        end = {
+            'lat': float(request.args['end_lat']),
+            'lng': float(request.args['end_lng'])
+        }
+        k = request.args.get('k', type=int)
+        tier = resolve_tier(request.args.get('tier'))
+        llm_mode = ANALYSIS_TIERS[tier]['llm']
+        include_narrative = request.args.get('narrative', '1') != '0' and llm_mode is not None
+    except (KeyError, ValueError) as e:
+        return jsonify({
+            'status': 'error',
+            'error': f'Invalid request: {str(e)}'
+        }), 400
+
+    route_service = get_route_service()
+    gemini_service = get_gemini_service()
+
+    weather = request.args.get('weather', 'Unknown')
+
+    async def events():
+        safest = None
+        routes = []
+        async for event, data in route_service.stream_safe_route(start, end, k, tier):
+            if event == 'routes':
+                routes = data['routes']
+            elif event == 'ranking' and data['safest_index'] is not None:
+                safest = routes[data['safest_index']]
+            yield event, data
+
+        # The Gemini narrative is the slowest part, so it goes last
+        if include_narrative and safest:
+            leg = safest['legs'][0]
+            route_data = prepare_route_data({
+                'start_location': leg.get('start_address') or f"{start['lat']},{start['lng']}",
+                'end_location': leg.get('end_address') or f"{end['lat']},{end['lng']}",
+                'distance': leg.get('distance', {}).get('text', '0'),
+                'weather': weather
+            })
+            yield 'narrative', await gemini_service.analyze_route(
+                route_data,
+                use_cache=llm_mode == 'cached'
+            )
+
+    return sse_response(events(), 'safe-route-stream', tier)
 
 @safety_bp.route('/active-route/<int:route_id>', methods=['GET', 'PUT'])
 def active_route(route_id):
@@ -166,9 +460,10 @@ def active_route(route_id):
             'error': str(e)
         }), 500
 
+# flask_cors' cross_origin cannot wrap coroutines; the app-wide CORS
+# config already covers /api/*
 @safety_bp.route('/analyze-area', methods=['POST'])
-@cross_origin(supports_credentials=True, origins=['http://localhost:3000'])
-def analyze_area():
+async def analyze_area():
     try:
         print("AAAAAAAAAAAAHHHHHHHHHHH")
         data = request.get_json()
@@ -189,7 +484,7 @@ def analyze_area():
             }), 503
 
         logger.info(f"Analyzing area for location: {data['location']}")
-        analysis = gemini_service.analyze_area(data['location'])
+        analysis = await gemini_service.analyze_area(data['location'])
 
         print("analysis", analysis)
         
@@ -205,6 +500,41 @@ def analyze_area():
             'error': 'Internal server error occurred'
         }), 500
     
+@safety_bp.route('/analyze-area/enriched', methods=['GET'])
+async def enriched_area():
+    """Poll for the model's area analysis after analyze-area answered from local data.
+
+    `wait` (seconds, max 20) holds the request open until the enrichment
+    lands; 202 means it is still running.
+    """
+    try:
+        location = {
+            'lat': float(request.args['lat']),
+            'lng': float(request.args['lng'])
+        }
+        wait = min(float(request.args.get('wait', 0)), 20.0)
+    except (KeyError, ValueError) as e:
+        return jsonify({'status': 'error', 'error': f'Invalid request: {str(e)}'}), 400
+
+    analysis = await get_gemini_service().enriched_area(location, wait)
+    if analysis is None:
+        return jsonify({'status': 'pending'}), 202
+    return jsonify({'status': 'success', 'data': analysis})
+
+@safety_bp.route('/analyze-area/stream', methods=['POST'])
+def stream_analyze_area():
+    """analyze-area over SSE: model chunks and each field as soon as it parses, then the result."""
+    data = request.get_json() or {}
+    try:
+        location = {
+            'lat': float(data['location']['lat']),
+            'lng': float(data['location']['lng'])
+        }
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'status': 'error', 'error': f'Invalid request: {str(e)}'}), 400
+
+    return sse_response(get_gemini_service().stream_area_analysis(location), 'analyze-area-stream')
+
 @safety_bp.route('/route-history', methods=['GET'])
 def route_history():
     """Get route history."""
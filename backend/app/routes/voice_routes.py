@@ -9,6 +9,11 @@ import logging
 voice_bp = Blueprint('voice', __name__)
 logger = logging.getLogger(__name__)
 
+def get_voice_service():
+    if not hasattr(current_app, 'voice_service'):
+        current_app.voice_service = VoiceCommandService(current_app.config['GEMINI_API_KEY'])
+    return current_app.voice_service
+
 @voice_bp.route('/process', methods=['POST'])
 async def process_command():
     try:
@@ -16,7 +21,7 @@ async def process_command():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
 
-        voice_service = VoiceCommandService(current_app.config['GEMINI_API_KEY'])
+        voice_service = get_voice_service()
         result = await voice_service.process_command(
             data['command'],
             data['location']
@@ -0,0 +1,222 @@
+# backend/app/services/alert_dedupe.py
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from concurrent.futures import Future, InvalidStateError
+from datetime import datetime, timedelta
+import json
+import logging
+import threading
+import time
+from ..config import Config
+from ..models import AlertBurst
+from ..utils.cache import TTLCache
+from ..utils.emergency_lane import emergency_lane
+from ..utils.metrics import metrics
+
+
+class AlertDeduper:
+    """Collapses repeated alerts from one user into the first one
+
+    A request joins an existing burst when it carries an idempotency key
+    already seen in its scope (a retry: nothing changes), or when the
+    user's last alert in that scope is still open and was seen within
+    ALERT_BURST_WINDOW_SECONDS (a repeat: its update_count goes up).
+    Otherwise the caller opens a new burst and creates the alert; any
+    request arriving meanwhile waits on that burst's result rather than
+    creating a second alert. State lives in memory and is persisted to
+    the alert_burst table, from which recent 'alert' bursts are reloaded
+    on first use.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable = None,
+        window_seconds: float = None,
+        key_ttl_seconds: float = None
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.session_factory = session_factory or emergency_lane.session
+        self.window_seconds = window_seconds or Config.ALERT_BURST_WINDOW_SECONDS
+        self.key_ttl_seconds = key_ttl_seconds or Config.ALERT_IDEMPOTENCY_TTL_SECONDS
+        self._bursts: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._keys = TTLCache(self.key_ttl_seconds, max_entries=100000)
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        """Merge recent alert bursts from the table once; the read happens outside the state lock"""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            loaded = self._read()
+            with self._lock:
+                for burst in loaded:
+                    self._bursts.setdefault((burst['scope'], burst['user_id']), burst)
+                    remaining = max(1.0, self.key_ttl_seconds - (time.time() - burst['last_seen']))
+                    for key in burst['keys']:
+                        if (burst['scope'], key) not in self._keys:
+                            self._keys.set((burst['scope'], key), burst, ttl_seconds=remaining)
+            self._loaded = True
+
+    def _read(self) -> List[Dict[str, Any]]:
+        """Recent alert bursts from the table (SOS responses are not persisted)"""
+        since = datetime.utcnow() - timedelta(seconds=self.key_ttl_seconds)
+        try:
+            with self.session_factory() as session:
+                rows = session.query(AlertBurst).filter(
+                    AlertBurst.scope == 'alert',
+                    AlertBurst.last_seen_at >= since
+                ).order_by(AlertBurst.last_seen_at).all()
+        except Exception as e:
+            self.logger.error(f"Could not load alert bursts: {str(e)}")
+            return []
+
+        now = time.time()
+        bursts = []
+        for row in rows:
+            result = Future()
+            result.set_result({'alert_id': row.alert_id})
+            bursts.append({
+                'id': row.id,
+                'scope': row.scope,
+                'user_id': row.user_id,
+                'alert_id': row.alert_id,
+                'keys': json.loads(row.idempotency_keys or '[]'),
+                'update_count': row.update_count or 0,
+                'status': row.status,
+                'last_seen': now - (datetime.utcnow() - row.last_seen_at).total_seconds(),
+                'result': result
+            })
+        return bursts
+
+    def claim(
+        self,
+        scope: str,
+        user_id: Any,
+        idempotency_key: str = None,
+        location: Any = None
+    ) -> Tuple[Dict[str, Any], bool]:
+        """The burst this request belongs to, and whether the caller opened it
+
+        The opener must create the alert, then call opened() or abandon().
+        Everyone else waits on burst['result'] and answers from it. This
+        may touch the database: call it off the event loop.
+        """
+        self._ensure_loaded()
+        user_id = str(user_id)
+        now = time.time()
+        with self._lock:
+            if idempotency_key:
+                burst = self._keys.get((scope, idempotency_key))
+                if burst is not None:
+                    metrics.increment('alerts.deduplicated', tags={'scope': scope, 'reason': 'idempotency_key'})
+                    return burst, False
+
+            burst = self._bursts.get((scope, user_id))
+            if burst is not None and burst['status'] == 'open' and now - burst['last_seen'] <= self.window_seconds:
+                burst['update_count'] += 1
+                burst['last_seen'] = now
+                burst['last_location'] = location
+                if idempotency_key:
+                    burst['keys'].append(idempotency_key)
+                    self._keys.set((scope, idempotency_key), burst)
+                metrics.increment('alerts.deduplicated', tags={'scope': scope, 'reason': 'burst'})
+                joined = True
+            else:
+                burst = {
+                    'id': None,
+                    'scope': scope,
+                    'user_id': user_id,
+                    'alert_id': None,
+                    'keys': [idempotency_key] if idempotency_key else [],
+                    'update_count': 0,
+                    'status': 'open',
+                    'last_seen': now,
+                    'last_location': location,
+                    'result': Future()
+                }
+                self._bursts[(scope, user_id)] = burst
+                if idempotency_key:
+                    self._keys.set((scope, idempotency_key), burst)
+                joined = False
+
+        if joined:
+            self._persist(burst)
+        return burst, not joined
+
+    def opened(self, burst: Dict[str, Any], result: Dict[str, Any], alert_id: int = None):
+        """The opener created the alert: persist the burst and release waiting duplicates (blocking)"""
+        burst['alert_id'] = alert_id
+        try:
+            with self.session_factory() as session:
+                row = AlertBurst(
+                    scope=burst['scope'],
+                    user_id=burst['user_id'],
+                    alert_id=alert_id,
+                    status='open',
+                    first_seen_at=datetime.utcnow(),
+                )
+                self._fill(row, burst)
+                session.add(row)
+                session.flush()
+                burst['id'] = row.id
+        except Exception as e:
+            # The alert exists either way; only restart recovery is lost
+            self.logger.error(f"Could not persist alert burst: {str(e)}")
+        self._settle(burst, result=result)
+
+    def abandon(self, burst: Dict[str, Any], error: BaseException):
+        """The opener failed: forget the burst so the next request starts over"""
+        with self._lock:
+            if self._bursts.get((burst['scope'], burst['user_id'])) is burst:
+                del self._bursts[(burst['scope'], burst['user_id'])]
+            for key in burst['keys']:
+                self._keys.delete((burst['scope'], key))
+        if not isinstance(error, Exception):
+            # Waiters must see an ordinary failure, not the opener's cancellation
+            error = RuntimeError(f"Alert creation interrupted: {type(error).__name__}")
+        self._settle(burst, error=error)
+
+    def _settle(self, burst: Dict[str, Any], result: Dict[str, Any] = None, error: Exception = None):
+        """Resolve the burst's result; a no-op if something already settled or cancelled it"""
+        try:
+            if error is not None:
+                burst['result'].set_exception(error)
+            else:
+                burst['result'].set_result(result)
+        except InvalidStateError:
+            self.logger.warning(f"Alert burst result was already settled ({burst['scope']}/{burst['user_id']})")
+
+    def close(self, scope: str, alert_id: int):
+        """The alert was resolved: the next one from the user opens a new burst"""
+        with self._lock:
+            burst = next((b for b in self._bursts.values() if b['scope'] == scope and b['alert_id'] == alert_id), None)
+            if burst is not None:
+                burst['status'] = 'closed'
+        if burst is not None:
+            self._persist(burst)
+
+    def _fill(self, row: AlertBurst, burst: Dict[str, Any]):
+        row.idempotency_keys = json.dumps(burst['keys'])
+        row.update_count = burst['update_count']
+        row.status = burst['status']
+        row.last_location = str(burst['last_location'])[:200] if burst.get('last_location') is not None else None
+        row.last_seen_at = datetime.utcnow() - timedelta(seconds=time.time() - burst['last_seen'])
+
+    def _persist(self, burst: Dict[str, Any]):
+        """Write a burst's counters; bursts still being opened are written by opened()"""
+        if burst['id'] is None:
+            return
+        try:
+            with self.session_factory() as session:
+                row = session.get(AlertBurst, burst['id'])
+                if row is not None:
+                    self._fill(row, burst)
+        except Exception as e:
+            self.logger.error(f"Could not update alert burst: {str(e)}")
+
+
+alert_deduper = AlertDeduper()
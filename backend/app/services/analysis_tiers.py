@@ -0,0 +1,74 @@
+# backend/app/services/analysis_tiers.py
+
+from typing import Dict, Any
+import logging
+import time
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Quality tiers for route analysis.
+#
+#   fast      ~300ms  Local corridor/segment scores only, no LLM, Google's
+#                     own alternatives, tight budget on data fetches.
+#   balanced  ~2s     Diverse alternatives, corridor scoring and a cached
+#                     LLM narrative (only a cache miss calls the model).
+#   thorough  ~10s    Full per-point analysis pipeline and a fresh LLM
+#                     narrative.
+ANALYSIS_TIERS: Dict[str, Dict[str, Any]] = {
+    'fast': {
+        'latency_target_ms': 300,
+        'llm': None,
+        'alternatives': False,
+        'per_point': False,
+        'data_budget_ms': 250
+    },
+    'balanced': {
+        'latency_target_ms': 2000,
+        'llm': 'cached',
+        'alternatives': True,
+        'per_point': False,
+        'data_budget_ms': 1500
+    },
+    'thorough': {
+        'latency_target_ms': 10000,
+        'llm': 'fresh',
+        'alternatives': True,
+        'per_point': True,
+        'data_budget_ms': None
+    }
+}
+
+DEFAULT_TIER = 'balanced'
+
+
+def resolve_tier(name: str = None) -> str:
+    """Validate a requested tier name, defaulting to balanced"""
+    tier = (name or DEFAULT_TIER).lower()
+    if tier not in ANALYSIS_TIERS:
+        raise ValueError(
+            f"Unknown tier '{name}', expected one of: {', '.join(ANALYSIS_TIERS)}"
+        )
+    return tier
+
+
+def record_tier(endpoint: str, tier: str, started: float) -> Dict[str, Any]:
+    """Record which tier served a request and how long it took"""
+    elapsed_ms = (time.monotonic() - started) * 1000
+    target_ms = ANALYSIS_TIERS[tier]['latency_target_ms']
+    tags = {'endpoint': endpoint, 'tier': tier}
+
+    metrics.increment('analysis.requests', tags=tags)
+    metrics.observe('analysis.latency_ms', elapsed_ms, tags=tags)
+    if elapsed_ms > target_ms:
+        metrics.increment('analysis.over_target', tags=tags)
+
+    logger.info(
+        f"{endpoint} served by tier '{tier}' in {elapsed_ms:.0f}ms "
+        f"(target {target_ms}ms)"
+    )
+    return {
+        'name': tier,
+        'latency_ms': round(elapsed_ms, 1),
+        'target_ms': target_ms
+    }
@@ -1,17 +1,18 @@
 # backend/app/services/camera_analyzer.py
 
-import google.generativeai as genai
 from typing import Dict, Any, List
 import base64
 import logging
 from datetime import datetime
 import json
+from .model_registry import model_registry, VISION_MODEL
+from .llm_usage import record_fallback, record_parse_failure
 
 class CameraAnalyzer:
     def __init__(self, api_key: str):
         self.logger = logging.getLogger(__name__)
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro-vision')
+        model_registry.configure(api_key)
+        self.model_name = VISION_MODEL
         
     async def analyze_surroundings(
         self, 
@@ -49,14 +50,19 @@ class CameraAnalyzer:
             }}
             """
 
-            response = self.model.generate_content([image, prompt])
-            return self._parse_response(response.text)
+            response = await model_registry.generate_async(
+                [image, prompt],
+                self.model_name,
+                call_site='camera_analysis'
+            )
+            return self._parse_response(response.text, 'camera_analysis')
 
         except Exception as e:
             self.logger.error(f"Camera analysis error: {str(e)}")
+            record_fallback('camera_analysis', error=e)
             return self._get_fallback_analysis()
 
-    def _parse_response(self, response: str) -> Dict[str, Any]:
+    def _parse_response(self, response: str, call_site: str, template: str = None) -> Dict[str, Any]:
         """Parse Gemini's response into structured data"""
         try:
             # Extract JSON from response
@@ -64,9 +70,10 @@ class CameraAnalyzer:
             end_idx = response.rfind('}') + 1
             if start_idx != -1 and end_idx != -1:
                 return json.loads(response[start_idx:end_idx])
-            return self._get_fallback_analysis()
-        except:
-            return self._get_fallback_analysis()
+        except ValueError:
+            pass
+        record_parse_failure(call_site, template)
+        return self._get_fallback_analysis()
 
     def _get_fallback_analysis(self) -> Dict[str, Any]:
         """Provide fallback analysis if AI processing fails"""
@@ -116,8 +123,14 @@ class CameraAnalyzer:
             }}
             """
 
-            response = self.model.generate_content([video_frames[-1], prompt])
-            return self._parse_response(response.text)
+            response = await model_registry.generate_async(
+                [video_frames[-1], prompt],
+                self.model_name,
+                call_site='camera_analysis',
+                template='camera_behavior'
+            )
+            return self._parse_response(response.text, 'camera_analysis', 'camera_behavior')
         except Exception as e:
             self.logger.error(f"Behavior analysis error: {str(e)}")
+            record_fallback('camera_analysis', 'camera_behavior', error=e)
             return self._get_fallback_analysis()
\ No newline at end of file
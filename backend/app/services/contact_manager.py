@@ -3,20 +3,28 @@
 from typing import Dict, List, Any
 import logging
 from datetime import datetime
-import json
-import sqlite3
+from sqlalchemy import text
+from .notification_dispatcher import NotificationDispatcher, get_notification_dispatcher
 
 class ContactManager:
-    def __init__(self, db_path: str = "app.db"):
+    """Emergency contacts and the alerts sent to them
+
+    The tables live in the notification dispatcher's database, so an
+    alert's history rows and its outbox rows commit in one transaction,
+    and each history row is marked sent or failed as it is delivered.
+    """
+
+    def __init__(self, dispatcher: NotificationDispatcher = None):
         self.logger = logging.getLogger(__name__)
-        self.db_path = db_path
+        self.dispatcher = dispatcher or get_notification_dispatcher()
+        self.dispatcher.on_outcome('alert_history', self._record_delivery)
         self._init_db()
 
     def _init_db(self):
         """Initialize database tables"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute("""
+            with self.dispatcher.session_factory() as session:
+                session.execute(text("""
                     CREATE TABLE IF NOT EXISTS emergency_contacts (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
                         user_id TEXT NOT NULL,
@@ -27,9 +35,9 @@ class ContactManager:
                         priority INTEGER DEFAULT 0,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )
-                """)
-                
-                conn.execute("""
+                """))
+
+                session.execute(text("""
                     CREATE TABLE IF NOT EXISTS alert_history (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
                         user_id TEXT NOT NULL,
@@ -40,29 +48,29 @@ class ContactManager:
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                         FOREIGN KEY (contact_id) REFERENCES emergency_contacts (id)
                     )
-                """)
+                """))
         except Exception as e:
             self.logger.error(f"Database initialization error: {str(e)}")
 
     async def add_contact(self, user_id: str, contact_data: Dict[str, Any]) -> Dict[str, Any]:
         """Add new emergency contact"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute("""
-                    INSERT INTO emergency_contacts 
+            with self.dispatcher.session_factory() as session:
+                result = session.execute(text("""
+                    INSERT INTO emergency_contacts
                     (user_id, name, phone, email, relationship, priority)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    user_id,
-                    contact_data['name'],
-                    contact_data['phone'],
-                    contact_data.get('email'),
-                    contact_data.get('relationship'),
-                    contact_data.get('priority', 0)
-                ))
-                
+                    VALUES (:user_id, :name, :phone, :email, :relationship, :priority)
+                """), {
+                    'user_id': user_id,
+                    'name': contact_data['name'],
+                    'phone': contact_data['phone'],
+                    'email': contact_data.get('email'),
+                    'relationship': contact_data.get('relationship'),
+                    'priority': contact_data.get('priority', 0)
+                })
+
                 return {
-                    'contact_id': cursor.lastrowid,
+                    'contact_id': result.lastrowid,
                     'status': 'success',
                     'message': 'Contact added successfully'
                 }
@@ -77,15 +85,14 @@ class ContactManager:
     async def get_contacts(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all emergency contacts for a user"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.execute("""
-                    SELECT * FROM emergency_contacts 
-                    WHERE user_id = ? 
+            with self.dispatcher.session_factory() as session:
+                result = session.execute(text("""
+                    SELECT * FROM emergency_contacts
+                    WHERE user_id = :user_id
                     ORDER BY priority DESC, created_at ASC
-                """, (user_id,))
-                
-                return [dict(row) for row in cursor.fetchall()]
+                """), {'user_id': user_id})
+
+                return [dict(row) for row in result.mappings()]
 
         except Exception as e:
             self.logger.error(f"Error getting contacts: {str(e)}")
@@ -100,40 +107,50 @@ class ContactManager:
         """Send emergency alert to all contacts"""
         try:
             contacts = await self.get_contacts(user_id)
-            
+
             if not contacts:
                 return {
                     'status': 'error',
                     'message': 'No emergency contacts found'
                 }
 
+            alert_message = message or 'Emergency alert triggered'
+            text_message = f"{alert_message} Location: {location.get('lat')},{location.get('lng')}"
             alerts_sent = []
-            for contact in contacts:
-                alert = {
-                    'user_id': user_id,
-                    'contact_id': contact['id'],
-                    'alert_type': 'emergency',
-                    'message': message or 'Emergency alert triggered',
-                    'status': 'sent',
-                    'location': location,
-                    'timestamp': datetime.now().isoformat()
-                }
-                
-                # Log alert
-                with sqlite3.connect(self.db_path) as conn:
-                    conn.execute("""
-                        INSERT INTO alert_history 
+            # History rows and their outbox rows commit together; outbox keys derive
+            # from the history rows, so a retry cannot double-send
+            with self.dispatcher.session_factory() as session:
+                rows = []
+                for contact in contacts:
+                    result = session.execute(text("""
+                        INSERT INTO alert_history
                         (user_id, contact_id, alert_type, message, status)
-                        VALUES (?, ?, ?, ?, ?)
-                    """, (
-                        user_id,
-                        contact['id'],
-                        'emergency',
-                        alert['message'],
-                        'sent'
+                        VALUES (:user_id, :contact_id, :alert_type, :message, :status)
+                    """), {
+                        'user_id': user_id,
+                        'contact_id': contact['id'],
+                        'alert_type': 'emergency',
+                        'message': alert_message,
+                        'status': 'queued'
+                    })
+                    alerts_sent.append({
+                        'history_id': result.lastrowid,
+                        'user_id': user_id,
+                        'contact_id': contact['id'],
+                        'alert_type': 'emergency',
+                        'message': alert_message,
+                        'status': 'queued',
+                        'location': location,
+                        'timestamp': datetime.now().isoformat()
+                    })
+                    rows.extend(self.dispatcher.notifications_for(
+                        f"alert_history:{result.lastrowid}",
+                        [contact],
+                        text_message,
+                        {'user_id': user_id, 'location': location}
                     ))
-                
-                alerts_sent.append(alert)
+                self.dispatcher.enqueue(session, rows)
+            self.dispatcher.wake()
 
             return {
                 'status': 'success',
@@ -148,6 +165,13 @@ class ContactManager:
                 'message': str(e)
             }
 
+    def _record_delivery(self, session, history_id: str, status: str):
+        """Dispatcher outcome for one of a history row's notifications; any channel that got through wins"""
+        session.execute(text("""
+            UPDATE alert_history SET status = :status
+            WHERE id = :id AND status != 'sent'
+        """), {'status': status, 'id': int(history_id)})
+
     async def get_alert_history(
         self,
         user_id: str,
@@ -155,19 +179,18 @@ class ContactManager:
     ) -> List[Dict[str, Any]]:
         """Get alert history for a user"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.execute("""
+            with self.dispatcher.session_factory() as session:
+                result = session.execute(text("""
                     SELECT ah.*, ec.name as contact_name, ec.phone as contact_phone
                     FROM alert_history ah
                     LEFT JOIN emergency_contacts ec ON ah.contact_id = ec.id
-                    WHERE ah.user_id = ?
+                    WHERE ah.user_id = :user_id
                     ORDER BY ah.created_at DESC
-                    LIMIT ?
-                """, (user_id, limit))
-                
-                return [dict(row) for row in cursor.fetchall()]
+                    LIMIT :limit
+                """), {'user_id': user_id, 'limit': limit})
+
+                return [dict(row) for row in result.mappings()]
 
         except Exception as e:
             self.logger.error(f"Error getting alert history: {str(e)}")
-            return []
\ No newline at end of file
+            return []
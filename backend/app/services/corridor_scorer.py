@@ -0,0 +1,348 @@
+# backend/app/services/corridor_scorer.py
+
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+METERS_PER_DEGREE_LAT = 110540.0
+METERS_PER_DEGREE_LNG = 111320.0
+
+
+class FeatureIndex:
+    """Point features sorted by latitude for fast bounding box queries"""
+
+    def __init__(
+        self,
+        coords: np.ndarray,
+        attributes: Optional[Dict[str, np.ndarray]] = None
+    ):
+        coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        order = np.argsort(coords[:, 0], kind='stable')
+        self.coords = coords[order]
+        self.attributes = {
+            name: np.asarray(values)[order]
+            for name, values in (attributes or {}).items()
+        }
+
+    @classmethod
+    def from_records(
+        cls,
+        records: List[Dict],
+        attribute_fields: Tuple[str, ...] = ()
+    ) -> 'FeatureIndex':
+        """Build an index from SF OpenData rows with latitude/longitude"""
+        df = pd.DataFrame(records)
+        if df.empty or 'latitude' not in df or 'longitude' not in df:
+            return cls(np.empty((0, 2)), {f: np.empty(0) for f in attribute_fields})
+
+        df['latitude'] = pd.to_numeric(df['latitude'], errors='coerce')
+        df['longitude'] = pd.to_numeric(df['longitude'], errors='coerce')
+        df = df.dropna(subset=['latitude', 'longitude'])
+
+        attributes = {
+            field: (df[field] if field in df else pd.Series([''] * len(df))).fillna('').to_numpy()
+            for field in attribute_fields
+        }
+        return cls(df[['latitude', 'longitude']].to_numpy(), attributes)
+
+    def __len__(self) -> int:
+        return len(self.coords)
+
+    def query_bbox(
+        self,
+        min_lat: float,
+        max_lat: float,
+        min_lng: float,
+        max_lng: float
+    ) -> np.ndarray:
+        """Indices of features inside a bounding box"""
+        lo = np.searchsorted(self.coords[:, 0], min_lat, side='left')
+        hi = np.searchsorted(self.coords[:, 0], max_lat, side='right')
+        lngs = self.coords[lo:hi, 1]
+        return lo + np.nonzero((lngs >= min_lng) & (lngs <= max_lng))[0]
+
+
+class CorridorData:
+    """Incident, street light and safe space indexes for a route corridor"""
+
+    def __init__(
+        self,
+        incidents: FeatureIndex,
+        lights: FeatureIndex,
+        safe_spaces: FeatureIndex
+    ):
+        self.incidents = incidents
+        self.lights = lights
+        self.safe_spaces = safe_spaces
+
+
+class CorridorScorer:
+    """Score route polylines by what lies within a buffer of each segment"""
+
+    def __init__(self, buffer_meters: float = 50.0):
+        self.buffer_meters = buffer_meters
+        self.weights = {
+            'incidents': 0.5,
+            'lighting': 0.3,
+            'safe_spaces': 0.2
+        }
+
+    def score_segments(
+        self,
+        points: np.ndarray,
+        data: CorridorData,
+        is_night: bool = False,
+        breaks: Optional[np.ndarray] = None
+    ) -> Dict[str, np.ndarray]:
+        """Compute per-segment corridor metrics for a (N, 2) lat/lng polyline
+
+        Segments i -> i+1 flagged in `breaks` (e.g. between two route steps
+        that do not touch) are given zero length and ignored.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if len(points) < 2:
+            empty = np.zeros(0)
+            return {
+                'length': empty, 'incidents': empty, 'lights': empty,
+                'working_lights': empty, 'safe_spaces': empty,
+                'safe_space_mask': np.zeros((0, len(data.safe_spaces)), dtype=bool),
+                'score': empty
+            }
+
+        lengths, incident_mask, light_mask, safe_mask = self._segment_masks(points, data)
+        if breaks is not None:
+            lengths = np.where(breaks, 0.0, lengths)
+            incident_mask[breaks] = False
+            light_mask[breaks] = False
+            safe_mask[breaks] = False
+
+        incidents = incident_mask.sum(axis=1)
+        lights = light_mask.sum(axis=1)
+        working = data.lights.attributes.get('status')
+        if working is not None and len(working):
+            working_lights = (light_mask & (working == 'WORKING')).sum(axis=1)
+        else:
+            working_lights = lights
+        safe_spaces = safe_mask.sum(axis=1)
+
+        score = self._score(lengths, incidents, lights, working_lights, safe_spaces, is_night)
+
+        return {
+            'length': lengths,
+            'incidents': incidents,
+            'lights': lights,
+            'working_lights': working_lights,
+            'safe_spaces': safe_spaces,
+            'safe_space_mask': safe_mask,
+            'score': score
+        }
+
+    def score_steps(
+        self,
+        points: np.ndarray,
+        data: CorridorData,
+        segment_steps: np.ndarray,
+        count: int,
+        is_night: bool = False
+    ) -> Dict[str, np.ndarray]:
+        """Per-step corridor metrics for a (N, 2) polyline made of several steps
+
+        segment_steps gives the step of each segment i -> i+1 (-1 for joins
+        between steps). A feature near several of a step's segments counts
+        once, and densities use the step's length, so a step scores the same
+        however finely its polyline is sampled.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        segment_steps = np.asarray(segment_steps).reshape(-1)
+        if len(points) < 2:
+            segment_steps = segment_steps[:0]
+        lengths, incident_mask, light_mask, safe_mask = self._segment_masks(points, data)
+
+        # (steps, segments) membership; a step's mask is the OR of its segments' masks
+        membership = segment_steps[None, :] == np.arange(count)[:, None]
+        step_lengths = membership @ lengths
+
+        def per_step(mask: np.ndarray) -> np.ndarray:
+            return (membership.astype(np.int64) @ mask.astype(np.int64)) > 0
+
+        incident_steps = per_step(incident_mask)
+        light_steps = per_step(light_mask)
+        safe_steps = per_step(safe_mask)
+
+        incidents = incident_steps.sum(axis=1)
+        lights = light_steps.sum(axis=1)
+        working = data.lights.attributes.get('status')
+        if working is not None and len(working):
+            working_lights = (light_steps & (working == 'WORKING')).sum(axis=1)
+        else:
+            working_lights = lights
+        safe_spaces = safe_steps.sum(axis=1)
+
+        return {
+            'length': step_lengths,
+            'incidents': incidents,
+            'lights': lights,
+            'working_lights': working_lights,
+            'safe_spaces': safe_spaces,
+            'safe_space_mask': safe_steps,
+            'score': self._score(step_lengths, incidents, lights, working_lights, safe_spaces, is_night)
+        }
+
+    def _segment_masks(
+        self,
+        points: np.ndarray,
+        data: CorridorData
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Segment lengths and (segments, features) buffer masks for each feature kind"""
+        if len(points) < 2:
+            return (
+                np.zeros(0),
+                np.zeros((0, len(data.incidents)), dtype=bool),
+                np.zeros((0, len(data.lights)), dtype=bool),
+                np.zeros((0, len(data.safe_spaces)), dtype=bool)
+            )
+        origin_lat = points[:, 0].mean()
+        starts = self._project(points[:-1], origin_lat)
+        ends = self._project(points[1:], origin_lat)
+        lengths = np.linalg.norm(ends - starts, axis=1)
+        return (
+            lengths,
+            self._within_buffer(data.incidents, points, starts, ends, origin_lat),
+            self._within_buffer(data.lights, points, starts, ends, origin_lat),
+            self._within_buffer(data.safe_spaces, points, starts, ends, origin_lat)
+        )
+
+    def score_area(
+        self,
+        center: Tuple[float, float],
+        data: CorridorData,
+        radius_meters: float,
+        is_night: bool = False
+    ) -> Dict[str, Any]:
+        """Metrics for the features within radius_meters of a lat/lng point
+
+        The circle is scored like a corridor as long as its diameter, so
+        area and route scores share one scale.
+        """
+        origin_lat = center[0]
+        origin = self._project(np.array([center], dtype=float), origin_lat)[0]
+        pad_lat = radius_meters / METERS_PER_DEGREE_LAT
+        pad_lng = radius_meters / (METERS_PER_DEGREE_LNG * np.cos(np.radians(origin_lat)))
+
+        def within(index: FeatureIndex) -> np.ndarray:
+            candidates = index.query_bbox(
+                center[0] - pad_lat, center[0] + pad_lat,
+                center[1] - pad_lng, center[1] + pad_lng
+            )
+            if not len(candidates):
+                return candidates
+            distances = np.linalg.norm(self._project(index.coords[candidates], origin_lat) - origin, axis=1)
+            return candidates[distances <= radius_meters]
+
+        incidents = within(data.incidents)
+        lights = within(data.lights)
+        safe_spaces = within(data.safe_spaces)
+        status = data.lights.attributes.get('status')
+        if status is not None and len(status):
+            working_lights = int((status[lights] == 'WORKING').sum())
+        else:
+            working_lights = len(lights)
+
+        score = self._score(
+            np.array([2 * radius_meters]),
+            np.array([len(incidents)]),
+            np.array([len(lights)]),
+            np.array([working_lights]),
+            np.array([len(safe_spaces)]),
+            is_night
+        )[0]
+        return {
+            'incidents': len(incidents),
+            'lights': len(lights),
+            'working_lights': working_lights,
+            'safe_spaces': safe_spaces,
+            'score': float(score)
+        }
+
+    def _project(self, coords: np.ndarray, origin_lat: float) -> np.ndarray:
+        """Equirectangular projection to meters around the route"""
+        return np.column_stack([
+            coords[:, 0] * METERS_PER_DEGREE_LAT,
+            coords[:, 1] * METERS_PER_DEGREE_LNG * np.cos(np.radians(origin_lat))
+        ])
+
+    def _within_buffer(
+        self,
+        index: FeatureIndex,
+        points: np.ndarray,
+        starts: np.ndarray,
+        ends: np.ndarray,
+        origin_lat: float
+    ) -> np.ndarray:
+        """(segments, features) mask of features within the buffer distance"""
+        mask = np.zeros((len(starts), len(index)), dtype=bool)
+        if not len(index):
+            return mask
+
+        # Prefilter with the corridor's bounding box before broadcasting
+        pad_lat = self.buffer_meters / METERS_PER_DEGREE_LAT
+        pad_lng = self.buffer_meters / (METERS_PER_DEGREE_LNG * np.cos(np.radians(origin_lat)))
+        candidates = index.query_bbox(
+            points[:, 0].min() - pad_lat,
+            points[:, 0].max() + pad_lat,
+            points[:, 1].min() - pad_lng,
+            points[:, 1].max() + pad_lng
+        )
+        if not len(candidates):
+            return mask
+
+        features = self._project(index.coords[candidates], origin_lat)
+
+        # Point-to-segment distance for every (segment, feature) pair
+        direction = ends - starts
+        length_sq = np.einsum('ij,ij->i', direction, direction)
+        offsets = features[None, :, :] - starts[:, None, :]
+        t = np.einsum('sfk,sk->sf', offsets, direction) / np.where(length_sq > 0, length_sq, 1)[:, None]
+        t = np.clip(t, 0, 1)
+        closest = starts[:, None, :] + t[:, :, None] * direction[:, None, :]
+        distances = np.linalg.norm(features[None, :, :] - closest, axis=2)
+
+        mask[:, candidates] = distances <= self.buffer_meters
+        return mask
+
+    def _score(
+        self,
+        lengths: np.ndarray,
+        incidents: np.ndarray,
+        lights: np.ndarray,
+        working_lights: np.ndarray,
+        safe_spaces: np.ndarray,
+        is_night: bool
+    ) -> np.ndarray:
+        """Per-segment safety score (0-100)"""
+        per_100m = np.maximum(lengths, 1.0) / 100.0
+
+        # Incidents per 100m of corridor, saturating at 5
+        incident_impact = np.minimum(100, incidents / per_100m * 20)
+
+        # Lighting matters most at night; no lights at all is worst case
+        coverage = np.where(lights > 0, working_lights / np.maximum(lights, 1) * 100, 0)
+        lighting_impact = (100 - coverage) * (1.0 if is_night else 0.3)
+
+        # Safe spaces offset risk, up to 5 per 100m
+        safe_bonus = np.minimum(100, safe_spaces / per_100m * 20)
+
+        score = (
+            100
+            - incident_impact * self.weights['incidents']
+            - lighting_impact * self.weights['lighting']
+            + (safe_bonus - 100) * self.weights['safe_spaces']
+        )
+        return np.clip(score, 0, 100)
+
+    def weighted_score(self, scores: np.ndarray, lengths: np.ndarray) -> Optional[float]:
+        """Length-weighted mean score"""
+        total = lengths.sum()
+        if total <= 0:
+            return None
+        return float(np.dot(scores, lengths) / total)
@@ -0,0 +1,133 @@
+# backend/app/services/data_version.py
+
+from typing import Dict, Optional
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import requests
+from ..config import Config
+
+# SF OpenData datasets whose updates invalidate stored analyses
+TRACKED_DATASETS = {
+    'crime': 'wg3w-h783',
+    'lighting': 'vw6y-z8j6',
+    'businesses': 'g8m3-pdis',
+}
+
+
+class DataVersionTracker:
+    """Stamp identifying the current state of the upstream safety data
+
+    The stamp combines SAFETY_DATA_VERSION, a generation counter bumped by
+    hand and each dataset's rowsUpdatedAt from the SODA metadata API. It
+    is refreshed in a background thread so callers never wait on the
+    upstream. The state is kept in DATA_VERSION_PATH: a restarted process
+    serves the stamp it had before, and workers sharing the file see each
+    other's refreshes and bumps.
+    """
+
+    def __init__(self, refresh_seconds: float = 3600, path: str = None):
+        self.logger = logging.getLogger(__name__)
+        self.refresh_seconds = refresh_seconds
+        self.path = path or Config.DATA_VERSION_PATH
+        self._updated_at: Dict[str, int] = {}
+        self._generation = 0
+        self._checked_at = 0.0
+        self._loaded_mtime: Optional[int] = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def current(self) -> str:
+        """Current data version, scheduling a refresh if it is stale"""
+        with self._lock:
+            self._reload()
+            stale = time.time() - self._checked_at > self.refresh_seconds
+            if stale and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self.refresh, daemon=True).start()
+            return self._stamp()
+
+    def _stamp(self) -> str:
+        fingerprint = ','.join(
+            f"{name}={self._updated_at.get(name, 0)}" for name in sorted(TRACKED_DATASETS)
+        )
+        digest = hashlib.sha1(fingerprint.encode()).hexdigest()[:10]
+        return f"{Config.SAFETY_DATA_VERSION}.{self._generation}.{digest}"
+
+    def _reload(self):
+        """Pick up the saved state if the file changed since we last read it (lock held)"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._loaded_mtime:
+            return
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Could not read data version state: {str(e)}")
+            return
+        self._updated_at = {name: int(value) for name, value in saved.get('updated_at', {}).items()}
+        self._generation = int(saved.get('generation', 0))
+        self._checked_at = max(self._checked_at, float(saved.get('checked_at', 0)))
+        self._loaded_mtime = mtime
+
+    def _save(self):
+        """Write the state atomically (lock held)"""
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({
+                    'updated_at': self._updated_at,
+                    'generation': self._generation,
+                    'checked_at': self._checked_at
+                }, f)
+            os.replace(tmp_path, self.path)
+            self._loaded_mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            self.logger.warning(f"Could not save data version state: {str(e)}")
+
+    def refresh(self):
+        """Fetch dataset update times from SODA metadata"""
+        updated_at = {}
+        try:
+            for name, dataset_id in TRACKED_DATASETS.items():
+                updated_at[name] = self._fetch_updated_at(dataset_id)
+        except Exception as e:
+            self.logger.warning(f"Data version refresh failed: {str(e)}")
+        finally:
+            with self._lock:
+                # Another worker may have refreshed or bumped meanwhile
+                self._reload()
+                self._updated_at.update({name: value for name, value in updated_at.items() if value})
+                self._checked_at = time.time()
+                self._refreshing = False
+                self._save()
+
+    def _fetch_updated_at(self, dataset_id: str) -> Optional[int]:
+        response = requests.get(
+            f"https://data.sfgov.org/api/views/{dataset_id}.json",
+            timeout=Config.SODA_TIMEOUT_SECONDS
+        )
+        if response.status_code != 200:
+            return None
+        return response.json().get('rowsUpdatedAt')
+
+    def bump(self):
+        """Invalidate everything stamped with the current version, in every worker"""
+        with self._lock:
+            self._reload()
+            self._generation += 1
+            self._save()
+
+
+data_version = DataVersionTracker()
+
+
+def current_data_version() -> str:
+    return data_version.current()
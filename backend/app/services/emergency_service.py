@@ -1,130 +1,252 @@
 # backend/app/services/emergency_service.py
 
 import json
-from typing import Dict, Any, List
-import google.generativeai as genai
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import Future
 from datetime import datetime
 import requests
 import logging
-import aiohttp
 import asyncio
+import threading
+import time
+import uuid
 from flask import current_app
+from ..config import Config
+from ..utils.emergency_lane import emergency_lane
+from ..utils.metrics import metrics
+from .model_registry import model_registry, TEXT_MODEL
+from .llm_usage import record_fallback, record_parse_failure
+from .resource_index import get_resource_index
+from .response_cache import get_response_cache, cell_center
+
+# Cache template for warmed per-cell guidance
+EMERGENCY_TEMPLATE = 'emergency_guidance.v1'
+
+# Personalized guidance still being generated (or recently finished), by guidance id.
+# Module-level so every EmergencyService instance answers the same follow-up polls.
+_pending_guidance: Dict[str, Tuple[float, Future]] = {}
+_pending_lock = threading.Lock()
+
+
+def _valid_guidance(response: Any) -> Optional[Dict[str, Any]]:
+    """The model's guidance fields if the answer has the expected shape, else None"""
+    if not isinstance(response, dict) or not isinstance(response.get('guidance'), list) or not response['guidance']:
+        return None
+    fields = {'guidance': response['guidance']}
+    for key in ('actions', 'emergency_contacts'):
+        value = response.get(key, [])
+        if not isinstance(value, list):
+            return None
+        fields[key] = value
+    return {**response, **fields}
+
 
 class EmergencyService:
     def __init__(self, api_key: str):
         self.logger = logging.getLogger(__name__)
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
-        
-        # SF Data endpoints for emergency resources
-        self.emergency_endpoints = {
-            'police': 'https://data.sfgov.org/resource/p4e4-a5a7.json',  # Police Stations
-            'hospitals': 'https://data.sfgov.org/resource/sc8f-6qby.json',  # Hospitals
-            'safe_places': 'https://data.sfgov.org/resource/g8m3-pdis.json'  # Safe Places
-        }
+        model_registry.configure(api_key)
+        self.model_name = TEXT_MODEL
 
     async def handle_emergency(
         self, 
         location: Dict[str, float], 
         user_report: str = None
     ) -> Dict[str, Any]:
-        """Handle emergency situation and provide immediate guidance"""
+        """Immediate guidance from local data within SOS_BUDGET_MS
+
+        Resources come from the in-memory index. Guidance is the warmed
+        model answer for the location's grid cell and hour when there is
+        one, else built from the resources deterministically, so nothing
+        here waits on an upstream. Guidance personalized to the report is
+        started in the background (always when nothing was warmed) and only
+        included if it lands inside the budget; otherwise the answer
+        carries a guidance_id to poll via personalized_guidance().
+        """
+        started = time.monotonic()
         try:
-            # Get nearby emergency resources
             resources = await self._get_emergency_resources(location)
-            
-            # Generate emergency response using Gemini
-            response = await self._generate_emergency_response(location, resources, user_report)
-            
-            return {
+            try:
+                # The lookup counts against the budget like everything else here
+                warmed = await asyncio.wait_for(
+                    self.cell_guidance(location),
+                    max(0.001, Config.SOS_BUDGET_MS / 1000 - (time.monotonic() - started))
+                )
+            except asyncio.TimeoutError:
+                metrics.increment('emergency.cell_guidance', tags={'outcome': 'timeout'})
+                warmed = None
+            response = warmed or self._local_emergency_guidance(resources)
+
+            result = {
                 'timestamp': datetime.now().isoformat(),
                 'location': location,
                 'guidance': response['guidance'],
                 'resources': resources,
                 'immediate_actions': response['actions'],
-                'emergency_contacts': response['emergency_contacts']
+                'emergency_contacts': response['emergency_contacts'],
+                'source': 'cache' if warmed else 'local',
+                'guidance_id': None,
+                'guidance_status': 'ready' if warmed else 'pending'
             }
-            
+
+            if warmed is None or user_report:
+                guidance_id, pending = self._start_personalized_guidance(location, resources, user_report)
+                result.update({'guidance_id': guidance_id, 'guidance_status': 'pending'})
+
+                remaining = Config.SOS_BUDGET_MS / 1000 - (time.monotonic() - started)
+                if remaining > 0:
+                    try:
+                        # Shielded: running out of budget must not cancel the generation
+                        personalized = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(pending)), remaining)
+                        result.update(self._personalized_fields(personalized))
+                    except Exception:
+                        pass
+                if result['guidance_status'] == 'unavailable' and warmed:
+                    result['guidance_status'] = 'ready'
+
+            metrics.observe('emergency.sos_ms', (time.monotonic() - started) * 1000, tags={'source': result['source']})
+            return result
+
         except Exception as e:
             self.logger.error(f"Emergency handling error: {str(e)}")
-            return self._get_fallback_emergency_response()
+            return self._get_fallback_emergency_response(location)
 
-    async def _get_emergency_resources(
-        self, 
-        location: Dict[str, float]
-    ) -> Dict[str, List[Dict]]:
-        """Get nearby emergency resources"""
-        radius = 0.01  # Approximately 1km
-        
+    async def cell_guidance(self, location: Dict[str, float]) -> Optional[Dict[str, Any]]:
+        """Warmed model guidance for the location's grid cell and hour, if any"""
+        cache = get_response_cache()
+        started = time.monotonic()
         try:
-            async with aiohttp.ClientSession() as session:
-                # Fetch all resources concurrently
-                tasks = [
-                    self._fetch_resource(session, 'police', location, radius),
-                    self._fetch_resource(session, 'hospitals', location, radius),
-                    self._fetch_resource(session, 'safe_places', location, radius)
-                ]
-                police, hospitals, safe_places = await asyncio.gather(*tasks)
-
-            resources = {
-                'police': self._process_police_stations(police),
-                'hospitals': self._process_hospitals(hospitals),
-                'safe_places': self._process_safe_places(safe_places)
-            }
-            
-            current_app.logger.info(f"Successfully fetched emergency resources: {resources}")
-            return resources
+            # Read-only on the lane's threads: no lock or write shared with analysis traffic
+            warmed = await cache.aget(
+                EMERGENCY_TEMPLATE,
+                cache.make_key(EMERGENCY_TEMPLATE, location),
+                offload=emergency_lane.run_blocking,
+                read_only=True
+            )
+        finally:
+            metrics.observe('emergency.cache_read_ms', (time.monotonic() - started) * 1000)
+        # Coverage of the warmer as SOS traffic sees it
+        metrics.increment('emergency.cell_guidance', tags={'outcome': 'hit' if warmed is not None else 'miss'})
+        return warmed
 
-        except Exception as e:
-            current_app.logger.error(f"Error fetching emergency resources: {str(e)}", exc_info=True)
-            return {
-                'police': [],
-                'hospitals': [],
-                'safe_places': [],
-                '_error': str(e)
-            }
+    def warm_cell(self, location: Dict[str, float], when: datetime = None) -> bool:
+        """Generate and cache a cell's guidance for the hour of `when` (blocking)
 
-    async def _fetch_resource(
-        self, 
-        session: aiohttp.ClientSession,
-        resource_type: str,
-        location: Dict[str, float],
-        radius: float
-    ) -> List[Dict]:
-        """Fetch a specific resource type"""
-        try:
-            async with session.get(
-                self.emergency_endpoints[resource_type],
-                params={
-                    '$where': f"within_circle(location, {location['lat']}, {location['lng']}, {radius})"
-                }
-            ) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    current_app.logger.error(f"Error fetching {resource_type}: {response.status}")
-                    return []
-        except Exception as e:
-            current_app.logger.error(f"Error fetching {resource_type}: {str(e)}")
-            return []
+        Returns False if it was already cached or the model failed.
+        """
+        when = when or datetime.now()
+        cache = get_response_cache()
+        key = cache.make_key(EMERGENCY_TEMPLATE, location, when=when)
+        if cache.get(EMERGENCY_TEMPLATE, key) is not None:
+            return False
+
+        center = cell_center(location)
+        resources = {
+            'police': self._process_police_stations(get_resource_index().nearest(center, 'police')),
+            'hospitals': self._process_hospitals(get_resource_index().nearest(center, 'hospitals')),
+            'safe_places': self._process_safe_places(get_resource_index().nearest(center, 'safe_places'))
+        }
+        response = self._generate_emergency_response(
+            center, resources, priority='background', template=EMERGENCY_TEMPLATE, when=when
+        )
+        if response.get('source') == 'fallback':
+            return False
+        cache.set(EMERGENCY_TEMPLATE, key, {
+            'guidance': response['guidance'],
+            'actions': response['actions'],
+            'emergency_contacts': response['emergency_contacts'],
+            'warmed_at': datetime.now().isoformat()
+        })
+        return True
+
+    async def personalized_guidance(self, guidance_id: str, wait: float = 0) -> Optional[Dict[str, Any]]:
+        """Follow-up for handle_emergency: the model's guidance once ready
 
-    async def _generate_emergency_response(
+        Waits up to `wait` seconds. Returns {'guidance_status': 'pending'}
+        while it is still generating and None for an unknown or expired id.
+        """
+        with _pending_lock:
+            entry = _pending_guidance.get(guidance_id)
+        if entry is None:
+            return None
+
+        pending = entry[1]
+        if not pending.done() and wait > 0:
+            try:
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(pending)), wait)
+            except Exception:
+                pass
+        if not pending.done():
+            return {'guidance_id': guidance_id, 'guidance_status': 'pending'}
+        return {'guidance_id': guidance_id, **self._personalized_fields(pending.result())}
+
+    def _start_personalized_guidance(
         self,
         location: Dict[str, float],
         resources: Dict[str, List[Dict]],
         user_report: str = None
+    ) -> Tuple[str, Future]:
+        """Generate the model's guidance on the llm pool; returns its follow-up id"""
+        guidance_id = uuid.uuid4().hex
+        # On the emergency lane, not the llm pool analysis traffic fills. The
+        # model call itself is scheduled as 'emergency' and uses the model's
+        # reserved slots; its wait shows up in emergency_lane.stats()['model'].
+        pending = emergency_lane.submit(self._generate_emergency_response, location, resources, user_report)
+
+        now = time.monotonic()
+        with _pending_lock:
+            expired = [key for key, (created, _) in _pending_guidance.items()
+                       if now - created > Config.SOS_GUIDANCE_TTL_SECONDS]
+            for key in expired:
+                del _pending_guidance[key]
+            _pending_guidance[guidance_id] = (now, pending)
+        return guidance_id, pending
+
+    def _personalized_fields(self, response: Any) -> Dict[str, Any]:
+        """Response fields replacing the local guidance once the model has answered"""
+        guidance = _valid_guidance(response)
+        if guidance is None or response.get('source') == 'fallback':
+            # The model failed or answered out of shape; the local guidance already sent stands
+            return {'guidance_status': 'unavailable'}
+        return {
+            'guidance': guidance['guidance'],
+            'immediate_actions': guidance['actions'],
+            'emergency_contacts': guidance['emergency_contacts'],
+            'source': 'model',
+            'guidance_status': 'ready'
+        }
+
+    async def _get_emergency_resources(
+        self, 
+        location: Dict[str, float]
+    ) -> Dict[str, List[Dict]]:
+        """Nearest emergency resources from the local snapshot; no upstream calls"""
+        nearest = get_resource_index().nearby(location)
+        return {
+            'police': self._process_police_stations(nearest['police']),
+            'hospitals': self._process_hospitals(nearest['hospitals']),
+            'safe_places': self._process_safe_places(nearest['safe_places'])
+        }
+
+    def _generate_emergency_response(
+        self,
+        location: Dict[str, float],
+        resources: Dict[str, List[Dict]],
+        user_report: str = None,
+        priority: str = 'emergency',
+        template: str = None,
+        when: datetime = None
     ) -> Dict[str, Any]:
-        """Generate emergency response using Gemini"""
+        """Generate emergency response using Gemini (blocking; runs on the llm pool)"""
         prompt = f"""
         Generate immediate emergency guidance for a person in distress.
         
         Location: {location}
-        Time: {datetime.now().strftime('%H:%M')}
+        Time: {(when or datetime.now()).strftime('%H:%M')}
         
-        Available Resources:
-        - Police Stations: {len(resources['police'])}
-        - Hospitals: {len(resources['hospitals'])}
-        - Safe Places: {len(resources['safe_places'])}
+        Nearest Resources:
+        - Police Stations: {self._describe(resources['police'])}
+        - Hospitals: {self._describe(resources['hospitals'])}
+        - Safe Places: {self._describe(resources['safe_places'])}
         
         User Report: {user_report if user_report else 'No specific report provided'}
         
@@ -143,10 +265,46 @@ class EmergencyService:
         """
         
         try:
-            response = self.model.generate_content(prompt)
-            return json.loads(response.text)
-        except:
-            return self._get_fallback_emergency_guidance()
+            response = model_registry.generate(
+                prompt,
+                self.model_name,
+                priority=priority,
+                call_site='emergency_guidance',
+                template=template
+            )
+            guidance = _valid_guidance(json.loads(response.text))
+            if guidance is None:
+                raise ValueError("Emergency guidance is missing fields")
+            return guidance
+        except ValueError:
+            # Unparseable (JSONDecodeError is a ValueError) or out of shape
+            record_parse_failure('emergency_guidance', template)
+            return {**self._get_fallback_emergency_guidance(), 'source': 'fallback'}
+        except Exception as e:
+            record_fallback('emergency_guidance', template, error=e)
+            return {**self._get_fallback_emergency_guidance(), 'source': 'fallback'}
+
+    def _describe(self, places: List[Dict]) -> str:
+        """`name (distance)` list for prompts and guidance"""
+        if not places:
+            return 'none known nearby'
+        return ', '.join(f"{place['name']} ({place['distance']})" for place in places)
+
+    def _local_emergency_guidance(self, resources: Dict[str, List[Dict]]) -> Dict[str, Any]:
+        """Deterministic guidance naming the nearest resources"""
+        guidance = self._get_fallback_emergency_guidance()
+        steps = ["Call 911 if you are in immediate danger"]
+        if resources['safe_places']:
+            place = resources['safe_places'][0]
+            steps.append(f"Nearest safe place: {place['name']}, {place['address']} ({place['distance']})")
+        if resources['police']:
+            station = resources['police'][0]
+            steps.append(f"Nearest police: {station['name']}, {station['address']} ({station['distance']})")
+        if resources['hospitals']:
+            hospital = resources['hospitals'][0]
+            steps.append(f"Nearest hospital: {hospital['name']}, {hospital['address']} ({hospital['distance']})")
+        steps.extend(step for step in guidance['guidance'] if 'Call 911' not in step)
+        return {**guidance, 'guidance': steps}
 
     def _process_police_stations(self, stations: List[Dict]) -> List[Dict]:
         """Process police station data"""
@@ -214,4 +372,19 @@ class EmergencyService:
                 "415-206-8000 - SF General Hospital",
                 "415-353-6255 - UCSF Emergency"
             ]
-        }
\ No newline at end of file
+        }
+
+    def _get_fallback_emergency_response(self, location: Dict[str, float] = None) -> Dict[str, Any]:
+        """handle_emergency's answer when even the local path failed"""
+        guidance = self._get_fallback_emergency_guidance()
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'location': location,
+            'guidance': guidance['guidance'],
+            'resources': {'police': [], 'hospitals': [], 'safe_places': []},
+            'immediate_actions': guidance['actions'],
+            'emergency_contacts': guidance['emergency_contacts'],
+            'source': 'fallback',
+            'guidance_id': None,
+            'guidance_status': 'unavailable'
+        }
@@ -0,0 +1,89 @@
+# backend/app/services/emergency_warmer.py
+
+from typing import Any, Dict, Optional
+from datetime import datetime, timedelta
+import logging
+import threading
+import time
+from ..config import Config
+from ..utils.metrics import metrics
+from .resource_index import get_resource_index
+
+
+class EmergencyCacheWarmer:
+    """Keeps warmed SOS guidance ready for every populated grid cell
+
+    Populated cells are the ones holding a police station, hospital or
+    safe place in the local snapshot. Each pass fills the current and the
+    next hour bucket, skipping cells already cached, so by the time an
+    hour starts its guidance is usually in place and an SOS is a single
+    cache read. Generation runs at background priority.
+    """
+
+    def __init__(self, emergency_service, max_cells: int = None):
+        self.logger = logging.getLogger(__name__)
+        self.emergency_service = emergency_service
+        self.max_cells = max_cells or Config.EMERGENCY_WARM_MAX_CELLS
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def warm(self, when: datetime = None) -> int:
+        """One pass over the populated cells for the hour of `when` and the next; returns entries written"""
+        when = when or datetime.now()
+        populated = get_resource_index().populated_cells(Config.RESPONSE_CACHE_CELL_DEGREES)
+        cells = populated[:self.max_cells]
+        started = time.monotonic()
+        warmed = failed = 0
+
+        for bucket in (when, when + timedelta(hours=Config.RESPONSE_CACHE_HOUR_BUCKET)):
+            for cell in cells:
+                try:
+                    if self.emergency_service.warm_cell(cell, bucket):
+                        warmed += 1
+                except Exception as e:
+                    failed += 1
+                    self.logger.error(f"Warming emergency guidance for {cell} failed: {str(e)}")
+
+        metrics.increment('emergency.warmed_cells', warmed)
+        metrics.observe('emergency.warm_pass_ms', (time.monotonic() - started) * 1000)
+        self.last_run = {
+            'at': datetime.now().isoformat(),
+            'cells': len(cells),
+            'populated_cells': len(populated),
+            'warmed': warmed,
+            'failed': failed
+        }
+        self.logger.info(f"Emergency cache warm pass: {self.last_run}")
+        return warmed
+
+    def stats(self) -> Dict[str, Any]:
+        """Last pass, and how often an SOS actually found warmed guidance"""
+        counts = {'hit': 0, 'miss': 0, 'timeout': 0}
+        for series in metrics.snapshot()['counters'].get('emergency.cell_guidance', []):
+            counts[series['tags'].get('outcome')] = counts.get(series['tags'].get('outcome'), 0) + series['value']
+        # A lookup that ran out of SOS budget served local guidance, like a miss
+        total = counts['hit'] + counts['miss'] + counts['timeout']
+        return {
+            'last_run': self.last_run,
+            'sos_hits': counts['hit'],
+            'sos_misses': counts['miss'],
+            'sos_timeouts': counts['timeout'],
+            'sos_hit_rate': counts['hit'] / total if total else 0.0
+        }
+
+    def start(self, interval_seconds: float = None):
+        """Run warm passes in a daemon thread"""
+        interval = interval_seconds or Config.EMERGENCY_WARM_INTERVAL_SECONDS
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        def run():
+            while True:
+                try:
+                    self.warm()
+                except Exception as e:
+                    self.logger.error(f"Emergency cache warm pass failed: {str(e)}")
+                time.sleep(interval)
+
+        self._thread = threading.Thread(target=run, name='emergency-warmer', daemon=True)
+        self._thread.start()
@@ -1,10 +1,33 @@
 # backend/app/services/gemini_service.py
 
-import google.generativeai as genai
 import os
-from typing import Dict, List, Any
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
 import json
+import asyncio
+import threading
+from concurrent.futures import Future
 from datetime import datetime
+from ..config import Config
+from ..utils.batching import MicroBatcher
+from ..utils.executors import get_executor
+from ..utils.incremental_json import IncrementalJSONParser
+from .model_registry import model_registry, TEXT_MODEL
+from .llm_scheduler import llm_scheduler
+from .response_cache import get_response_cache, cell_center
+from .prompt_context import route_context
+from .llm_usage import record_cache_hit, record_fallback, record_parse_failure
+from .corridor_scorer import CorridorScorer, METERS_PER_DEGREE_LAT
+from .safety_analyzer import SafetyAnalyzer
+
+# Prompt template ids, part of every response cache key
+ROUTE_TEMPLATE = 'route_analysis.v2'
+AREA_TEMPLATE = 'area_analysis.v2'
+AREA_BATCH_TEMPLATE = 'area_batch.v1'
+
+AREA_SCHEMA = (
+    '{"area_safety_score":<0-100>,"risk_level":"low|medium|high","immediate_risks":[<=3],'
+    '"safe_spaces":[<=3],"recommended_actions":[<=3],"emergency_services":[<=3],"confidence_score":<0-1>}'
+)
 
 class GeminiServiceError(Exception):
     """Custom exception for GeminiService errors"""
@@ -15,126 +38,365 @@ class GeminiService:
         if not api_key:
             raise ValueError("Gemini API key is required")
         
-        # Configure with just the API key
-        genai.configure(api_key=api_key)
-        
-        # Configure generation parameters
-        self.generation_config = {
-            "temperature": 0.7,
-            "top_p": 0.8,
-            "top_k": 40,
-            "max_output_tokens": 2048,
-        }
-        
-        # Create models with the configuration
-        self.text_model = genai.GenerativeModel(
-            model_name='gemini-pro',
-            generation_config=self.generation_config
-        )
-        
-        self.vision_model = genai.GenerativeModel(
-            model_name='gemini-pro-vision',
-            generation_config=self.generation_config
+        # Models, generation configs and concurrency live in the registry
+        model_registry.configure(api_key)
+        self.model_name = TEXT_MODEL
+
+        # Area requests arriving close together share one prompt
+        self.area_batcher = MicroBatcher(
+            self._analyze_area_batch,
+            get_executor('llm'),
+            window_ms=Config.AREA_BATCH_WINDOW_MS,
+            max_items=Config.AREA_BATCH_MAX_ITEMS,
+            name='area-batch',
+            # Queue for a scheduler slot before taking an llm pool thread
+            admit=lambda: llm_scheduler.request('background'),
+            release=lambda: llm_scheduler.release('background')
         )
+        # Pending background enrichments by area cache key
+        self._enrichments: Dict[str, Future] = {}
+        self._enrichments_lock = threading.Lock()
+
+        # Local data behind the instant area score
+        self.safety_analyzer = SafetyAnalyzer(api_key)
+        self.area_scorer = CorridorScorer()
 
-    def analyze_route(self, route_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def analyze_route(self, route_data: Dict[str, Any], use_cache: bool = False) -> Dict[str, Any]:
         """Analyze route safety using Gemini Pro."""
+        cache = get_response_cache()
+        cache_key = cache.make_key(
+            ROUTE_TEMPLATE,
+            route_data.get('start_coords') or route_data['start_location'],
+            route_data.get('end_coords') or route_data['end_location']
+        )
+        if use_cache:
+            cached = await cache.aget(ROUTE_TEMPLATE, cache_key)
+            if cached is not None:
+                record_cache_hit('route_analysis', ROUTE_TEMPLATE)
+                return cached
+
+        analysis = await self._generate_route_analysis(
+            route_data,
+            on_late=self._late_cache_fill(ROUTE_TEMPLATE, cache_key, self._get_fallback_analysis())
+        )
+        # Never pin a fallback answer in the cache
+        if analysis != self._get_fallback_analysis():
+            await cache.aset(ROUTE_TEMPLATE, cache_key, analysis)
+        return analysis
+
+    def _late_cache_fill(self, template: str, cache_key: str, fallback: Dict[str, Any]):
+        """Callback caching a model answer that arrives after its deadline."""
+        def fill(response):
+            if response and response.text:
+                analysis = self._parse_response(response.text)
+                if analysis != fallback and analysis != self._get_fallback_analysis():
+                    get_response_cache().set(template, cache_key, analysis)
+        return fill
+
+    def _route_prompt(self, route_data: Dict[str, Any]) -> str:
+        current_hour = datetime.now().hour
+        time_context = "during daylight hours" if 6 <= current_hour <= 18 else "during night hours"
+
+        context = route_context(route_data, route_data.get('local_analysis'))
+        return f"""Assess pedestrian safety of this walking route {time_context}.
+local_* values are scores (0-100, higher is safer) from city incident and lighting data.
+{context.render()}
+Reply with JSON only, short strings:
+{{"safety_score":<0-100>,"risk_level":"low|medium|high","primary_concerns":[<=3],"recommendations":[3-5],"safe_spots":[],"emergency_resources":[],"safer_alternatives":[],"confidence_score":<0-1>}}"""
+
+    async def _generate_route_analysis(self, route_data: Dict[str, Any], on_late=None) -> Dict[str, Any]:
+        """Run the route analysis prompt against the model."""
         try:
-            current_hour = datetime.now().hour
-            time_context = "during daylight hours" if 6 <= current_hour <= 18 else "during night hours"
-            
-            prompt = f"""
-            You are a safety analysis expert. Analyze this walking route {time_context}.
-            
-            Route Details:
-            - Starting Point: {route_data['start_location']}
-            - Destination: {route_data['end_location']}
-            - Time: {route_data['time_of_day']}
-            - Distance: {route_data['distance']}
-            - Weather: {route_data.get('weather', 'Unknown')}
-            
-            Considering the current time ({time_context}), provide a comprehensive safety assessment.
-            Focus on:
-            1. Route characteristics (main vs side streets, visibility)
-            2. Area safety statistics and known risk factors
-            3. Public transportation and emergency service access
-            4. Pedestrian activity and natural surveillance
-            5. Environmental factors (lighting, weather impact)
-            
-            Return a detailed JSON with this exact structure:
-            {{
-                "safety_score": <number 0-100>,
-                "risk_level": <"low"|"medium"|"high">,
-                "primary_concerns": [<list of top 3 safety concerns>],
-                "recommendations": [<list of 3-5 specific safety tips>],
-                "safe_spots": [<list of safe locations along route>],
-                "emergency_resources": [<list of nearby emergency services>],
-                "safer_alternatives": [<optional safer route suggestions>],
-                "confidence_score": <number 0.0-1.0>
-            }}
-            
-            Focus on practical, actionable safety insights.
-            """
-            response = self.text_model.generate_content(
-                prompt,
-                generation_config=self.generation_config,
+            response = await model_registry.generate_async(
+                self._route_prompt(route_data),
+                self.model_name,
+                call_site='route_analysis',
+                template=ROUTE_TEMPLATE,
+                on_late=on_late,
                 safety_settings=[],
             )
             
             if not response or not response.text:
+                record_fallback('route_analysis', ROUTE_TEMPLATE, reason='empty')
                 return self._get_fallback_analysis()
                 
-            return self._parse_response(response.text)
+            return self._parse_response(response.text, 'route_analysis', ROUTE_TEMPLATE)
             
         except Exception as e:
             print(f"Error in analyze_route: {e}")
+            record_fallback('route_analysis', ROUTE_TEMPLATE, error=e)
             return self._get_fallback_analysis()
 
-    def analyze_area(self, location: Dict[str, float]) -> Dict[str, Any]:
-        """Analyze area safety using Gemini Pro."""
+    async def stream_route_analysis(
+        self,
+        route_data: Dict[str, Any],
+        use_cache: bool = False
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Route analysis as ('chunk', text) and ('field', {key: value}) events, then ('result', analysis)."""
+        cache = get_response_cache()
+        cache_key = cache.make_key(
+            ROUTE_TEMPLATE,
+            route_data.get('start_coords') or route_data['start_location'],
+            route_data.get('end_coords') or route_data['end_location']
+        )
+        cached = await cache.aget(ROUTE_TEMPLATE, cache_key) if use_cache else None
+        if cached is not None:
+            record_cache_hit('route_analysis', ROUTE_TEMPLATE)
+        events = self._replay(cached) if cached is not None else self._stream_analysis(
+            self._route_prompt(route_data),
+            'route_analysis',
+            self._get_fallback_analysis(),
+            ROUTE_TEMPLATE,
+            cache_key,
+            safety_settings=[]
+        )
+        async for event in events:
+            yield event
+
+    async def _stream_analysis(
+        self,
+        prompt: str,
+        call_site: str,
+        fallback: Dict[str, Any],
+        template: str,
+        cache_key: str,
+        **kwargs
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Forward model chunks and each JSON field as soon as it is complete."""
+        parser = IncrementalJSONParser()
+        error = None
         try:
-            current_hour = datetime.now().hour
-            time_context = "during daylight hours" if 6 <= current_hour <= 18 else "during night hours"
-            
-            prompt = f"""
-            Analyze the immediate safety of this location {time_context}:
-            Coordinates: Lat {location.get('lat')}, Lng {location.get('lng')}
-            
-            Provide a detailed safety assessment focusing on:
-            1. Area characteristics and safety profile
-            2. Current time and environmental conditions
-            3. Nearby safe spaces and emergency services
-            4. Public transportation access
-            5. General safety recommendations
-            
-            Return analysis as JSON with this exact structure:
-            {{
-                "area_safety_score": <number 0-100>,
-                "risk_level": <"low"|"medium"|"high">,
-                "immediate_risks": [<list of current safety concerns>],
-                "safe_spaces": [<list of nearby safe locations>],
-                "recommended_actions": [<list of immediate safety steps>],
-                "emergency_services": [<list of nearby emergency resources>],
-                "confidence_score": <number 0.0-1.0>
-            }}
-            """
-
-            response = self.text_model.generate_content(
-                prompt,
-                generation_config=self.generation_config
+            async for chunk in model_registry.stream(
+                prompt, self.model_name, call_site=call_site, template=template, **kwargs
+            ):
+                yield 'chunk', chunk
+                for key, value in parser.feed(chunk):
+                    yield 'field', {key: value}
+        except Exception as e:
+            print(f"Error streaming {call_site}: {e}")
+            error = e
+
+        if parser.complete and parser.fields:
+            await get_response_cache().aset(template, cache_key, parser.fields)
+            yield 'result', parser.fields
+        else:
+            if error is None:
+                record_parse_failure(call_site, template)
+            else:
+                record_fallback(call_site, template, error=error)
+            # Cut short: fields already sent stand, the fallback fills the rest
+            yield 'result', {**fallback, **parser.fields}
+
+    async def _replay(self, analysis: Dict[str, Any]) -> AsyncIterator[Tuple[str, Any]]:
+        """Events for an analysis that is already complete (cache hits)."""
+        for key, value in analysis.items():
+            yield 'field', {key: value}
+        yield 'result', analysis
+
+    async def analyze_area(self, location: Dict[str, float], use_cache: bool = True) -> Dict[str, Any]:
+        """Area safety: the model's answer if cached, otherwise an instant local score.
+
+        A local answer (source 'local') starts a background model
+        enrichment for the same grid cell and hour; enriched_area()
+        returns it once it is cached.
+        """
+        if use_cache:
+            cache = get_response_cache()
+            cached = await cache.aget(AREA_TEMPLATE, cache.make_key(AREA_TEMPLATE, location))
+            if cached is not None:
+                record_cache_hit('area_analysis', AREA_TEMPLATE)
+                return {**cached, 'source': 'model'}
+
+        self.enrich_area(location)
+        return await self.local_area_analysis(location)
+
+    async def local_area_analysis(self, location: Dict[str, float]) -> Dict[str, Any]:
+        """Deterministic area analysis from SF open data, in the area analysis schema."""
+        radius = Config.AREA_LOCAL_RADIUS_METERS
+        pad = radius / METERS_PER_DEGREE_LAT * 2
+        is_night = not 6 <= datetime.now().hour <= 18
+        try:
+            # Past the budget the fetch keeps going and warms the cache for the next call
+            data = await self.safety_analyzer.collect_corridor_data(
+                location['lat'] - pad, location['lat'] + pad,
+                location['lng'] - pad, location['lng'] + pad,
+                budget_ms=Config.AREA_LOCAL_BUDGET_MS
             )
-            
-            if not response or not response.text:
-                return self._get_fallback_area_analysis()
-                
-            return self._parse_response(response.text)
-            
         except Exception as e:
-            print(f"Error in analyze_area: {e}")
-            return self._get_fallback_area_analysis()
+            print(f"Local area data unavailable: {e}")
+            return {**self._get_fallback_area_analysis(), 'confidence_score': 0.3, 'source': 'local'}
+
+        area = self.area_scorer.score_area((location['lat'], location['lng']), data, radius, is_night)
+        names = data.safe_spaces.attributes.get('business_name', [])
+        score = round(area['score'])
+
+        risks, actions = [], []
+        if area['incidents']:
+            risks.append(f"{area['incidents']} incidents reported nearby in the last 30 days")
+            actions.append("Stay alert and keep to busier streets")
+        if area['lights'] == 0:
+            risks.append("No street lighting recorded nearby")
+        elif area['working_lights'] < area['lights']:
+            risks.append(f"{area['lights'] - area['working_lights']} nearby street lights not working")
+        if is_night and area['working_lights'] == 0:
+            actions.append("Prefer a better lit route after dark")
+        actions.append("Stay aware of surroundings")
+
+        return {
+            "area_safety_score": score,
+            "risk_level": "low" if score >= 75 else "medium" if score >= 50 else "high",
+            "immediate_risks": risks,
+            "safe_spaces": [str(names[i]) for i in area['safe_spaces'] if names[i]][:3],
+            "recommended_actions": actions,
+            "emergency_services": [],
+            "confidence_score": 0.6,
+            "source": 'local'
+        }
+
+    def enrich_area(self, location: Dict[str, float]) -> Future:
+        """Start (or join) the background model analysis for a location's grid cell and hour."""
+        cache_key = get_response_cache().make_key(AREA_TEMPLATE, location)
+        with self._enrichments_lock:
+            pending = self._enrichments.get(cache_key)
+            if pending is not None:
+                return pending
+            future = self.area_batcher.submit(cell_center(location), key=cache_key)
+            self._enrichments[cache_key] = future
+        future.add_done_callback(self._enriched(cache_key))
+        return future
+
+    def _enriched(self, cache_key: str):
+        """Callback caching a finished enrichment."""
+        def store(future: Future):
+            with self._enrichments_lock:
+                self._enrichments.pop(cache_key, None)
+            if future.cancelled() or future.exception() is not None:
+                print(f"Area enrichment failed: {future.exception() if not future.cancelled() else 'cancelled'}")
+            elif future.result() is not None:
+                get_response_cache().set(AREA_TEMPLATE, cache_key, future.result())
+        return store
+
+    async def enriched_area(self, location: Dict[str, float], wait: float = 0) -> Optional[Dict[str, Any]]:
+        """The model's area analysis once cached, waiting up to `wait` seconds; None while pending."""
+        cache = get_response_cache()
+        cache_key = cache.make_key(AREA_TEMPLATE, location)
+        cached = await cache.aget(AREA_TEMPLATE, cache_key)
+        if cached is None:
+            pending = self.enrich_area(location)
+            if wait > 0:
+                try:
+                    # Shielded: a poll giving up must not cancel the enrichment
+                    await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(pending)), wait)
+                except Exception:
+                    pass
+                cached = await cache.aget(AREA_TEMPLATE, cache_key)
+        return {**cached, 'source': 'model'} if cached is not None else None
+
+    def _area_prompt(self, location: Dict[str, float]) -> str:
+        current_hour = datetime.now().hour
+        time_context = "during daylight hours" if 6 <= current_hour <= 18 else "during night hours"
+
+        return f"""Assess immediate pedestrian safety at lat {location.get('lat')}, lng {location.get('lng')} {time_context}.
+Reply with JSON only, short strings:
+{AREA_SCHEMA}"""
+
+    async def stream_area_analysis(self, location: Dict[str, float]) -> AsyncIterator[Tuple[str, Any]]:
+        """Area analysis as chunk and field events, then ('result', analysis); never batched."""
+        cache = get_response_cache()
+        cache_key = cache.make_key(AREA_TEMPLATE, location)
+        cached = await cache.aget(AREA_TEMPLATE, cache_key)
+        if cached is not None:
+            record_cache_hit('area_analysis', AREA_TEMPLATE)
+        events = self._replay(cached) if cached is not None else self._stream_analysis(
+            self._area_prompt(cell_center(location)),
+            'area_analysis',
+            self._get_fallback_area_analysis(),
+            AREA_TEMPLATE,
+            cache_key
+        )
+        async for event in events:
+            yield event
 
-    def _parse_response(self, text: str) -> Dict[str, Any]:
-        """Parse Gemini response and extract JSON."""
+    def _analyze_area_batch(self, locations: List[Dict[str, float]]) -> List[Optional[Dict[str, Any]]]:
+        """Background enrichment: one prompt for every area in the batch.
+
+        Lone areas, and every area of a batch whose answer cannot be split,
+        get the single-area prompt.
+        """
+        if len(locations) == 1:
+            return [self._analyze_single_area(locations[0])]
+
+        current_hour = datetime.now().hour
+        time_context = "during daylight hours" if 6 <= current_hour <= 18 else "during night hours"
+        listed = '\n'.join(
+            f"{i}: lat {location['lat']}, lng {location['lng']}"
+            for i, location in enumerate(locations)
+        )
+
+        prompt = f"""Assess immediate pedestrian safety at each location {time_context}.
+{listed}
+Reply with a JSON array only, one object per location in order, each adding "index":<location number> to:
+{AREA_SCHEMA}"""
+
+        response = model_registry.generate(
+            prompt,
+            self.model_name,
+            priority='background',
+            call_site='area_batch',
+            template=AREA_BATCH_TEMPLATE,
+            admitted=True
+        )
+        try:
+            return self._parse_batch_response(response.text, len(locations))
+        except ValueError:
+            record_parse_failure('area_batch', AREA_BATCH_TEMPLATE)
+
+        results = []
+        for location in locations:
+            try:
+                results.append(self._analyze_single_area(location))
+            except Exception as e:
+                # Only this area's enrichment is lost; the others still get theirs
+                print(f"Area analysis failed for {location}: {e}")
+                results.append(None)
+        return results
+
+    def _analyze_single_area(self, location: Dict[str, float]) -> Optional[Dict[str, Any]]:
+        """Single-area prompt under the batch's admission; None if the answer is unparseable."""
+        response = model_registry.generate(
+            self._area_prompt(location),
+            self.model_name,
+            priority='background',
+            call_site='area_analysis',
+            template=AREA_TEMPLATE,
+            admitted=True
+        )
+        analysis = self._parse_response(response.text, 'area_analysis', AREA_TEMPLATE)
+        # An unparseable answer is not worth caching
+        return None if analysis == self._get_fallback_analysis() else analysis
+
+    def _parse_batch_response(self, text: str, expected: int) -> List[Dict[str, Any]]:
+        """Split a JSON-array answer back into per-location analyses."""
+        start_idx = text.find('[')
+        end_idx = text.rfind(']') + 1
+        if start_idx == -1 or end_idx == 0:
+            raise ValueError("No JSON array in batch response")
+
+        items = json.loads(text[start_idx:end_idx])
+        if not isinstance(items, list) or len(items) != expected:
+            raise ValueError(f"Expected {expected} analyses in batch response")
+
+        by_index = {item.get('index'): item for item in items if isinstance(item, dict)}
+        ordered = [by_index.get(i) for i in range(expected)]
+        if any(item is None for item in ordered):
+            raise ValueError("Batch response is missing locations")
+
+        for item in ordered:
+            item.pop('index', None)
+        return ordered
+
+    def _parse_response(self, text: str, call_site: str = None, template: str = None) -> Dict[str, Any]:
+        """Parse Gemini response and extract JSON; failures are counted against call_site."""
         try:
             # Find JSON in response
             start_idx = text.find('{')
@@ -142,9 +404,11 @@ class GeminiService:
             if start_idx != -1 and end_idx != -1:
                 json_str = text[start_idx:end_idx]
                 return json.loads(json_str)
-            return self._get_fallback_analysis()
         except json.JSONDecodeError:
-            return self._get_fallback_analysis()
+            pass
+        if call_site:
+            record_parse_failure(call_site, template)
+        return self._get_fallback_analysis()
 
     def _get_fallback_analysis(self) -> Dict[str, Any]:
         """Provide fallback route analysis if AI fails."""
@@ -0,0 +1,177 @@
+# backend/app/services/geocoding_service.py
+
+from typing import Dict, Any, Optional
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import threading
+import googlemaps
+from ..models import db, GeocodeCache, Route
+from ..config import Config
+from ..utils.cache import TTLCache
+from ..utils.executors import run_blocking
+from ..utils.metrics import metrics
+from .route_analysis_store import snap_location
+
+# Hot addresses stay in memory in front of the database table
+_memory_cache = TTLCache(ttl_seconds=3600, max_entries=10000)
+# Memory hits not yet added to the table's hit counters, by key
+_pending_hits: Dict[str, int] = {}
+_pending_lock = threading.Lock()
+
+
+class GeocodingService:
+    """Forward and reverse geocoding behind a persistent cache"""
+
+    def __init__(self, gmaps_key: str = None):
+        self.logger = logging.getLogger(__name__)
+        self.ttl = timedelta(days=Config.GEOCODE_TTL_DAYS)
+        self.gmaps = googlemaps.Client(key=gmaps_key) if gmaps_key else None
+
+    @staticmethod
+    def forward_key(address: str) -> str:
+        return f"fwd:{snap_location(address)}"
+
+    @staticmethod
+    def reverse_key(location: Dict[str, float]) -> str:
+        # ~11m grid is plenty for a display address
+        return f"rev:{snap_location(location, precision=4)}"
+
+    async def geocode(self, address: str, cached_only: bool = False) -> Optional[Dict[str, Any]]:
+        """Resolve a free-text address to lat/lng; cached_only never calls upstream"""
+        key = self.forward_key(address)
+        result = self._lookup(key)
+        if result is not None or self.gmaps is None or cached_only:
+            return result
+
+        try:
+            results = await run_blocking('maps', self.gmaps.geocode, address)
+        except Exception as e:
+            self.logger.error(f"Geocoding failed for '{address}': {str(e)}")
+            return None
+
+        if not results:
+            return None
+
+        location = results[0]['geometry']['location']
+        return self._store(key, location['lat'], location['lng'], results[0].get('formatted_address'))
+
+    async def reverse_geocode(self, location: Dict[str, float]) -> Optional[Dict[str, Any]]:
+        """Resolve lat/lng to a display address"""
+        key = self.reverse_key(location)
+        result = self._lookup(key)
+        if result is not None or self.gmaps is None:
+            return result
+
+        try:
+            results = await run_blocking(
+                'maps',
+                self.gmaps.reverse_geocode,
+                (location['lat'], location['lng'])
+            )
+        except Exception as e:
+            self.logger.error(f"Reverse geocoding failed for {location}: {str(e)}")
+            return None
+
+        if not results:
+            return None
+
+        return self._store(key, location['lat'], location['lng'], results[0].get('formatted_address'))
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Memory, then database; None on a miss"""
+        kind = key[:3]
+        result = _memory_cache.get(key)
+        if result is not None:
+            metrics.increment('geocode.lookups', tags={'kind': kind, 'source': 'memory'})
+            self._count_hit(key)
+            return result
+
+        try:
+            entry = GeocodeCache.query.filter_by(query_key=key).first()
+            if entry is None or entry.expires_at < datetime.utcnow():
+                metrics.increment('geocode.lookups', tags={'kind': kind, 'source': 'miss'})
+                return None
+
+            entry.hits = (entry.hits or 0) + 1
+            entry.last_used_at = datetime.utcnow()
+            db.session.commit()
+
+            result = entry.to_dict()
+            _memory_cache.set(key, result)
+            metrics.increment('geocode.lookups', tags={'kind': kind, 'source': 'db'})
+            return result
+
+        except Exception as e:
+            db.session.rollback()
+            self.logger.error(f"Geocode cache lookup failed: {str(e)}")
+            return None
+
+    def _count_hit(self, key: str):
+        """Record a memory hit; the table is updated once enough have piled up"""
+        with _pending_lock:
+            _pending_hits[key] = _pending_hits.get(key, 0) + 1
+            due = sum(_pending_hits.values()) >= Config.GEOCODE_HIT_FLUSH_EVERY
+        if due:
+            self.flush_hits()
+
+    def flush_hits(self) -> int:
+        """Add pending memory hits to the table's counters in one commit"""
+        with _pending_lock:
+            pending = dict(_pending_hits)
+            _pending_hits.clear()
+        if not pending:
+            return 0
+
+        try:
+            now = datetime.utcnow()
+            for entry in GeocodeCache.query.filter(GeocodeCache.query_key.in_(list(pending))):
+                entry.hits = (entry.hits or 0) + pending[entry.query_key]
+                entry.last_used_at = now
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            self.logger.error(f"Geocode hit count update failed: {str(e)}")
+            return 0
+        return sum(pending.values())
+
+    def _store(self, key: str, lat: float, lng: float, formatted_address: str = None) -> Dict[str, Any]:
+        """Upsert a resolved location into both cache layers"""
+        result = {'lat': lat, 'lng': lng, 'formatted_address': formatted_address}
+        _memory_cache.set(key, result)
+
+        try:
+            entry = GeocodeCache.query.filter_by(query_key=key).first()
+            if entry is None:
+                entry = GeocodeCache(query_key=key, hits=0)
+                db.session.add(entry)
+
+            entry.lat = lat
+            entry.lng = lng
+            entry.formatted_address = formatted_address
+            entry.expires_at = datetime.utcnow() + self.ttl
+            db.session.commit()
+
+        except Exception as e:
+            db.session.rollback()
+            self.logger.error(f"Geocode cache store failed: {str(e)}")
+
+        return result
+
+    async def preload_from_route_history(self, limit: int = 500) -> int:
+        """Warm the cache with every distinct endpoint in recent route history"""
+        routes = Route.query.order_by(Route.created_at.desc()).limit(limit).all()
+        addresses = {
+            address
+            for route in routes
+            for address in (route.start_location, route.end_location)
+            if address
+        }
+
+        # Lookups overlap; the maps pool bounds how many reach the API at once
+        results = await asyncio.gather(*(self.geocode(address) for address in addresses))
+        resolved = sum(1 for result in results if result is not None)
+        self.flush_hits()
+
+        self.logger.info(f"Preloaded {resolved}/{len(addresses)} geocodes from route history")
+        return resolved
@@ -0,0 +1,201 @@
+# backend/app/services/llm_scheduler.py
+
+from typing import Dict, Deque, Optional
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager, asynccontextmanager
+import asyncio
+import logging
+import threading
+import time
+from ..config import Config
+from ..utils.metrics import metrics
+
+# Lower number dispatches first
+PRIORITY_CLASSES = ('emergency', 'monitoring', 'interactive', 'background')
+
+
+class LLMShedError(Exception):
+    """A model call was dropped by the scheduler instead of queued or run"""
+    pass
+
+
+class _Ticket:
+    __slots__ = ('priority', 'future', 'queued_at')
+
+    def __init__(self, priority: str):
+        self.priority = priority
+        self.future = Future()
+        self.queued_at = time.monotonic()
+
+
+class LLMScheduler:
+    """Priority queue and token bucket in front of every model call
+
+    Waiting calls are dispatched strictly by class (emergency >
+    monitoring > interactive > background), each class capped at its own
+    concurrency. A call needs a token from the shared bucket, except
+    emergency calls, which may run the bucket into debt so they never
+    wait on quota. Classes with a queue limit shed new calls once full,
+    and classes with a max wait shed calls that have waited too long.
+    """
+
+    def __init__(
+        self,
+        rate_per_second: float = None,
+        burst: int = None,
+        concurrency: Dict[str, int] = None,
+        queue_limits: Dict[str, Optional[int]] = None,
+        max_wait_seconds: Dict[str, Optional[float]] = None
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.rate = rate_per_second or Config.LLM_RATE_PER_SECOND
+        self.burst = burst or Config.LLM_BURST
+        self.concurrency = concurrency or Config.LLM_CLASS_CONCURRENCY
+        self.queue_limits = queue_limits or Config.LLM_QUEUE_LIMITS
+        self.max_wait = max_wait_seconds or Config.LLM_MAX_WAIT_SECONDS
+
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+        self._waiting: Dict[str, Deque[_Ticket]] = {name: deque() for name in PRIORITY_CLASSES}
+        self._running: Dict[str, int] = {name: 0 for name in PRIORITY_CLASSES}
+        self._cond = threading.Condition()
+        self._timer: Optional[threading.Thread] = None
+
+    def request(self, priority: str) -> Future:
+        """Queue a call; the Future resolves once it may run"""
+        if priority not in self._waiting:
+            raise ValueError(f"Unknown priority class: {priority}")
+
+        with self._cond:
+            limit = self.queue_limits.get(priority)
+            if limit is not None and len(self._waiting[priority]) >= limit:
+                metrics.increment('llm.scheduler.shed', tags={'class': priority, 'reason': 'queue_full'})
+                raise LLMShedError(f"{priority} queue is full")
+
+            ticket = _Ticket(priority)
+            self._waiting[priority].append(ticket)
+            self._dispatch()
+            if not ticket.future.done():
+                self._ensure_timer()
+                self._cond.notify()
+            return ticket.future
+
+    def release(self, priority: str):
+        with self._cond:
+            self._running[priority] -= 1
+            self._dispatch()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _dispatch(self):
+        """Grant waiting calls in priority order; caller holds the lock"""
+        now = time.monotonic()
+        self._refill(now)
+
+        for priority in PRIORITY_CLASSES:
+            queue = self._waiting[priority]
+            max_wait = self.max_wait.get(priority)
+
+            while queue:
+                ticket = queue[0]
+                if ticket.future.cancelled():
+                    queue.popleft()
+                    continue
+                if max_wait is not None and now - ticket.queued_at > max_wait:
+                    queue.popleft()
+                    metrics.increment('llm.scheduler.shed', tags={'class': priority, 'reason': 'waited_too_long'})
+                    ticket.future.set_exception(LLMShedError(f"{priority} call waited over {max_wait}s"))
+                    continue
+                if self._running[priority] >= self.concurrency[priority]:
+                    break
+                if self._tokens < 1 and priority != 'emergency':
+                    # Out of quota: nothing below this class may jump ahead
+                    return
+
+                queue.popleft()
+                if not ticket.future.set_running_or_notify_cancel():
+                    continue
+                self._tokens -= 1
+                self._running[priority] += 1
+                metrics.observe('llm.scheduler.wait_ms', (now - ticket.queued_at) * 1000, tags={'class': priority})
+                ticket.future.set_result(priority)
+
+    def _ensure_timer(self):
+        if self._timer is None or not self._timer.is_alive():
+            self._timer = threading.Thread(target=self._run_timer, name='llm-scheduler', daemon=True)
+            self._timer.start()
+
+    def _next_wakeup(self) -> Optional[float]:
+        """Seconds until a token refills or a wait expires; None if neither matters"""
+        if not any(self._waiting.values()):
+            return None
+
+        now = time.monotonic()
+        waits = []
+        if self._tokens < 1:
+            waits.append((1 - self._tokens) / self.rate)
+        for priority, queue in self._waiting.items():
+            max_wait = self.max_wait.get(priority)
+            if queue and max_wait is not None:
+                waits.append(queue[0].queued_at + max_wait - now)
+        return max(0.01, min(waits)) if waits else None
+
+    def _run_timer(self):
+        """Re-dispatch as tokens refill and waits expire"""
+        with self._cond:
+            while True:
+                self._cond.wait(self._next_wakeup())
+                self._dispatch()
+
+    def _abandon(self, ticket: Future, priority: str):
+        # Granted in the meantime: hand the slot straight back
+        if not ticket.cancel() and ticket.exception() is None:
+            self.release(priority)
+
+    @contextmanager
+    def slot(self, priority: str, timeout: float = None):
+        """Block the calling thread until the call may run"""
+        ticket = self.request(priority)
+        try:
+            ticket.result(timeout)
+        except BaseException:
+            self._abandon(ticket, priority)
+            raise
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    async def acquire_async(self, priority: str, timeout: float = None):
+        """Await dispatch without holding a thread; the caller must release()"""
+        ticket = self.request(priority)
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(ticket)), timeout)
+        except BaseException:
+            self._abandon(ticket, priority)
+            raise
+
+    @asynccontextmanager
+    async def async_slot(self, priority: str, timeout: float = None):
+        """Await dispatch; gives up the slot on timeout or cancel"""
+        await self.acquire_async(priority, timeout)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._cond:
+            return {
+                priority: {
+                    'waiting': len(self._waiting[priority]),
+                    'running': self._running[priority]
+                }
+                for priority in PRIORITY_CLASSES
+            }
+
+
+llm_scheduler = LLMScheduler()
@@ -0,0 +1,90 @@
+# backend/app/services/llm_usage.py
+
+from typing import Any, Dict, Optional
+from ..utils.metrics import metrics
+
+# Counters feeding the per call site rollup, by summary field
+_COUNTERS = {
+    'llm.requests': 'requests',
+    'llm.cache_hits': 'cache_hits',
+    'llm.fallbacks': 'fallbacks',
+    'llm.parse_failures': 'parse_failures',
+    'llm.deadline_exceeded': 'deadline_exceeded',
+    'llm.hedged': 'hedged'
+}
+
+
+def usage_tags(call_site: str, template: Optional[str] = None) -> Dict[str, str]:
+    """Tags for every LLM metric; the template defaults to the call site"""
+    return {'call_site': call_site, 'template': template or call_site}
+
+
+def record_cache_hit(call_site: str, template: Optional[str] = None):
+    """A model answer served from cache instead of a call"""
+    metrics.increment('llm.cache_hits', tags=usage_tags(call_site, template))
+
+
+def record_fallback(call_site: str, template: Optional[str] = None, error: Exception = None, reason: str = None):
+    """A canned answer served instead of the model's, tagged with why"""
+    if reason is None:
+        from .llm_scheduler import LLMShedError
+        from .model_registry import LLMDeadlineExceeded
+        if isinstance(error, LLMDeadlineExceeded):
+            reason = 'deadline'
+        elif isinstance(error, LLMShedError):
+            reason = 'shed'
+        else:
+            reason = 'error'
+    metrics.increment('llm.fallbacks', tags={**usage_tags(call_site, template), 'reason': reason})
+
+
+def record_parse_failure(call_site: str, template: Optional[str] = None):
+    """The model answered but not with usable JSON; always ends in a fallback"""
+    metrics.increment('llm.parse_failures', tags=usage_tags(call_site, template))
+    record_fallback(call_site, template, reason='parse')
+
+
+def usage_summary() -> Dict[str, Dict[str, Any]]:
+    """Per `call_site/template` rollup of requests, tokens, latency, cache hits and failures"""
+    snapshot = metrics.snapshot()
+    rows: Dict[str, Dict[str, Any]] = {}
+
+    def row(tags: Dict[str, str]) -> Dict[str, Any]:
+        key = f"{tags.get('call_site')}/{tags.get('template')}"
+        if key not in rows:
+            rows[key] = {
+                'call_site': tags.get('call_site'),
+                'template': tags.get('template'),
+                'errors': 0,
+                'prompt_tokens': 0,
+                'output_tokens': 0,
+                'latency_ms': None,
+                'fallback_reasons': {},
+                **{field: 0 for field in _COUNTERS.values()}
+            }
+        return rows[key]
+
+    for name, field in _COUNTERS.items():
+        for entry in snapshot['counters'].get(name, []):
+            if 'call_site' not in entry['tags']:
+                continue
+            target = row(entry['tags'])
+            target[field] += int(entry['value'])
+            if name == 'llm.requests' and entry['tags'].get('outcome') == 'error':
+                target['errors'] += int(entry['value'])
+            if name == 'llm.fallbacks':
+                reason = entry['tags'].get('reason', 'error')
+                target['fallback_reasons'][reason] = target['fallback_reasons'].get(reason, 0) + int(entry['value'])
+
+    for name, field in (('llm.prompt_tokens', 'prompt_tokens'), ('llm.output_tokens', 'output_tokens')):
+        for entry in snapshot['timings'].get(name, []):
+            if 'call_site' in entry['tags']:
+                row(entry['tags'])[field] += round(entry['avg'] * entry['count'])
+
+    for entry in snapshot['timings'].get('llm.latency_ms', []):
+        if 'call_site' in entry['tags']:
+            row(entry['tags'])['latency_ms'] = {
+                key: entry[key] for key in ('count', 'avg', 'p50', 'p95', 'max')
+            }
+
+    return rows
@@ -0,0 +1,379 @@
+# backend/app/services/model_registry.py
+
+from typing import AsyncIterator, Dict, Any, Tuple, Callable, Optional
+from concurrent.futures import Future
+from contextlib import contextmanager
+import asyncio
+import logging
+import threading
+import time
+import google.generativeai as genai
+from ..config import Config
+from ..utils.metrics import metrics
+from ..utils.executors import get_executor
+from .llm_scheduler import llm_scheduler
+from .prompt_context import estimate_tokens, output_budget
+from .llm_usage import usage_tags
+
+TEXT_MODEL = 'gemini-pro'
+VISION_MODEL = 'gemini-pro-vision'
+
+# Named generation configs services can ask for
+GENERATION_CONFIGS: Dict[str, Dict[str, Any]] = {
+    'default': {
+        "temperature": 0.7,
+        "top_p": 0.8,
+        "top_k": 40,
+        "max_output_tokens": 2048,
+    }
+}
+
+
+class LLMDeadlineExceeded(Exception):
+    """No model response arrived before the call site's deadline"""
+    pass
+
+
+def deadline_for(call_site: str) -> float:
+    """Deadline in seconds for a call site"""
+    deadlines = Config.LLM_DEADLINES_MS
+    return deadlines.get(call_site, deadlines['default']) / 1000
+
+
+class ModelRegistry:
+    """Process-wide owner of configured Gemini models and their concurrency limits
+
+    genai.configure runs once per API key, each (model, config) pair is
+    built once and shared, and every call holds a slot of that model's
+    semaphore while it is in flight. Emergency calls draw on a separate
+    semaphore sized to the scheduler's emergency cap, so they never wait
+    behind lower classes for a model slot.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._api_key = None
+        self._models: Dict[Tuple[str, str], genai.GenerativeModel] = {}
+        self._limits: Dict[Tuple[str, str], threading.BoundedSemaphore] = {}
+
+    def configure(self, api_key: str):
+        """Configure the SDK; a no-op unless the key changed"""
+        if not api_key:
+            raise ValueError("Gemini API key is required")
+        with self._lock:
+            if api_key == self._api_key:
+                return
+            genai.configure(api_key=api_key)
+            self._api_key = api_key
+            self._models.clear()
+            self.logger.info("Gemini client configured")
+
+    def get_model(self, name: str = TEXT_MODEL, config: str = 'default') -> genai.GenerativeModel:
+        """Shared model instance for this name and generation config"""
+        key = (name, config)
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                model = self._models[key] = genai.GenerativeModel(
+                    model_name=name,
+                    generation_config=GENERATION_CONFIGS[config]
+                )
+            return model
+
+    def _limit(self, name: str, priority: str) -> threading.BoundedSemaphore:
+        pool = 'reserved' if priority == 'emergency' else 'shared'
+        with self._lock:
+            limit = self._limits.get((name, pool))
+            if limit is None:
+                if pool == 'reserved':
+                    size = Config.LLM_CLASS_CONCURRENCY['emergency']
+                else:
+                    size = Config.GEMINI_CONCURRENCY.get(name, Config.GEMINI_CONCURRENCY['default'])
+                limit = self._limits[(name, pool)] = threading.BoundedSemaphore(size)
+            return limit
+
+    @contextmanager
+    def slot(self, name: str, priority: str = 'interactive'):
+        """Hold one of the model's concurrency slots for the priority class"""
+        limit = self._limit(name, priority)
+        waited = time.monotonic()
+        limit.acquire()
+        metrics.observe('llm.queue_wait_ms', (time.monotonic() - waited) * 1000, tags={'model': name, 'class': priority})
+        try:
+            yield
+        finally:
+            limit.release()
+
+    def _call(
+        self,
+        contents,
+        name: str,
+        config: str,
+        call_site: str = 'default',
+        template: str = None,
+        priority: str = 'interactive',
+        **kwargs
+    ):
+        """generate_content with the call site's output budget, recording tokens and latency"""
+        model = self.get_model(name, config)
+        kwargs.setdefault('generation_config', {
+            **GENERATION_CONFIGS[config],
+            'max_output_tokens': output_budget(call_site)
+        })
+        tags = usage_tags(call_site, template)
+        prompt_text = contents if isinstance(contents, str) else ' '.join(
+            part for part in contents if isinstance(part, str)
+        )
+        metrics.observe('llm.prompt_tokens', estimate_tokens(prompt_text), tags=tags)
+
+        started = time.monotonic()
+        try:
+            if kwargs.get('stream'):
+                # The caller holds the slot until the stream is drained
+                response = model.generate_content(contents, **kwargs)
+            else:
+                with self.slot(name, priority):
+                    response = model.generate_content(contents, **kwargs)
+        except Exception:
+            metrics.increment('llm.requests', tags={**tags, 'outcome': 'error'})
+            raise
+        metrics.increment('llm.requests', tags={**tags, 'outcome': 'ok'})
+        if kwargs.get('stream'):
+            # Output is counted by the consumer once the stream is drained
+            return response
+
+        metrics.observe('llm.latency_ms', (time.monotonic() - started) * 1000, tags=tags)
+        try:
+            metrics.observe('llm.output_tokens', estimate_tokens(response.text), tags=tags)
+        except Exception:
+            # Blocked or empty candidates have no text
+            pass
+        return response
+
+    def generate(
+        self,
+        contents,
+        name: str = TEXT_MODEL,
+        config: str = 'default',
+        priority: str = 'interactive',
+        call_site: str = 'default',
+        template: str = None,
+        admitted: bool = False,
+        **kwargs
+    ):
+        """generate_content on the shared model, scheduled by priority class
+
+        admitted means the caller already holds (and will release) the
+        scheduler slot for priority, e.g. acquired before it took a pool
+        thread.
+        """
+        if admitted:
+            return self._call(contents, name, config, call_site, template, priority, **kwargs)
+        with llm_scheduler.slot(priority, Config.GEMINI_TIMEOUT_SECONDS):
+            return self._call(contents, name, config, call_site, template, priority, **kwargs)
+
+    def _run_granted(self, contents, name: str, config: str, priority: str, call_site: str, template: str, **kwargs):
+        """Worker-thread body of an async call that already holds its priority slot"""
+        try:
+            return self._call(contents, name, config, call_site, template, priority, **kwargs)
+        finally:
+            llm_scheduler.release(priority)
+
+    async def _submit(self, contents, name, config, priority, call_site, template, timeout, **kwargs) -> Future:
+        """Wait for a priority slot on the event loop, then start the call on the llm pool"""
+        await llm_scheduler.acquire_async(priority, timeout)
+        try:
+            return get_executor('llm').submit(
+                self._run_granted, contents, name, config, priority, call_site, template, **kwargs
+            )
+        except BaseException:
+            llm_scheduler.release(priority)
+            raise
+
+    def _hedge_after(self, call_site: str, template: str = None) -> Optional[float]:
+        """Seconds after which a second request is worth sending: the call site's p95"""
+        timing_tags = usage_tags(call_site, template)
+        if not Config.LLM_HEDGING or metrics.count('llm.latency_ms', tags=timing_tags) < Config.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return metrics.percentile('llm.latency_ms', 95, tags=timing_tags) / 1000
+
+    async def generate_async(
+        self,
+        contents,
+        name: str = TEXT_MODEL,
+        config: str = 'default',
+        priority: str = 'interactive',
+        call_site: str = 'default',
+        template: str = None,
+        deadline: float = None,
+        hedge: bool = True,
+        on_late: Callable[[Any], None] = None,
+        **kwargs
+    ):
+        """Model call bounded by the call site's deadline, optionally hedged
+
+        The call waits for its priority slot on the event loop, then runs
+        on the bounded 'llm' pool. If it has not answered by the call
+        site's p95 latency a second, identical request is sent and the
+        first answer wins. Past the deadline LLMDeadlineExceeded is raised
+        so the caller can answer from its fallback; a response that
+        arrives later is handed to on_late (in a worker thread), e.g. to
+        fill a cache.
+        """
+        deadline = deadline or deadline_for(call_site)
+        tags = usage_tags(call_site, template)
+        started = time.monotonic()
+        ends_at = started + deadline
+
+        try:
+            attempts = [await self._submit(contents, name, config, priority, call_site, template, deadline, **kwargs)]
+        except asyncio.TimeoutError:
+            metrics.increment('llm.deadline_exceeded', tags={**tags, 'stage': 'queued'})
+            raise LLMDeadlineExceeded(f"{call_site} not dispatched within {deadline:.1f}s")
+
+        hedge_after = self._hedge_after(call_site, template) if hedge else None
+        hedge_at = started + hedge_after if hedge_after is not None else None
+        waiting = {asyncio.shield(asyncio.wrap_future(attempts[0]))}
+        last_error = None
+
+        while waiting and time.monotonic() < ends_at:
+            stop_at = min(ends_at, hedge_at) if hedge_at is not None else ends_at
+            done, waiting = await asyncio.wait(
+                waiting,
+                timeout=max(0.0, stop_at - time.monotonic()),
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            for attempt in done:
+                if attempt.exception() is None:
+                    return attempt.result()
+                last_error = attempt.exception()
+
+            if hedge_at is not None and waiting and time.monotonic() >= hedge_at:
+                hedge_at = None
+                try:
+                    attempts.append(await self._submit(
+                        contents, name, config, priority, call_site, template,
+                        max(0.001, ends_at - time.monotonic()), **kwargs
+                    ))
+                    waiting.add(asyncio.shield(asyncio.wrap_future(attempts[-1])))
+                    metrics.increment('llm.hedged', tags=tags)
+                except Exception:
+                    # No slot for a hedge in time: keep waiting on the first request
+                    pass
+
+        if not waiting:
+            # Every attempt failed before the deadline
+            raise last_error
+
+        metrics.increment('llm.deadline_exceeded', tags={**tags, 'stage': 'running'})
+        if on_late is not None:
+            self._deliver_late(attempts, on_late)
+        raise LLMDeadlineExceeded(f"{call_site} did not answer within {deadline:.1f}s")
+
+    async def stream(
+        self,
+        contents,
+        name: str = TEXT_MODEL,
+        config: str = 'default',
+        priority: str = 'interactive',
+        call_site: str = 'default',
+        template: str = None,
+        deadline: float = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """Yield response text chunks as the model produces them
+
+        Scheduling is the same as generate_async, but the deadline bounds
+        time to first chunk rather than the whole answer; after that each
+        chunk must follow the last within GEMINI_TIMEOUT_SECONDS. The call
+        runs on the 'llm' pool and hands chunks to the loop as they arrive.
+        """
+        deadline = deadline or deadline_for(call_site)
+        started = time.monotonic()
+        tags = usage_tags(call_site, template)
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        finished = object()
+        stopped = threading.Event()
+
+        try:
+            await llm_scheduler.acquire_async(priority, deadline)
+        except asyncio.TimeoutError:
+            metrics.increment('llm.deadline_exceeded', tags={**tags, 'stage': 'queued'})
+            raise LLMDeadlineExceeded(f"{call_site} not dispatched within {deadline:.1f}s")
+
+        def hand_over(item):
+            try:
+                loop.call_soon_threadsafe(chunks.put_nowait, item)
+            except RuntimeError:
+                # The consumer's loop is gone (client disconnected)
+                stopped.set()
+
+        def produce():
+            text = []
+            try:
+                # Chunks keep arriving over the connection: the model slot is busy until the last one
+                with self.slot(name, priority):
+                    for chunk in self._call(contents, name, config, call_site, template, priority, stream=True, **kwargs):
+                        if stopped.is_set():
+                            break
+                        try:
+                            piece = chunk.text
+                        except ValueError:
+                            # Blocked chunk: nothing to show
+                            continue
+                        text.append(piece)
+                        hand_over(piece)
+                metrics.observe('llm.output_tokens', estimate_tokens(''.join(text)), tags=tags)
+                metrics.observe('llm.latency_ms', (time.monotonic() - started) * 1000, tags=tags)
+                hand_over(finished)
+            except Exception as e:
+                hand_over(e)
+            finally:
+                llm_scheduler.release(priority)
+
+        try:
+            get_executor('llm').submit(produce)
+        except BaseException:
+            llm_scheduler.release(priority)
+            raise
+
+        try:
+            timeout = max(0.001, started + deadline - time.monotonic())
+            first = True
+            while True:
+                try:
+                    item = await asyncio.wait_for(chunks.get(), timeout)
+                except asyncio.TimeoutError:
+                    metrics.increment('llm.deadline_exceeded', tags={**tags, 'stage': 'first_chunk' if first else 'streaming'})
+                    raise LLMDeadlineExceeded(f"{call_site} stream stalled")
+                if item is finished:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                if first:
+                    metrics.observe('llm.first_chunk_ms', (time.monotonic() - started) * 1000, tags=tags)
+                    first = False
+                    timeout = Config.GEMINI_TIMEOUT_SECONDS
+                yield item
+        finally:
+            stopped.set()
+
+    def _deliver_late(self, attempts, on_late: Callable[[Any], None]):
+        """Hand the first late successful response to on_late, once"""
+        delivered = threading.Event()
+
+        def deliver(future: Future):
+            if future.cancelled() or future.exception() is not None or delivered.is_set():
+                return
+            delivered.set()
+            try:
+                on_late(future.result())
+            except Exception as e:
+                self.logger.error(f"Late response handler failed: {str(e)}")
+
+        for attempt in attempts:
+            attempt.add_done_callback(deliver)
+
+model_registry = ModelRegistry()
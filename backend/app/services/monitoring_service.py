@@ -1,20 +1,28 @@
 # backend/app/services/monitoring_service.py
 
 from typing import Dict, Any, Optional, Callable, List
-import google.generativeai as genai
 from datetime import datetime
 import json
 import asyncio
 import logging
 import numpy as np
 from .emergency_service import EmergencyService
+from .route_risk_index import RouteRiskIndex
+from .model_registry import model_registry, TEXT_MODEL
+from .llm_usage import record_fallback, record_parse_failure
+from .alert_dedupe import alert_deduper
+from ..config import Config
+from ..utils.emergency_lane import emergency_lane
+
+# Distance at which a checkpoint counts as reached
+CHECKPOINT_RADIUS_METERS = 30
 
 class MonitoringService:
     def __init__(self, gemini_key: str):
         self.logger = logging.getLogger(__name__)
         self.emergency_service = EmergencyService(gemini_key)
-        genai.configure(api_key=gemini_key)
-        self.model = genai.GenerativeModel('gemini-pro')
+        model_registry.configure(gemini_key)
+        self.model_name = TEXT_MODEL
         
         # Active monitoring sessions
         self.active_sessions: Dict[str, Dict[str, Any]] = {}
@@ -27,14 +35,16 @@ class MonitoringService:
     ) -> Dict[str, Any]:
         """Start monitoring a user's journey"""
         try:
+            checkpoints = self._generate_checkpoints(route)
             session = {
                 'user_id': user_id,
                 'route': route,
                 'start_time': datetime.now(),
                 'last_update': datetime.now(),
                 'status': 'active',
-                'checkpoints': self._generate_checkpoints(route),
+                'checkpoints': checkpoints,
                 'current_checkpoint': 0,
+                'risk_index': self._build_risk_index(route, checkpoints),
                 'alerts': [],
                 'callback': callback
             }
@@ -67,6 +77,7 @@ class MonitoringService:
 
             session = self.active_sessions[user_id]
             session['last_update'] = datetime.now()
+            self._advance_checkpoint(session, location)
             
             # Check if location matches expected checkpoint
             safety_status = await self._check_safety(session, location)
@@ -77,7 +88,8 @@ class MonitoringService:
             return {
                 'status': 'location_updated',
                 'safety': safety_status,
-                'next_checkpoint': session['checkpoints'][session['current_checkpoint']]
+                'next_checkpoint': session['checkpoints'][session['current_checkpoint']],
+                'route_risk': self._remaining_route_risk(session)
             }
 
         except Exception as e:
@@ -88,15 +100,42 @@ class MonitoringService:
         self,
         user_id: str,
         location: Dict[str, float],
-        report: str = None
+        report: str = None,
+        idempotency_key: str = None
     ) -> Dict[str, Any]:
-        """Handle SOS signal from user"""
+        """Handle SOS signal from user
+
+        Retries (same idempotency key) and repeats within the burst window
+        return the first SOS's response with an update count instead of
+        raising the emergency again.
+        """
         try:
-            # Get emergency response
-            emergency_response = await self.emergency_service.handle_emergency(
-                location,
-                report
+            # Dedupe state may touch SQLite: keep it off the event loop
+            burst, opener = await emergency_lane.run_blocking(
+                alert_deduper.claim, 'sos', user_id, idempotency_key, location
             )
+            if not opener:
+                try:
+                    # Shielded: giving up must not cancel the result the opener still has to set
+                    emergency_response = await asyncio.wait_for(
+                        asyncio.shield(asyncio.wrap_future(burst['result'])), Config.ALERT_BURST_WAIT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    emergency_response = self.emergency_service._get_fallback_emergency_response(location)
+                if user_id in self.active_sessions and self.active_sessions[user_id]['alerts']:
+                    self.active_sessions[user_id]['alerts'][-1]['update_count'] = burst['update_count']
+                return {**emergency_response, 'duplicate': True, 'update_count': burst['update_count']}
+
+            try:
+                # Get emergency response
+                emergency_response = await self.emergency_service.handle_emergency(
+                    location,
+                    report
+                )
+            except BaseException as e:
+                alert_deduper.abandon(burst, e)
+                raise
+            await emergency_lane.run_blocking(alert_deduper.opened, burst, emergency_response)
 
             # Update session if exists
             if user_id in self.active_sessions:
@@ -106,7 +145,8 @@ class MonitoringService:
                     'type': 'sos',
                     'time': datetime.now().isoformat(),
                     'location': location,
-                    'response': emergency_response
+                    'response': emergency_response,
+                    'update_count': 0
                 })
 
                 # Notify callback if registered
@@ -121,7 +161,7 @@ class MonitoringService:
 
         except Exception as e:
             self.logger.error(f"Error handling SOS: {str(e)}")
-            return await self.emergency_service._get_fallback_emergency_response()
+            return self.emergency_service._get_fallback_emergency_response(location)
 
     async def _monitor_session(self, user_id: str):
         """Background task to monitor user session"""
@@ -156,6 +196,46 @@ class MonitoringService:
                 })
         return checkpoints
 
+    def _build_risk_index(
+        self,
+        route: Dict[str, Any],
+        checkpoints: List[Dict[str, Any]]
+    ) -> RouteRiskIndex:
+        """Precompute per-step risk for O(1) remaining-route queries"""
+        steps = route['legs'][0]['steps'] if route.get('legs') else []
+        lengths = [step.get('distance', {}).get('value', 0) for step in steps]
+
+        # Prefer per-segment scores from route analysis, else the route score
+        safety = route.get('safety', {})
+        segments = safety.get('segments') or []
+        if len(segments) == len(checkpoints):
+            scores = [segment['safety_score'] for segment in segments]
+        else:
+            scores = [safety.get('safety_score', 50)] * len(checkpoints)
+
+        return RouteRiskIndex([100 - score for score in scores], lengths or None)
+
+    def _advance_checkpoint(self, session: Dict[str, Any], location: Dict[str, float]):
+        """Move past checkpoints the user has reached"""
+        checkpoints = session['checkpoints']
+        while session['current_checkpoint'] < len(checkpoints) - 1:
+            checkpoint = checkpoints[session['current_checkpoint']]
+            if self._calculate_deviation(location, checkpoint['location']) > CHECKPOINT_RADIUS_METERS:
+                break
+            session['current_checkpoint'] += 1
+
+    def _remaining_route_risk(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        """Risk of the rest of the route and its riskiest upcoming step"""
+        risk_index = session.get('risk_index')
+        if not risk_index or not len(risk_index):
+            return {}
+
+        summary = risk_index.remaining(session['current_checkpoint'])
+        riskiest = summary['riskiest_upcoming']
+        if riskiest:
+            riskiest['instruction'] = session['checkpoints'][riskiest['index']]['instruction']
+        return summary
+
     async def _check_safety(
         self,
         session: Dict[str, Any],
@@ -188,11 +268,20 @@ class MonitoringService:
             }}
             """
 
-            response = self.model.generate_content(prompt)
+            response = await model_registry.generate_async(
+                prompt,
+                self.model_name,
+                priority='monitoring',
+                call_site='monitoring_check'
+            )
             return json.loads(response.text)
 
         except Exception as e:
             self.logger.error(f"Error checking safety: {str(e)}")
+            if isinstance(e, json.JSONDecodeError):
+                record_parse_failure('monitoring_check')
+            else:
+                record_fallback('monitoring_check', error=e)
             return {
                 'alert_level': 'medium',
                 'concerns': ['Unable to perform detailed safety check'],
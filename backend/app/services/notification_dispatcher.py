@@ -0,0 +1,281 @@
+# backend/app/services/notification_dispatcher.py
+
+from typing import Any, Callable, Dict, List, Optional
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import Session
+from ..config import Config
+from ..models import NotificationOutbox
+from ..utils.executors import get_executor
+from ..utils.metrics import metrics
+
+
+class NotificationChannel(ABC):
+    """A way of reaching a contact; `field` is the contact attribute it sends to"""
+
+    name = 'channel'
+    field = 'phone'
+
+    @abstractmethod
+    def send(self, recipient: str, message: str, payload: Dict[str, Any], idempotency_key: str):
+        """Deliver or raise. Providers that support it should dedupe on idempotency_key."""
+
+
+class LocalChannel(NotificationChannel):
+    """Stand-in for SMS/email: appends each notification to a local JSONL file"""
+
+    def __init__(self, name: str, field: str, path: str = None):
+        self.name = name
+        self.field = field
+        self.path = path or Config.NOTIFY_LOCAL_OUTBOX_PATH
+        self._lock = threading.Lock()
+
+    def send(self, recipient: str, message: str, payload: Dict[str, Any], idempotency_key: str):
+        record = {
+            'channel': self.name,
+            'to': recipient,
+            'message': message,
+            'payload': payload,
+            'idempotency_key': idempotency_key,
+            'sent_at': datetime.utcnow().isoformat()
+        }
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record, default=str) + '\n')
+
+
+class NotificationDispatcher:
+    """Delivers emergency contact notifications from the outbox table
+
+    Callers write NotificationOutbox rows in the same transaction as the
+    alert they belong to, then wake the dispatcher. A background worker
+    claims due rows, sends them concurrently through their channels and
+    records the outcome: failures are retried with exponential backoff
+    up to NOTIFY_MAX_ATTEMPTS. A claim is a lease, so rows held by a
+    worker that died are picked up again once it expires. Every row has a
+    unique idempotency key, so re-enqueueing the same alert is a no-op.
+    The worker uses its own small connection pool (init_app), so it never
+    takes the connections reserved for SOS handling.
+    """
+
+    def __init__(self, channels: List[NotificationChannel] = None, session_factory: Callable = None):
+        self.logger = logging.getLogger(__name__)
+        self.channels: Dict[str, NotificationChannel] = {}
+        for channel in channels if channels is not None else [LocalChannel('sms', 'phone'), LocalChannel('email', 'email')]:
+            self.register_channel(channel)
+        self.session_factory = session_factory or self.session
+        self.engine = None
+        self._outcome_handlers: Dict[str, Callable] = {}
+        self._wake = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def init_app(self, app, db):
+        """Open the dispatcher's own connections to the app's database"""
+        with app.app_context():
+            url = db.engine.url
+        self.engine = create_engine(url, pool_size=Config.NOTIFY_DB_POOL_SIZE, max_overflow=0)
+
+    @contextmanager
+    def session(self):
+        """ORM session on the dispatcher's connections; commits on success"""
+        if self.engine is None:
+            raise RuntimeError("NotificationDispatcher.init_app has not been called")
+        session = Session(self.engine, expire_on_commit=False)
+        try:
+            yield session
+            session.commit()
+        except BaseException:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def register_channel(self, channel: NotificationChannel):
+        self.channels[channel.name] = channel
+
+    def on_outcome(self, prefix: str, handler: Callable[[Any, str, str], None]):
+        """Call handler(session, ref, status) when a '<prefix>:<ref>' notification is sent or fails for good
+
+        It runs inside the transaction that records the outcome.
+        """
+        self._outcome_handlers[prefix] = handler
+
+    def _record_outcome(self, session, alert_ref: str, status: str):
+        prefix, _, ref = alert_ref.partition(':')
+        handler = self._outcome_handlers.get(prefix)
+        if handler is not None:
+            handler(session, ref, status)
+
+    def notifications_for(
+        self,
+        alert_ref: str,
+        contacts: List[Dict[str, Any]],
+        message: str,
+        payload: Dict[str, Any] = None
+    ) -> List[NotificationOutbox]:
+        """Outbox rows for every contact on every channel they can be reached by"""
+        rows = []
+        for contact in contacts:
+            for channel in self.channels.values():
+                recipient = contact.get(channel.field)
+                if not recipient:
+                    continue
+                rows.append(NotificationOutbox(
+                    idempotency_key=f"{alert_ref}:{contact['id']}:{channel.name}",
+                    alert_ref=alert_ref,
+                    channel=channel.name,
+                    recipient=recipient,
+                    message=message,
+                    payload=json.dumps(payload or {}, default=str),
+                    status='pending',
+                    attempts=0,
+                    next_attempt_at=datetime.utcnow()
+                ))
+        return rows
+
+    def enqueue(self, session, rows: List[NotificationOutbox]) -> int:
+        """Add rows to the caller's transaction, skipping keys already in the outbox"""
+        if not rows:
+            return 0
+        existing = {
+            key for (key,) in session.query(NotificationOutbox.idempotency_key).filter(
+                NotificationOutbox.idempotency_key.in_([row.idempotency_key for row in rows])
+            )
+        }
+        fresh = [row for row in rows if row.idempotency_key not in existing]
+        session.add_all(fresh)
+        metrics.increment('notifications.enqueued', len(fresh))
+        return len(fresh)
+
+    def wake(self):
+        """Dispatch now instead of at the next poll"""
+        self._wake.set()
+
+    def _claim(self) -> List[Dict[str, Any]]:
+        """Lease a batch of due rows in one transaction"""
+        now = datetime.utcnow()
+        with self.session_factory() as session:
+            rows = session.query(NotificationOutbox).filter(
+                NotificationOutbox.status.in_(('pending', 'sending')),
+                NotificationOutbox.next_attempt_at <= now
+            ).order_by(NotificationOutbox.id).limit(Config.NOTIFY_BATCH_SIZE).all()
+            claimed = []
+            for row in rows:
+                row.status = 'sending'
+                row.attempts = (row.attempts or 0) + 1
+                row.next_attempt_at = now + timedelta(seconds=Config.NOTIFY_LEASE_SECONDS)
+                claimed.append({
+                    'id': row.id,
+                    'idempotency_key': row.idempotency_key,
+                    'alert_ref': row.alert_ref,
+                    'channel': row.channel,
+                    'recipient': row.recipient,
+                    'message': row.message,
+                    'payload': json.loads(row.payload or '{}'),
+                    'attempts': row.attempts,
+                    'created_at': row.created_at
+                })
+        return claimed
+
+    def _send(self, item: Dict[str, Any]) -> Optional[str]:
+        """Deliver one notification; returns the error, if any"""
+        channel = self.channels.get(item['channel'])
+        if channel is None:
+            return f"Unknown channel: {item['channel']}"
+        try:
+            channel.send(item['recipient'], item['message'], item['payload'], item['idempotency_key'])
+            return None
+        except Exception as e:
+            return str(e) or type(e).__name__
+
+    def dispatch_pending(self) -> Dict[str, int]:
+        """One pass: claim due rows, send them concurrently, record outcomes"""
+        claimed = self._claim()
+        if not claimed:
+            return {'sent': 0, 'retrying': 0, 'failed': 0}
+
+        pool = get_executor('notify')
+        errors = list(pool.map(self._send, claimed))
+        now = datetime.utcnow()
+        outcome = {'sent': 0, 'retrying': 0, 'failed': 0}
+
+        with self.session_factory() as session:
+            for item, error in zip(claimed, errors):
+                row = session.get(NotificationOutbox, item['id'])
+                tags = {'channel': item['channel']}
+                if error is None:
+                    row.status = 'sent'
+                    row.sent_at = now
+                    row.last_error = None
+                    self._record_outcome(session, item['alert_ref'], 'sent')
+                    outcome['sent'] += 1
+                    metrics.increment('notifications.sent', tags=tags)
+                    metrics.observe(
+                        'notifications.delivery_ms',
+                        (now - item['created_at']).total_seconds() * 1000,
+                        tags=tags
+                    )
+                    continue
+
+                row.last_error = error
+                if item['attempts'] >= Config.NOTIFY_MAX_ATTEMPTS:
+                    row.status = 'failed'
+                    self._record_outcome(session, item['alert_ref'], 'failed')
+                    outcome['failed'] += 1
+                    metrics.increment('notifications.failed', tags=tags)
+                    self.logger.error(f"Notification {item['idempotency_key']} failed for good: {error}")
+                else:
+                    row.status = 'pending'
+                    row.next_attempt_at = now + timedelta(
+                        seconds=Config.NOTIFY_RETRY_BASE_SECONDS * 2 ** (item['attempts'] - 1)
+                    )
+                    outcome['retrying'] += 1
+                    metrics.increment('notifications.retried', tags=tags)
+        return outcome
+
+    def start(self, poll_seconds: float = None):
+        """Dispatch in a daemon thread, on wake() or every poll interval"""
+        poll = poll_seconds or Config.NOTIFY_POLL_SECONDS
+        if self._worker is not None and self._worker.is_alive():
+            return
+
+        def run():
+            while True:
+                self._wake.wait(poll)
+                self._wake.clear()
+                try:
+                    # Drain full batches before going back to sleep
+                    while sum(self.dispatch_pending().values()) >= Config.NOTIFY_BATCH_SIZE:
+                        pass
+                except Exception as e:
+                    self.logger.error(f"Notification dispatch failed: {str(e)}")
+
+        self._worker = threading.Thread(target=run, name='notification-dispatcher', daemon=True)
+        self._worker.start()
+
+    def stats(self) -> Dict[str, int]:
+        """Outbox rows by status"""
+        with self.session_factory() as session:
+            return dict(session.query(
+                NotificationOutbox.status, func.count(NotificationOutbox.id)
+            ).group_by(NotificationOutbox.status).all())
+
+
+_dispatcher: Optional[NotificationDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_notification_dispatcher() -> NotificationDispatcher:
+    """Process-wide dispatcher with the local SMS/email stand-ins"""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = NotificationDispatcher()
+        return _dispatcher
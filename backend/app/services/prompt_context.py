@@ -0,0 +1,103 @@
+# backend/app/services/prompt_context.py
+
+from typing import Any, Dict, List, Optional, Tuple
+from ..config import Config
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English and JSON)"""
+    return max(1, len(text) // 4) if text else 0
+
+
+def output_budget(call_site: str) -> int:
+    """max_output_tokens for a call site"""
+    budgets = Config.LLM_OUTPUT_TOKENS
+    return budgets.get(call_site, budgets['default'])
+
+
+def _compact(value: Any, max_items: int = 3) -> str:
+    """Short, unambiguous rendering of a metric value"""
+    if isinstance(value, float):
+        return str(round(value, 3))
+    if isinstance(value, dict):
+        top = sorted(value.items(), key=lambda item: item[1], reverse=True)[:max_items]
+        return ','.join(f"{k}={_compact(v)}" for k, v in top)
+    if isinstance(value, (list, tuple)):
+        return ';'.join(_compact(v) for v in list(value)[:max_items])
+    return str(value)
+
+
+class PromptContext:
+    """Token-budgeted `key: value` block of the facts a prompt needs
+
+    Lines are kept in priority order (lower first); when the block is
+    over budget the lowest-priority lines are dropped.
+    """
+
+    def __init__(self, budget_tokens: int = None):
+        self.budget_tokens = budget_tokens or Config.LLM_CONTEXT_TOKENS
+        self._lines: List[Tuple[int, int, str]] = []
+
+    def add(self, key: str, value: Any, priority: int = 1, max_items: int = 3) -> 'PromptContext':
+        if value is None or value == '' or value == [] or value == {}:
+            return self
+        self._lines.append((priority, len(self._lines), f"{key}: {_compact(value, max_items)}"))
+        return self
+
+    def render(self) -> str:
+        lines = sorted(self._lines)
+        while len(lines) > 1 and estimate_tokens('\n'.join(line for _, _, line in lines)) > self.budget_tokens:
+            lines.pop()
+        return '\n'.join(line for _, _, line in lines)
+
+
+def area_context(area_data: Dict[str, Any], budget_tokens: int = None) -> PromptContext:
+    """Context block from SafetyAnalyzer area data (incidents, lighting, safe spaces)"""
+    incidents = area_data.get('incidents', {})
+    lighting = area_data.get('lighting', {})
+    safe_spaces = area_data.get('safe_spaces', {}).get('safe_spaces', [])
+    time_info = area_data.get('time_info', {})
+    night = incidents.get('time_distribution', {}).get('night')
+
+    context = PromptContext(budget_tokens)
+    context.add('period', 'night' if time_info.get('is_night') else 'day', priority=0)
+    context.add('incidents_30d', incidents.get('total', 0), priority=0)
+    if incidents.get('total'):
+        context.add('night_share', round(night / incidents['total'], 2) if night is not None else None)
+        context.add('top_categories', incidents.get('categories'), priority=2)
+    context.add('lights_working', f"{lighting.get('working', 0)}/{lighting.get('total', 0)}", priority=0)
+    context.add('light_coverage_pct', round(float(lighting.get('coverage', 0)), 1))
+    context.add('safe_spaces', len(safe_spaces), priority=0)
+    context.add(
+        'safe_space_names',
+        [space.get('business_name') for space in safe_spaces if space.get('business_name')],
+        priority=3
+    )
+    return context
+
+
+def route_context(
+    route_data: Dict[str, Any],
+    local: Optional[Dict[str, Any]] = None,
+    budget_tokens: int = None
+) -> PromptContext:
+    """Context block for a route: endpoints, conditions and local corridor scores"""
+    context = PromptContext(budget_tokens)
+    context.add('from', route_data['start_location'], priority=0)
+    context.add('to', route_data['end_location'], priority=0)
+    for key in ('start_coords', 'end_coords'):
+        coords = route_data.get(key)
+        if coords:
+            context.add(key, f"{coords['lat']:.4f},{coords['lng']:.4f}", priority=2)
+    if route_data.get('distance') not in (None, '0', 0):
+        context.add('distance', route_data['distance'], priority=1)
+    context.add('time', route_data.get('time_of_day'), priority=0)
+    if route_data.get('weather', 'Unknown') != 'Unknown':
+        context.add('weather', route_data['weather'], priority=1)
+
+    if local:
+        context.add('local_safety_score', local.get('safety_score'), priority=0)
+        context.add('local_min_segment_score', local.get('score_breakdown', {}).get('min'), priority=1)
+        context.add('local_risks', local.get('risks'), priority=1)
+        context.add('safe_spaces_on_route', local.get('safe_spaces'), priority=2)
+    return context
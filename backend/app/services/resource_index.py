@@ -0,0 +1,347 @@
+# backend/app/services/resource_index.py
+
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+import numpy as np
+import requests
+from ..config import Config
+from ..utils.metrics import metrics
+
+EARTH_RADIUS_METERS = 6371008.8
+
+# SF open data behind the emergency resource snapshot
+RESOURCE_ENDPOINTS = {
+    'police': 'https://data.sfgov.org/resource/p4e4-a5a7.json',  # Police Stations
+    'hospitals': 'https://data.sfgov.org/resource/sc8f-6qby.json',  # Hospitals
+    'safe_places': 'https://data.sfgov.org/resource/g8m3-pdis.json'  # Safe Places
+}
+SAFE_PLACE_TYPES = {'GROCERY', 'PHARMACY', 'HOTEL', 'RESTAURANT', 'BANK'}
+# Server-side filters, so only rows (and columns) the index uses are downloaded
+RESOURCE_QUERIES = {
+    'safe_places': {
+        '$select': 'business_name,business_type,address,location',
+        '$where': 'business_type in (' + ','.join(f"'{t}'" for t in sorted(SAFE_PLACE_TYPES)) + ')'
+    }
+}
+
+
+def to_unit_vectors(coords: np.ndarray) -> np.ndarray:
+    """(N, 2) lat/lng degrees to (N, 3) points on the unit sphere"""
+    coords = np.radians(np.asarray(coords, dtype=float).reshape(-1, 2))
+    lat, lng = coords[:, 0], coords[:, 1]
+    return np.column_stack([np.cos(lat) * np.cos(lng), np.cos(lat) * np.sin(lng), np.sin(lat)])
+
+
+def haversine_meters(lat1: float, lng1: float, lat2: np.ndarray, lng2: np.ndarray) -> np.ndarray:
+    """Great-circle distance from one point to many"""
+    lat1, lng1 = np.radians(lat1), np.radians(lng1)
+    lat2, lng2 = np.radians(lat2), np.radians(lng2)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def format_distance(meters: float) -> str:
+    return f"{meters:.0f} m" if meters < 1000 else f"{meters / 1000:.1f} km"
+
+
+class KDTree:
+    """Static k-d tree over 3-D points for exact k-nearest queries
+
+    Built once with median splits on the widest axis; leaves hold up to
+    leaf_size points and are scanned with numpy.
+    """
+
+    def __init__(self, points: np.ndarray, leaf_size: int = 16):
+        self.points = np.asarray(points, dtype=float).reshape(-1, 3)
+        self.leaf_size = leaf_size
+        self.order = np.arange(len(self.points))
+        # Per node: start, end, split axis (-1 for leaves), split value, children
+        self._start: List[int] = []
+        self._end: List[int] = []
+        self._axis: List[int] = []
+        self._split: List[float] = []
+        self._children: List[Tuple[int, int]] = []
+        if len(self.points):
+            self._build(0, len(self.points))
+        # Points in tree order, so each leaf is a contiguous slice
+        self._leaf_points = self.points[self.order]
+        self._leaf_norms = np.einsum('ij,ij->i', self._leaf_points, self._leaf_points)
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _build(self, start: int, end: int) -> int:
+        node = len(self._start)
+        self._start.append(start)
+        self._end.append(end)
+        self._axis.append(-1)
+        self._split.append(0.0)
+        self._children.append((-1, -1))
+        if end - start <= self.leaf_size:
+            return node
+
+        ids = self.order[start:end]
+        spread = self.points[ids].max(axis=0) - self.points[ids].min(axis=0)
+        axis = int(np.argmax(spread))
+        mid = (end - start) // 2
+        self.order[start:end] = ids[np.argpartition(self.points[ids, axis], mid)]
+
+        self._axis[node] = axis
+        self._split[node] = float(self.points[self.order[start + mid], axis])
+        left = self._build(start, start + mid)
+        right = self._build(start + mid, end)
+        self._children[node] = (left, right)
+        return node
+
+    def query(self, point: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Euclidean distances and indices of the k nearest points, nearest first"""
+        if not len(self.points) or k <= 0:
+            return np.empty(0), np.empty(0, dtype=int)
+
+        point = np.asarray(point, dtype=float)
+        coords = point.tolist()
+        point_norm = float(point @ point)
+        k = min(k, len(self.points))
+        best: List[Tuple[float, int]] = []  # max-heap of (-squared distance, index)
+        worst = float('inf')
+        stack = [(0, 0.0)]
+
+        while stack:
+            node, bound = stack.pop()
+            if bound >= worst:
+                continue
+
+            axis = self._axis[node]
+            if axis < 0:
+                start, end = self._start[node], self._end[node]
+                # |x - p|^2 = |x|^2 - 2 x.p + |p|^2, one matrix-vector product per leaf
+                dist = self._leaf_norms[start:end] - 2 * (self._leaf_points[start:end] @ point) + point_norm
+                for offset in np.flatnonzero(dist < worst).tolist():
+                    candidate = (-float(dist[offset]), int(self.order[start + offset]))
+                    if len(best) < k:
+                        heapq.heappush(best, candidate)
+                    elif candidate > best[0]:
+                        heapq.heapreplace(best, candidate)
+                    if len(best) == k:
+                        worst = -best[0][0]
+                continue
+
+            diff = coords[axis] - self._split[node]
+            left, right = self._children[node]
+            near, far = (left, right) if diff < 0 else (right, left)
+            stack.append((far, max(bound, diff * diff)))
+            stack.append((near, bound))
+
+        best.sort(reverse=True)
+        return (
+            np.sqrt(np.maximum([-dist for dist, _ in best], 0)),
+            np.array([index for _, index in best], dtype=int)
+        )
+
+
+def _record_coords(record: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """lat/lng of an SF open data row, whichever location fields it uses"""
+    try:
+        if 'latitude' in record and 'longitude' in record:
+            return float(record['latitude']), float(record['longitude'])
+        for field in ('location', 'point', 'the_geom'):
+            value = record.get(field)
+            if isinstance(value, dict):
+                if 'coordinates' in value:
+                    lng, lat = value['coordinates'][:2]
+                    return float(lat), float(lng)
+                if 'latitude' in value and 'longitude' in value:
+                    return float(value['latitude']), float(value['longitude'])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+class ResourceTree:
+    """k-d tree over one kind of resource, answering in haversine meters"""
+
+    def __init__(self, records: List[Dict[str, Any]]):
+        located = [(record, _record_coords(record)) for record in records]
+        located = [(record, coords) for record, coords in located if coords is not None]
+        self.records = [record for record, _ in located]
+        self.coords = np.array([coords for _, coords in located], dtype=float).reshape(-1, 2)
+        self.tree = KDTree(to_unit_vectors(self.coords))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def nearest(self, location: Dict[str, float], k: int = 3, max_meters: float = None) -> List[Dict[str, Any]]:
+        """Copies of the k nearest records with distance_m and a display distance"""
+        _, ids = self.tree.query(to_unit_vectors([[location['lat'], location['lng']]])[0], k)
+        if not len(ids):
+            return []
+
+        # Chord order equals great-circle order; report the true haversine distance
+        meters = haversine_meters(location['lat'], location['lng'], self.coords[ids, 0], self.coords[ids, 1])
+        results = []
+        for index, distance in zip(ids, meters):
+            if max_meters is not None and distance > max_meters:
+                break
+            results.append({
+                **self.records[index],
+                'distance_m': round(float(distance), 1),
+                'distance': format_distance(distance)
+            })
+        return results
+
+
+class EmergencyResourceIndex:
+    """Police stations, hospitals and safe places from a local snapshot
+
+    Queries only touch the in-memory trees. The snapshot is refreshed
+    from SF open data in the background, persisted to disk and swapped
+    in atomically, so an SOS never waits on an upstream call.
+    """
+
+    def __init__(self, snapshot_path: str = None):
+        self.logger = logging.getLogger(__name__)
+        self.snapshot_path = snapshot_path or Config.EMERGENCY_SNAPSHOT_PATH
+        self.fetched_at: Optional[float] = None
+        self._trees: Dict[str, ResourceTree] = {kind: ResourceTree([]) for kind in RESOURCE_ENDPOINTS}
+        self._refresh_lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+
+    def load(self, snapshot: Dict[str, List[Dict]], fetched_at: float = None):
+        """Build trees from a {kind: records} snapshot and swap them in"""
+        trees = {kind: ResourceTree(snapshot.get(kind, [])) for kind in RESOURCE_ENDPOINTS}
+        self._trees = trees
+        self.fetched_at = fetched_at or time.time()
+
+    def load_file(self) -> bool:
+        """Load the persisted snapshot, if there is one"""
+        try:
+            with open(self.snapshot_path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return False
+        self.load(saved['resources'], saved.get('fetched_at'))
+        self.logger.info(f"Loaded emergency resource snapshot from {self.snapshot_path}")
+        return True
+
+    def nearest(self, location: Dict[str, float], kind: str, k: int = 3, max_meters: float = None) -> List[Dict[str, Any]]:
+        return self._trees[kind].nearest(location, k, max_meters)
+
+    def nearby(self, location: Dict[str, float], k: int = None) -> Dict[str, List[Dict[str, Any]]]:
+        """k nearest of every kind of resource"""
+        k = k or Config.EMERGENCY_RESOURCES_PER_KIND
+        started = time.perf_counter()
+        trees = self._trees
+        found = {kind: tree.nearest(location, k) for kind, tree in trees.items()}
+        metrics.observe('emergency.resource_lookup_ms', (time.perf_counter() - started) * 1000)
+        return found
+
+    def populated_cells(self, cell_degrees: float, limit: int = None) -> List[Dict[str, float]]:
+        """Centers of grid cells holding any resource, most resources first"""
+        coords = np.vstack([tree.coords for tree in self._trees.values()])
+        if not len(coords):
+            return []
+        cells, counts = np.unique(np.floor(coords / cell_degrees).astype(int), axis=0, return_counts=True)
+        order = np.argsort(-counts, kind='stable')[:limit]
+        return [
+            {'lat': round((lat + 0.5) * cell_degrees, 6), 'lng': round((lng + 0.5) * cell_degrees, 6)}
+            for lat, lng in cells[order]
+        ]
+
+    def fetch_snapshot(self) -> Dict[str, List[Dict]]:
+        """Download every resource from SF open data"""
+        return {kind: self._fetch_kind(kind, url) for kind, url in RESOURCE_ENDPOINTS.items()}
+
+    def _fetch_kind(self, kind: str, url: str) -> List[Dict]:
+        """Page through one dataset, up to EMERGENCY_SNAPSHOT_LIMIT rows"""
+        limit = Config.EMERGENCY_SNAPSHOT_LIMIT
+        page_size = min(Config.EMERGENCY_SNAPSHOT_PAGE_SIZE, limit)
+        records: List[Dict] = []
+        while len(records) < limit:
+            response = requests.get(
+                url,
+                params={
+                    **RESOURCE_QUERIES.get(kind, {}),
+                    '$order': ':id',
+                    '$limit': min(page_size, limit - len(records)),
+                    '$offset': len(records)
+                },
+                timeout=Config.SODA_TIMEOUT_SECONDS
+            )
+            response.raise_for_status()
+            page = response.json()
+            records.extend(page)
+            if len(page) < page_size:
+                return records
+
+        self.logger.warning(f"Emergency resource snapshot for {kind} stopped at the {limit} row limit")
+        return records
+
+    def refresh(self) -> bool:
+        """Fetch, persist and swap in a new snapshot; keeps the old one on failure"""
+        with self._refresh_lock:
+            try:
+                snapshot = self.fetch_snapshot()
+            except Exception as e:
+                self.logger.error(f"Emergency resource refresh failed: {str(e)}")
+                metrics.increment('emergency.snapshot_refresh', tags={'outcome': 'error'})
+                return False
+
+            fetched_at = time.time()
+            tmp_path = f"{self.snapshot_path}.tmp"
+            try:
+                os.makedirs(os.path.dirname(self.snapshot_path) or '.', exist_ok=True)
+                with open(tmp_path, 'w') as f:
+                    json.dump({'fetched_at': fetched_at, 'resources': snapshot}, f)
+                os.replace(tmp_path, self.snapshot_path)
+            except OSError as e:
+                self.logger.error(f"Could not persist emergency resource snapshot: {str(e)}")
+
+            self.load(snapshot, fetched_at)
+            metrics.increment('emergency.snapshot_refresh', tags={'outcome': 'ok'})
+            self.logger.info(f"Emergency resources refreshed: {self.stats()['counts']}")
+            return True
+
+    def start_refresh(self, interval_seconds: float = None):
+        """Refresh in a daemon thread whenever the snapshot is older than the interval"""
+        interval = interval_seconds or Config.EMERGENCY_SNAPSHOT_REFRESH_SECONDS
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+
+        def run():
+            while True:
+                age = time.time() - self.fetched_at if self.fetched_at else None
+                if age is None or age >= interval:
+                    # Retry failed refreshes sooner than a full interval
+                    wait = interval if self.refresh() else min(interval, 300)
+                else:
+                    wait = interval - age
+                time.sleep(wait)
+
+        self._refresher = threading.Thread(target=run, name='emergency-resources', daemon=True)
+        self._refresher.start()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'fetched_at': datetime.fromtimestamp(self.fetched_at).isoformat() if self.fetched_at else None,
+            'counts': {kind: len(tree) for kind, tree in self._trees.items()}
+        }
+
+
+_index: Optional[EmergencyResourceIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_resource_index() -> EmergencyResourceIndex:
+    """Process-wide index, loaded from the persisted snapshot on first use"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = EmergencyResourceIndex()
+            _index.load_file()
+        return _index
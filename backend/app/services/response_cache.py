@@ -0,0 +1,212 @@
+# backend/app/services/response_cache.py
+
+from typing import Awaitable, Callable, Dict, Any, Optional, Union
+from datetime import datetime
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from ..config import Config
+from ..utils.cache import TTLCache
+from ..utils.executors import run_blocking
+from ..utils.metrics import metrics
+from .data_version import current_data_version
+from .route_analysis_store import snap_location
+
+Location = Union[str, Dict[str, float]]
+
+
+def grid_cell(location: Location, cell_degrees: float = None) -> str:
+    """Grid cell id for coordinates, normalized text for free-form locations"""
+    if isinstance(location, dict) and 'lat' in location and 'lng' in location:
+        size = cell_degrees or Config.RESPONSE_CACHE_CELL_DEGREES
+        return f"{math.floor(float(location['lat']) / size)}:{math.floor(float(location['lng']) / size)}"
+    return snap_location(location)
+
+
+def cell_center(location: Dict[str, float], cell_degrees: float = None) -> Dict[str, float]:
+    """Center of the grid cell containing a coordinate, for cell-level prompts"""
+    size = cell_degrees or Config.RESPONSE_CACHE_CELL_DEGREES
+    return {
+        'lat': round((math.floor(float(location['lat']) / size) + 0.5) * size, 6),
+        'lng': round((math.floor(float(location['lng']) / size) + 0.5) * size, 6)
+    }
+
+
+def hour_bucket(when: Optional[datetime] = None) -> int:
+    when = when or datetime.now()
+    return when.hour // Config.RESPONSE_CACHE_HOUR_BUCKET
+
+
+class ResponseCache:
+    """Model responses keyed by template, grid cell(s), hour bucket and data version
+
+    An in-memory TTL/LRU layer sits in front of a local SQLite table so
+    entries survive restarts. Hits and misses are counted per template.
+    get() and set() block on the table; on an event loop use aget() and
+    aset(), which run the SQLite work on the cache pool. The table is in
+    WAL mode and reads do not take the write lock, so a read-only lookup
+    (read_only=True) never waits behind writes.
+    """
+
+    def __init__(
+        self,
+        db_path: str = None,
+        ttl_seconds: float = None,
+        max_entries: int = None
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.db_path = db_path or Config.RESPONSE_CACHE_PATH
+        self.ttl_seconds = ttl_seconds or Config.RESPONSE_CACHE_TTL_SECONDS
+        self.max_entries = max_entries or Config.RESPONSE_CACHE_SIZE
+        self._memory = TTLCache(self.ttl_seconds, self.max_entries)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._init_db()
+
+    def _init_db(self):
+        try:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS response_cache (
+                        cache_key TEXT PRIMARY KEY,
+                        template TEXT NOT NULL,
+                        response TEXT NOT NULL,
+                        expires_at REAL NOT NULL,
+                        last_used REAL NOT NULL
+                    )
+                """)
+                conn.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_response_cache_last_used
+                    ON response_cache (last_used)
+                """)
+        except Exception as e:
+            self.logger.error(f"Response cache init failed: {str(e)}")
+
+    def make_key(self, template: str, *locations: Location, when: Optional[datetime] = None) -> str:
+        """Semantic key: same question, same key, regardless of raw coordinates or minutes"""
+        cells = '|'.join(grid_cell(location) for location in locations)
+        return f"{template}|{cells}|h{hour_bucket(when)}|v{current_data_version()}"
+
+    def get(self, template: str, key: str) -> Optional[Dict[str, Any]]:
+        value = self._memory.get(key)
+        if value is None:
+            value = self._load(key)
+        return self._count(template, value)
+
+    async def aget(
+        self,
+        template: str,
+        key: str,
+        offload: Callable[..., Awaitable] = None,
+        read_only: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """get() for event loops: memory hits answer inline, table reads run on `offload`
+
+        read_only skips the last_used update, so the read never waits for
+        another connection's write.
+        """
+        value = self._memory.get(key)
+        if value is None:
+            value = await (offload or self._offload)(self._load, key, not read_only)
+        return self._count(template, value)
+
+    def _count(self, template: str, value: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        tags = {'template': template}
+        if value is None:
+            metrics.increment('response_cache.misses', tags=tags)
+        else:
+            metrics.increment('response_cache.hits', tags=tags)
+        return value
+
+    @staticmethod
+    async def _offload(func: Callable, *args) -> Any:
+        return await run_blocking('cache', func, *args)
+
+    def set(self, template: str, key: str, value: Dict[str, Any]):
+        self._memory.set(key, value)
+        self._write(template, key, value)
+
+    async def aset(self, template: str, key: str, value: Dict[str, Any]):
+        """set() for event loops; the table write runs on the cache pool"""
+        self._memory.set(key, value)
+        await self._offload(self._write, template, key, value)
+
+    def _write(self, template: str, key: str, value: Dict[str, Any]):
+        now = time.time()
+        try:
+            with self._lock, sqlite3.connect(self.db_path) as conn:
+                conn.execute("""
+                    INSERT OR REPLACE INTO response_cache
+                    (cache_key, template, response, expires_at, last_used)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (key, template, json.dumps(value, default=str), now + self.ttl_seconds, now))
+
+                self._writes += 1
+                if self._writes % 100 == 0:
+                    self._evict(conn, now)
+        except Exception as e:
+            self.logger.error(f"Response cache write failed: {str(e)}")
+
+    def _load(self, key: str, touch: bool = True) -> Optional[Dict[str, Any]]:
+        """Read an entry from the table into memory (blocking)"""
+        now = time.time()
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                row = conn.execute(
+                    "SELECT response, expires_at FROM response_cache WHERE cache_key = ?",
+                    (key,)
+                ).fetchone()
+                if row is None or row[1] < now:
+                    return None
+                if touch:
+                    conn.execute(
+                        "UPDATE response_cache SET last_used = ? WHERE cache_key = ?",
+                        (now, key)
+                    )
+            value = json.loads(row[0])
+            self._memory.set(key, value)
+            return value
+        except Exception as e:
+            self.logger.error(f"Response cache read failed: {str(e)}")
+            return None
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Drop expired rows, then the least recently used beyond max_entries"""
+        conn.execute("DELETE FROM response_cache WHERE expires_at < ?", (now,))
+        conn.execute("""
+            DELETE FROM response_cache WHERE cache_key IN (
+                SELECT cache_key FROM response_cache
+                ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate per template"""
+        snapshot = metrics.snapshot()['counters']
+        per_template: Dict[str, Dict[str, float]] = {}
+        for outcome in ('hits', 'misses'):
+            for series in snapshot.get(f'response_cache.{outcome}', []):
+                template = series['tags'].get('template')
+                per_template.setdefault(template, {'hits': 0, 'misses': 0})[outcome] = series['value']
+
+        for counts in per_template.values():
+            total = counts['hits'] + counts['misses']
+            counts['hit_rate'] = counts['hits'] / total if total else 0.0
+        return per_template
+
+
+_response_cache = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide response cache, created on first use"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
@@ -0,0 +1,104 @@
+# backend/app/services/route_analysis_store.py
+
+from typing import Dict, Any, Optional, Union
+from datetime import datetime, timedelta
+import json
+import logging
+from ..models import db, RouteAnalysis
+from ..config import Config
+from .data_version import current_data_version
+
+Location = Union[str, Dict[str, float]]
+
+
+def snap_location(location: Location, precision: int = 3) -> str:
+    """Normalize an endpoint: coordinates to a ~100m grid, text to lowercase words"""
+    if isinstance(location, dict) and 'lat' in location and 'lng' in location:
+        return f"{round(float(location['lat']), precision)},{round(float(location['lng']), precision)}"
+    return ' '.join(str(location).lower().replace(',', ' ').split())
+
+
+def hour_of_week(when: Optional[datetime] = None) -> int:
+    when = when or datetime.now()
+    return when.weekday() * 24 + when.hour
+
+
+class RouteAnalysisStore:
+    """Database-backed memoization of route analyses"""
+
+    def __init__(self, ttl_hours: float = None):
+        self.logger = logging.getLogger(__name__)
+        self.ttl = timedelta(hours=ttl_hours or Config.ROUTE_ANALYSIS_TTL_HOURS)
+
+    def _query(self, origin: Location, destination: Location, mode: str, when: datetime):
+        return RouteAnalysis.query.filter_by(
+            origin_key=snap_location(origin),
+            destination_key=snap_location(destination),
+            mode=mode,
+            hour_bucket=hour_of_week(when)
+        )
+
+    def get(
+        self,
+        origin: Location,
+        destination: Location,
+        mode: str = 'walking',
+        when: Optional[datetime] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Return a fresh stored analysis, or None if missing, expired or stale"""
+        try:
+            entry = self._query(origin, destination, mode, when or datetime.now()).first()
+            if entry is None:
+                return None
+
+            if entry.expires_at < datetime.utcnow() or entry.data_version != current_data_version():
+                return None
+
+            entry.hits = (entry.hits or 0) + 1
+            db.session.commit()
+            return json.loads(entry.analysis)
+
+        except Exception as e:
+            db.session.rollback()
+            self.logger.error(f"Route analysis lookup failed: {str(e)}")
+            return None
+
+    def put(
+        self,
+        origin: Location,
+        destination: Location,
+        analysis: Dict[str, Any],
+        mode: str = 'walking',
+        when: Optional[datetime] = None
+    ):
+        """Insert or replace the stored analysis for this key"""
+        when = when or datetime.now()
+        try:
+            entry = self._query(origin, destination, mode, when).first()
+            if entry is None:
+                entry = RouteAnalysis(
+                    origin_key=snap_location(origin),
+                    destination_key=snap_location(destination),
+                    mode=mode,
+                    hour_bucket=hour_of_week(when)
+                )
+                db.session.add(entry)
+
+            entry.analysis = json.dumps(analysis, default=str)
+            entry.data_version = current_data_version()
+            entry.created_at = datetime.utcnow()
+            entry.expires_at = datetime.utcnow() + self.ttl
+            entry.hits = 0
+            db.session.commit()
+
+        except Exception as e:
+            db.session.rollback()
+            self.logger.error(f"Route analysis store failed: {str(e)}")
+
+    def purge_expired(self) -> int:
+        """Delete expired entries, returning how many were removed"""
+        removed = RouteAnalysis.query.filter(
+            RouteAnalysis.expires_at < datetime.utcnow()
+        ).delete()
+        db.session.commit()
+        return removed
@@ -0,0 +1,246 @@
+# backend/app/services/route_graph.py
+
+from typing import Dict, List, Any, Optional, Tuple, Callable, Iterator
+import heapq
+import time
+import googlemaps.convert
+
+NodeKey = Tuple[float, float]
+Path = List[Tuple[NodeKey, NodeKey]]
+
+
+class RouteGraph:
+    """Directed walking graph assembled from the steps of Google Maps routes"""
+
+    def __init__(self, precision: int = 5):
+        # 5 decimal places is roughly 1m, enough to merge shared intersections
+        self.precision = precision
+        self.nodes: Dict[NodeKey, Dict[str, float]] = {}
+        self.edges: Dict[NodeKey, Dict[NodeKey, Dict[str, Any]]] = {}
+        self.source: Optional[NodeKey] = None
+        self.target: Optional[NodeKey] = None
+
+    def node_key(self, location: Dict[str, float]) -> NodeKey:
+        """Snap a lat/lng to the graph's node grid"""
+        return (
+            round(location['lat'], self.precision),
+            round(location['lng'], self.precision)
+        )
+
+    def add_route(self, route: Dict[str, Any]):
+        """Add every step of a directions route as an edge"""
+        steps = route['legs'][0]['steps']
+        if not steps:
+            return
+
+        for step in steps:
+            u = self.node_key(step['start_location'])
+            v = self.node_key(step['end_location'])
+            if u == v:
+                continue
+
+            self.nodes.setdefault(u, step['start_location'])
+            self.nodes.setdefault(v, step['end_location'])
+
+            distance = step.get('distance', {}).get('value', 0)
+            existing = self.edges.setdefault(u, {}).get(v)
+            # Keep the shortest step when two routes disagree on a segment
+            if existing is None or distance < existing['distance']:
+                self.edges[u][v] = {'step': step, 'distance': distance}
+
+        if self.source is None:
+            self.source = self.node_key(steps[0]['start_location'])
+            self.target = self.node_key(steps[-1]['end_location'])
+
+    def shortest_path(
+        self,
+        source: NodeKey,
+        target: NodeKey,
+        weight: Callable[[Dict[str, Any]], float],
+        removed_edges: Optional[set] = None,
+        removed_nodes: Optional[set] = None
+    ) -> Optional[Tuple[float, Path]]:
+        """Dijkstra shortest path, optionally ignoring edges and nodes"""
+        removed_edges = removed_edges or set()
+        removed_nodes = removed_nodes or set()
+
+        distances = {source: 0.0}
+        previous: Dict[NodeKey, NodeKey] = {}
+        queue = [(0.0, source)]
+        visited = set()
+
+        while queue:
+            cost, node = heapq.heappop(queue)
+            if node in visited:
+                continue
+            visited.add(node)
+
+            if node == target:
+                path = []
+                while node != source:
+                    path.append((previous[node], node))
+                    node = previous[node]
+                return cost, list(reversed(path))
+
+            for neighbor, edge in self.edges.get(node, {}).items():
+                if neighbor in removed_nodes or (node, neighbor) in removed_edges:
+                    continue
+                new_cost = cost + weight(edge)
+                if new_cost < distances.get(neighbor, float('inf')):
+                    distances[neighbor] = new_cost
+                    previous[neighbor] = node
+                    heapq.heappush(queue, (new_cost, neighbor))
+
+        return None
+
+    def k_shortest_paths(
+        self,
+        weight: Callable[[Dict[str, Any]], float],
+        deadline: float
+    ) -> Iterator[Tuple[float, Path]]:
+        """Yield loopless paths in increasing cost order (Yen's algorithm)"""
+        if self.source is None or self.source == self.target:
+            return
+
+        first = self.shortest_path(self.source, self.target, weight)
+        if first is None:
+            return
+
+        accepted = [first]
+        candidates: List[Tuple[float, int, Path]] = []
+        seen = {tuple(first[1])}
+        counter = 0
+        yield first
+
+        while time.monotonic() < deadline:
+            _, last_path = accepted[-1]
+
+            for i in range(len(last_path)):
+                if time.monotonic() >= deadline:
+                    return
+
+                spur_node = last_path[i][0]
+                root_path = last_path[:i]
+
+                removed_edges = {
+                    path[i] for _, path in accepted
+                    if len(path) > i and path[:i] == root_path
+                }
+                removed_nodes = {u for u, _ in root_path}
+
+                spur = self.shortest_path(
+                    spur_node, self.target, weight, removed_edges, removed_nodes
+                )
+                if spur is None:
+                    continue
+
+                total_path = root_path + spur[1]
+                key = tuple(total_path)
+                if key in seen:
+                    continue
+                seen.add(key)
+
+                total_cost = sum(weight(self.edges[u][v]) for u, v in total_path)
+                counter += 1
+                heapq.heappush(candidates, (total_cost, counter, total_path))
+
+            if not candidates:
+                return
+
+            cost, _, path = heapq.heappop(candidates)
+            accepted.append((cost, path))
+            yield cost, path
+
+    def path_distance(self, path: Path) -> float:
+        """Total walking distance of a path in meters"""
+        return sum(self.edges[u][v]['distance'] for u, v in path)
+
+    def path_to_route(self, path: Path, template: Dict[str, Any]) -> Dict[str, Any]:
+        """Rebuild a directions-style route dict from a graph path"""
+        steps = [self.edges[u][v]['step'] for u, v in path]
+        template_leg = template['legs'][0]
+
+        distance = sum(step.get('distance', {}).get('value', 0) for step in steps)
+        duration = sum(step.get('duration', {}).get('value', 0) for step in steps)
+
+        points = []
+        for step in steps:
+            encoded = step.get('polyline', {}).get('points')
+            if encoded:
+                points.extend(googlemaps.convert.decode_polyline(encoded))
+            else:
+                points.extend([step['start_location'], step['end_location']])
+
+        return {
+            'summary': template.get('summary', ''),
+            'legs': [{
+                'start_address': template_leg.get('start_address'),
+                'end_address': template_leg.get('end_address'),
+                'start_location': steps[0]['start_location'],
+                'end_location': steps[-1]['end_location'],
+                'distance': {'value': distance, 'text': f"{distance / 1000:.1f} km"},
+                'duration': {'value': duration, 'text': f"{round(duration / 60)} mins"},
+                'steps': steps
+            }],
+            'overview_polyline': {
+                'points': googlemaps.convert.encode_polyline(points)
+            },
+            'warnings': template.get('warnings', []),
+            'generated': True
+        }
+
+
+def path_overlap(graph: RouteGraph, path: Path, others: List[Path]) -> float:
+    """Largest fraction of a path's length shared with any other path"""
+    total = graph.path_distance(path)
+    if total <= 0 or not others:
+        return 0.0
+
+    edges = set(path)
+    shared = [
+        sum(graph.edges[u][v]['distance'] for u, v in edges.intersection(other))
+        for other in others
+    ]
+    return max(shared) / total
+
+
+def diverse_paths(
+    graph: RouteGraph,
+    k: int,
+    max_overlap: float = 0.8,
+    overlap_penalty: float = 1.0,
+    time_budget_ms: float = 250,
+    max_candidates: int = 50,
+    weight: Optional[Callable[[Dict[str, Any]], float]] = None
+) -> List[Path]:
+    """Pick up to k low-overlap paths from the k-shortest-paths stream
+
+    Candidates whose shared length with an already selected path exceeds
+    max_overlap are discarded; the rest are ranked by cost inflated by
+    overlap_penalty * overlap. Generation stops at the time budget.
+    """
+    weight = weight or (lambda edge: edge['distance'])
+    deadline = time.monotonic() + time_budget_ms / 1000
+
+    pool: List[Tuple[float, Path]] = []
+    for index, (cost, path) in enumerate(graph.k_shortest_paths(weight, deadline)):
+        pool.append((cost, path))
+        if index + 1 >= max_candidates or time.monotonic() >= deadline:
+            break
+
+    selected: List[Path] = []
+    while pool and len(selected) < k:
+        scored = []
+        for cost, path in pool:
+            overlap = path_overlap(graph, path, selected)
+            if overlap <= max_overlap or not selected:
+                scored.append((cost * (1 + overlap_penalty * overlap), cost, path))
+
+        if not scored:
+            break
+
+        _, cost, best = min(scored, key=lambda item: item[0])
+        selected.append(best)
+        pool.remove((cost, best))
+
+    return selected
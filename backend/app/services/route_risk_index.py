@@ -0,0 +1,97 @@
+# backend/app/services/route_risk_index.py
+
+from typing import Dict, List, Any, Optional, Tuple
+import numpy as np
+
+
+class RouteRiskIndex:
+    """Constant-time risk queries over contiguous stretches of a route
+
+    Per-segment risk (0-100) is stored as length-weighted prefix sums for
+    range averages, plus a sparse table of argmax indices for range maxima.
+    Both are built once when monitoring starts.
+    """
+
+    def __init__(self, risks: List[float], lengths: Optional[List[float]] = None):
+        self.risks = np.asarray(risks, dtype=float)
+        if lengths is None:
+            lengths = np.ones(len(self.risks))
+        self.lengths = np.maximum(np.asarray(lengths, dtype=float), 0)
+
+        if len(self.lengths) != len(self.risks):
+            raise ValueError("risks and lengths must have the same size")
+
+        self.prefix_length = np.concatenate([[0.0], np.cumsum(self.lengths)])
+        self.prefix_risk = np.concatenate([[0.0], np.cumsum(self.risks * self.lengths)])
+        self._sparse = self._build_sparse_table(self.risks)
+
+    def __len__(self) -> int:
+        return len(self.risks)
+
+    @staticmethod
+    def _build_sparse_table(values: np.ndarray) -> List[np.ndarray]:
+        """table[k][i] holds the argmax of values[i : i + 2**k]"""
+        n = len(values)
+        if n == 0:
+            return []
+
+        table = [np.arange(n)]
+        k = 1
+        while (1 << k) <= n:
+            prev = table[k - 1]
+            half = 1 << (k - 1)
+            left = prev[:n - (1 << k) + 1]
+            right = prev[half:half + len(left)]
+            table.append(np.where(values[right] > values[left], right, left))
+            k += 1
+        return table
+
+    def _clamp(self, start: int, end: Optional[int]) -> Tuple[int, int]:
+        n = len(self.risks)
+        end = n if end is None else end
+        return max(0, min(start, n)), max(0, min(end, n))
+
+    def range_distance(self, start: int, end: Optional[int] = None) -> float:
+        """Total length of segments [start, end)"""
+        start, end = self._clamp(start, end)
+        if start >= end:
+            return 0.0
+        return float(self.prefix_length[end] - self.prefix_length[start])
+
+    def range_risk(self, start: int, end: Optional[int] = None) -> Optional[float]:
+        """Length-weighted average risk of segments [start, end)"""
+        start, end = self._clamp(start, end)
+        if start >= end:
+            return None
+
+        length = self.prefix_length[end] - self.prefix_length[start]
+        if length <= 0:
+            return float(self.risks[start:end].mean())
+        return float((self.prefix_risk[end] - self.prefix_risk[start]) / length)
+
+    def range_max(self, start: int, end: Optional[int] = None) -> Optional[Tuple[int, float]]:
+        """Index and risk of the riskiest segment in [start, end)"""
+        start, end = self._clamp(start, end)
+        if start >= end:
+            return None
+
+        k = (end - start).bit_length() - 1
+        left = self._sparse[k][start]
+        right = self._sparse[k][end - (1 << k)]
+        index = int(right if self.risks[right] > self.risks[left] else left)
+        return index, float(self.risks[index])
+
+    def remaining(self, start: int, lookahead: Optional[int] = None) -> Dict[str, Any]:
+        """Summary of the route from segment `start` onward"""
+        end = None if lookahead is None else start + lookahead
+        riskiest = self.range_max(start, end)
+        average = self.range_risk(start)
+
+        return {
+            'remaining_risk': round(average, 2) if average is not None else None,
+            'remaining_distance': round(self.range_distance(start), 1),
+            'riskiest_upcoming': {
+                'index': riskiest[0],
+                'risk': round(riskiest[1], 2)
+            } if riskiest else None
+        }
@@ -1,13 +1,27 @@
 # backend/app/services/route_service.py
 
-from typing import Dict, List, Any
+from typing import Dict, List, Any, AsyncIterator, Tuple
 import googlemaps
 import google.generativeai as genai
 from datetime import datetime
 import numpy as np
+import asyncio
+import time
 from .safety_analyzer import SafetyAnalyzer
+from .route_graph import RouteGraph, diverse_paths
+from .corridor_scorer import CorridorScorer
+from .analysis_tiers import ANALYSIS_TIERS, DEFAULT_TIER
+from ..config import Config
+from ..utils.cache import TTLCache
+from ..utils.executors import run_blocking
 import logging
 
+# Segment scores shared by every RouteService instance (and so every user)
+_segment_cache = TTLCache(
+    ttl_seconds=Config.SEGMENT_SCORE_TTL_SECONDS,
+    max_entries=Config.SEGMENT_SCORE_CACHE_SIZE
+)
+
 class RouteService:
     def __init__(self, gmaps_key: str, gemini_key: str):
         self.gmaps = googlemaps.Client(
@@ -19,31 +33,34 @@ class RouteService:
             }
         )
         self.safety_analyzer = SafetyAnalyzer(gemini_key)
+        self.corridor_scorer = CorridorScorer(Config.CORRIDOR_BUFFER_METERS)
         self.logger = logging.getLogger(__name__)
 
     async def get_safe_route(
         self, 
         start: Dict[str, float], 
-        end: Dict[str, float]
+        end: Dict[str, float],
+        k: int = None,
+        tier: str = DEFAULT_TIER
     ) -> Dict[str, Any]:
         """Get the safest route with safety analysis"""
         try:
-            # Get multiple route options from Google Maps
-            routes = self.gmaps.directions(
-                (start['lat'], start['lng']),
-                (end['lat'], end['lng']),
-                mode="walking",
-                alternatives=True
-            )
+            settings = ANALYSIS_TIERS[tier]
+            routes = await self._get_candidate_routes(start, end, k, settings['alternatives'])
 
-            # Analyze safety for each route
-            route_analyses = []
-            for route in routes:
-                safety_analysis = await self._analyze_route_safety(route)
-                route_analyses.append({
-                    'route': route,
-                    'safety': safety_analysis
-                })
+            # Analyze safety for each route concurrently
+            safety_analyses = await asyncio.gather(*[
+                self._analyze_route_safety(
+                    route,
+                    per_point=settings['per_point'],
+                    budget_ms=settings['data_budget_ms']
+                )
+                for route in routes
+            ])
+            route_analyses = [
+                {'route': route, 'safety': safety_analysis}
+                for route, safety_analysis in zip(routes, safety_analyses)
+            ]
 
             # Sort routes by safety score
             sorted_routes = sorted(
@@ -56,6 +73,7 @@ class RouteService:
                 'routes': sorted_routes,
                 'safest_route': sorted_routes[0] if sorted_routes else None,
                 'alternatives': sorted_routes[1:],
+                'tier': tier,
                 'timestamp': datetime.now().isoformat()
             }
 
@@ -66,67 +84,416 @@ class RouteService:
                 'timestamp': datetime.now().isoformat()
             }
 
-    async def _analyze_route_safety(self, route: Dict) -> Dict[str, Any]:
-        """Analyze safety of a specific route"""
+    async def stream_safe_route(
+        self,
+        start: Dict[str, float],
+        end: Dict[str, float],
+        k: int = None,
+        tier: str = DEFAULT_TIER
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (event, data) pairs as route results become available
+
+        Emits 'routes' as soon as the candidates are known, one
+        'route_safety' per route in completion order, then 'ranking'.
+        """
+        settings = ANALYSIS_TIERS[tier]
+        routes = await self._get_candidate_routes(start, end, k, settings['alternatives'])
+        yield 'routes', {
+            'routes': routes,
+            'timestamp': datetime.now().isoformat()
+        }
+
+        async def analyze(index: int, route: Dict) -> Tuple[int, Dict[str, Any]]:
+            return index, await self._analyze_route_safety(
+                route,
+                per_point=settings['per_point'],
+                budget_ms=settings['data_budget_ms']
+            )
+
+        scores = {}
+        for next_result in asyncio.as_completed([
+            analyze(index, route) for index, route in enumerate(routes)
+        ]):
+            index, safety = await next_result
+            scores[index] = safety['safety_score']
+            yield 'route_safety', {'index': index, 'safety': safety}
+
+        order = sorted(scores, key=lambda index: scores[index], reverse=True)
+        yield 'ranking', {
+            'order': order,
+            'safest_index': order[0] if order else None,
+            'timestamp': datetime.now().isoformat()
+        }
+
+    async def _get_candidate_routes(
+        self,
+        start: Dict[str, float],
+        end: Dict[str, float],
+        k: int = None,
+        diverse: bool = True
+    ) -> List[Dict]:
+        """Fetch Google's alternatives and expand them into k diverse routes"""
+        # Get multiple route options from Google Maps
+        routes = await run_blocking(
+            'maps',
+            self.gmaps.directions,
+            (start['lat'], start['lng']),
+            (end['lat'], end['lng']),
+            mode="walking",
+            alternatives=True
+        )
+        if not diverse:
+            return routes
+
+        # Expand Google's alternatives into k diverse candidates
+        return await self._generate_diverse_routes(
+            start,
+            end,
+            routes,
+            k or Config.ROUTE_ALTERNATIVES_K
+        )
+
+    async def _generate_diverse_routes(
+        self,
+        start: Dict[str, float],
+        end: Dict[str, float],
+        routes: List[Dict],
+        k: int
+    ) -> List[Dict]:
+        """Generate k low-overlap routes over the graph of known steps"""
+        if not routes:
+            return routes
+
+        budget_ms = Config.ROUTE_ALTERNATIVES_BUDGET_MS
+        deadline = time.monotonic() + budget_ms / 1000
+
         try:
-            # Extract route points for analysis
-            points = self._extract_route_points(route)
-            
-            # Get safety data for each point
-            point_analyses = []
-            for point in points:
-                analysis = await self.safety_analyzer.analyze_route(
-                    {'lat': point[0], 'lng': point[1]},
-                    {'lat': point[0], 'lng': point[1]}
-                )
-                point_analyses.append(analysis)
+            candidates = routes + await self._fetch_detour_routes(start, end, deadline)
+
+            graph = RouteGraph()
+            for route in candidates:
+                graph.add_route(route)
+
+            remaining_ms = max(0, (deadline - time.monotonic()) * 1000)
+            paths = diverse_paths(
+                graph,
+                k,
+                max_overlap=Config.ROUTE_ALTERNATIVES_MAX_OVERLAP,
+                time_budget_ms=remaining_ms
+            )
+
+            if not paths:
+                return routes
+
+            return [graph.path_to_route(path, routes[0]) for path in paths]
+
+        except Exception as e:
+            self.logger.error(f"Error generating diverse routes: {str(e)}")
+            return routes
+
+    async def _fetch_detour_routes(
+        self,
+        start: Dict[str, float],
+        end: Dict[str, float],
+        deadline: float
+    ) -> List[Dict]:
+        """Fetch routes forced through points offset from the direct line"""
+        mid_lat = (start['lat'] + end['lat']) / 2
+        mid_lng = (start['lng'] + end['lng']) / 2
+
+        # Perpendicular to the start->end vector, scaled to a third of its length
+        offset_lat = -(end['lng'] - start['lng']) / 3
+        offset_lng = (end['lat'] - start['lat']) / 3
+
+        sides = [1, -1, 0.5, -0.5][:Config.ROUTE_DETOUR_SEEDS]
+        tasks = [
+            asyncio.ensure_future(run_blocking(
+                'maps',
+                self.gmaps.directions,
+                (start['lat'], start['lng']),
+                (end['lat'], end['lng']),
+                mode="walking",
+                waypoints=[f"via:{mid_lat + side * offset_lat},{mid_lng + side * offset_lng}"]
+            ))
+            for side in sides
+        ]
+        if not tasks:
+            return []
+
+        # Whatever has not arrived by the deadline is dropped
+        done, pending = await asyncio.wait(
+            tasks,
+            timeout=max(0, deadline - time.monotonic())
+        )
+        for task in pending:
+            task.cancel()
+
+        detours = []
+        for task in done:
+            try:
+                detours.extend(task.result())
+            except Exception as e:
+                self.logger.warning(f"Detour route request failed: {str(e)}")
 
-            # Combine analyses into overall route safety
-            return self._combine_safety_analyses(point_analyses)
+        return detours
+
+    async def _analyze_route_safety(
+        self,
+        route: Dict,
+        per_point: bool = False,
+        budget_ms: float = None
+    ) -> Dict[str, Any]:
+        """Analyze safety of a specific route from per-segment scores"""
+        try:
+            hour = datetime.now().hour
+            steps = route['legs'][0]['steps']
+            method = 'point' if per_point else 'corridor'
+            keys = [self._segment_key(step, hour, method) for step in steps]
+
+            # Alternatives and popular routes share most of their steps
+            analyses = [_segment_cache.get(key) for key in keys]
+            missing = [i for i, analysis in enumerate(analyses) if analysis is None]
+
+            if missing:
+                if per_point:
+                    computed = [await self._analyze_segment(steps[i]) for i in missing]
+                else:
+                    computed = await self._score_corridor_within_budget(
+                        [steps[i] for i in missing],
+                        is_night=hour < 6 or hour > 18,
+                        budget_ms=budget_ms
+                    )
+                for i, analysis in zip(missing, computed):
+                    analyses[i] = analysis
+                    # A fallback stands in for this request only; the next one retries
+                    if analysis is not None and analysis.get('source') != 'fallback':
+                        _segment_cache.set(keys[i], analysis)
+
+            segment_analyses = []
+            weights = []
+            segments = []
+            for step, key, analysis in zip(steps, keys, analyses):
+                if analysis is None:
+                    continue
+
+                distance = step.get('distance', {}).get('value', 0)
+                segment_analyses.append(analysis)
+                weights.append(max(distance, 1))
+                segments.append({
+                    'key': key[0],
+                    'distance': distance,
+                    'safety_score': analysis['safety_score']
+                })
+
+            # Combine segment analyses into overall route safety
+            combined = self._combine_safety_analyses(segment_analyses, weights)
+            combined['segments'] = segments
+            return combined
 
         except Exception as e:
             self.logger.error(f"Error analyzing route safety: {str(e)}")
             return self._get_fallback_route_analysis()
 
+    def _segment_key(self, step: Dict, hour: int, method: str = 'corridor') -> tuple:
+        """Normalized cache key for a route step within an hour bucket"""
+        encoded = step.get('polyline', {}).get('points')
+        if not encoded:
+            start, end = step['start_location'], step['end_location']
+            encoded = (
+                f"{start['lat']:.5f},{start['lng']:.5f};"
+                f"{end['lat']:.5f},{end['lng']:.5f}"
+            )
+        return (encoded, hour, method)
+
+    async def local_route_analysis(
+        self,
+        start: Dict[str, float],
+        end: Dict[str, float],
+        budget_ms: float = None
+    ) -> Dict[str, Any]:
+        """Score the direct line between two points from local data only"""
+        step = {
+            'start_location': start,
+            'end_location': end,
+            'distance': {'value': 0}
+        }
+        return await self._analyze_route_safety(
+            {'legs': [{'steps': [step]}]},
+            budget_ms=budget_ms
+        )
+
+    async def _score_corridor_within_budget(
+        self,
+        steps: List[Dict],
+        is_night: bool,
+        budget_ms: float = None
+    ) -> List[Dict[str, Any]]:
+        """Corridor scoring that gives up (scoring nothing) past the budget
+
+        Only the wait for data is abandoned: the fetch runs to completion
+        and warms the corridor cache for the next request.
+        """
+        try:
+            return await self._score_corridor(steps, is_night, budget_ms)
+        except asyncio.TimeoutError:
+            self.logger.warning(f"Corridor scoring exceeded {budget_ms}ms budget")
+            return [None] * len(steps)
+
+    async def _score_corridor(
+        self,
+        steps: List[Dict],
+        is_night: bool,
+        budget_ms: float = None
+    ) -> List[Dict[str, Any]]:
+        """Score steps in one vectorized pass over their decoded polylines"""
+        # Concatenate every step's polyline, marking the joins between steps
+        chunks = [self._decode_step(step) for step in steps]
+        points = np.concatenate(chunks)
+        point_ids = np.concatenate([
+            np.full(len(chunk), i) for i, chunk in enumerate(chunks)
+        ])
+        # Segments joining two steps belong to neither
+        step_ids = np.where(np.diff(point_ids) != 0, -1, point_ids[:-1])
+
+        pad = self.corridor_scorer.buffer_meters / 100000
+        data = await self.safety_analyzer.collect_corridor_data(
+            points[:, 0].min() - pad,
+            points[:, 0].max() + pad,
+            points[:, 1].min() - pad,
+            points[:, 1].max() + pad,
+            budget_ms=budget_ms
+        )
+        metrics = self.corridor_scorer.score_steps(points, data, step_ids, len(steps), is_night)
+        names = data.safe_spaces.attributes.get('business_name', np.empty(0))
+
+        analyses = []
+        for i in range(len(steps)):
+            if metrics['length'][i] <= 0:
+                analyses.append(None)
+                continue
+
+            incidents, lights, working = metrics['incidents'][i], metrics['lights'][i], metrics['working_lights'][i]
+            analyses.append({
+                'safety_score': round(float(metrics['score'][i]), 2),
+                'incidents': int(incidents),
+                'lights': int(lights),
+                'working_lights': int(working),
+                'risks': self._corridor_risks(incidents, lights, working, is_night),
+                'recommendations': self._corridor_recommendations(incidents, lights, is_night),
+                'safe_spaces': [str(name) for name in names[metrics['safe_space_mask'][i]] if name][:5]
+            })
+
+        return analyses
+
+    def _decode_step(self, step: Dict) -> np.ndarray:
+        """Decode a step's polyline to an (N, 2) lat/lng array"""
+        encoded = step.get('polyline', {}).get('points')
+        if encoded:
+            decoded = googlemaps.convert.decode_polyline(encoded)
+        else:
+            decoded = [step['start_location'], step['end_location']]
+        return np.array([[p['lat'], p['lng']] for p in decoded], dtype=float)
+
+    def _corridor_risks(
+        self,
+        incidents: float,
+        lights: float,
+        working: float,
+        is_night: bool
+    ) -> List[str]:
+        """Describe the main risks found along a corridor"""
+        risks = []
+        if incidents:
+            risks.append(f"{int(incidents)} recent incidents reported along this stretch")
+        if lights == 0:
+            risks.append("No street lighting recorded along this stretch")
+        elif working < lights:
+            risks.append(f"{int(lights - working)} street lights not working")
+        if is_night and lights == 0:
+            risks.append("Unlit section at night")
+        return risks
+
+    def _corridor_recommendations(
+        self,
+        incidents: float,
+        lights: float,
+        is_night: bool
+    ) -> List[str]:
+        """Recommendations matching corridor risks"""
+        recommendations = []
+        if incidents:
+            recommendations.append("Stay alert and keep to busier sides of the street")
+        if is_night and lights == 0:
+            recommendations.append("Consider a better lit alternative after dark")
+        if not recommendations:
+            recommendations.append("Maintain awareness of surroundings")
+        return recommendations
+
+    async def _analyze_segment(self, step: Dict) -> Dict[str, Any]:
+        """Analyze a single route step from its sample points"""
+        point_analyses = []
+        for point in self._extract_step_points(step):
+            analysis = await self.safety_analyzer.analyze_area(
+                {'lat': point[0], 'lng': point[1]}
+            )
+            point_analyses.append(analysis)
+
+        if not point_analyses:
+            return None
+
+        combined = self._combine_safety_analyses(point_analyses)
+        segment = {
+            'safety_score': combined['safety_score'],
+            'risks': combined['risks'],
+            'recommendations': combined['recommendations'],
+            'safe_spaces': combined['safe_spaces']
+        }
+        if any(analysis.get('source') == 'fallback' for analysis in point_analyses):
+            segment['source'] = 'fallback'
+        return segment
+
     def _extract_route_points(self, route: Dict) -> List[List[float]]:
         """Extract key points along the route for analysis"""
         points = []
-        steps = route['legs'][0]['steps']
-        
-        for step in steps:
-            start = [
-                step['start_location']['lat'],
-                step['start_location']['lng']
-            ]
-            end = [
-                step['end_location']['lat'],
-                step['end_location']['lng']
-            ]
-            
-            # Add intermediate points for long segments
-            if 'distance' in step and step['distance']['value'] > 500:  # > 500m
-                num_points = int(step['distance']['value'] / 500)
-                for i in range(num_points):
-                    lat = start[0] + (end[0] - start[0]) * (i + 1) / (num_points + 1)
-                    lng = start[1] + (end[1] - start[1]) * (i + 1) / (num_points + 1)
-                    points.append([lat, lng])
-            else:
-                points.append(start)
-                points.append(end)
-
+        for step in route['legs'][0]['steps']:
+            points.extend(self._extract_step_points(step))
         return points
 
+    def _extract_step_points(self, step: Dict) -> List[List[float]]:
+        """Extract key points along a single step"""
+        start = [
+            step['start_location']['lat'],
+            step['start_location']['lng']
+        ]
+        end = [
+            step['end_location']['lat'],
+            step['end_location']['lng']
+        ]
+
+        # Add intermediate points for long segments
+        if 'distance' in step and step['distance']['value'] > 500:  # > 500m
+            points = []
+            num_points = int(step['distance']['value'] / 500)
+            for i in range(num_points):
+                lat = start[0] + (end[0] - start[0]) * (i + 1) / (num_points + 1)
+                lng = start[1] + (end[1] - start[1]) * (i + 1) / (num_points + 1)
+                points.append([lat, lng])
+            return points
+
+        return [start, end]
+
     def _combine_safety_analyses(
         self, 
-        analyses: List[Dict[str, Any]]
+        analyses: List[Dict[str, Any]],
+        weights: List[float] = None
     ) -> Dict[str, Any]:
-        """Combine multiple point safety analyses into route analysis"""
+        """Combine multiple safety analyses into route analysis"""
         if not analyses:
             return self._get_fallback_route_analysis()
 
-        # Calculate average safety score
+        # Calculate (optionally length-weighted) average safety score
         safety_scores = [a['safety_score'] for a in analyses]
-        avg_score = np.mean(safety_scores)
+        avg_score = float(np.average(safety_scores, weights=weights))
 
         # Combine risks and recommendations
         all_risks = set()
@@ -134,9 +501,9 @@ class RouteService:
         all_safe_spaces = set()
 
         for analysis in analyses:
-            all_risks.update(analysis['risks'])
-            all_recommendations.update(analysis['recommendations'])
-            all_safe_spaces.update(analysis['safe_spaces'])
+            all_risks.update(analysis.get('risks', []))
+            all_recommendations.update(analysis.get('recommendations', []))
+            all_safe_spaces.update(analysis.get('safe_spaces', []))
 
         return {
             'safety_score': round(avg_score, 2),
@@ -147,7 +514,7 @@ class RouteService:
             'score_breakdown': {
                 'min': min(safety_scores),
                 'max': max(safety_scores),
-                'std': np.std(safety_scores)
+                'std': float(np.std(safety_scores))
             }
         }
 
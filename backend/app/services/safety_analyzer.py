@@ -1,18 +1,34 @@
 # backend/app/services/safety_analyzer.py
 
-import google.generativeai as genai
 import pandas as pd
 import requests
 from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
+from concurrent.futures import Future
 import logging
 import json
+import math
+import asyncio
+import threading
+from .corridor_scorer import CorridorData, FeatureIndex
+from .prompt_context import area_context
+from .model_registry import model_registry, TEXT_MODEL
+from .llm_usage import record_fallback, record_parse_failure
+from ..utils.cache import TTLCache
+from ..utils.executors import get_executor, run_blocking
+from ..config import Config
+
+# Raw corridor data keyed by grid-aligned bounding box
+_corridor_cache = TTLCache(ttl_seconds=900, max_entries=256)
+# Corridor fetches in flight, so concurrent requests for one box share them
+_inflight: Dict[Tuple[float, float, float, float], Future] = {}
+_inflight_lock = threading.Lock()
 
 class SafetyAnalyzer:
     def __init__(self, api_key: str):
         self.logger = logging.getLogger(__name__)
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
+        model_registry.configure(api_key)
+        self.model_name = TEXT_MODEL
         
         # SF Data API endpoints
         self.endpoints = {
@@ -32,12 +48,17 @@ class SafetyAnalyzer:
             prompt = self._create_area_safety_prompt(area_data)
             
             # Get Gemini's analysis
-            response = self.model.generate_content(prompt)
+            response = await model_registry.generate_async(
+                prompt,
+                self.model_name,
+                call_site='segment_analysis'
+            )
             
             return self._process_gemini_response(response.text)
             
         except Exception as e:
             self.logger.error(f"Area analysis error: {str(e)}")
+            record_fallback('segment_analysis', error=e)
             return self._get_fallback_analysis()
 
     async def _collect_area_data(self, location: Dict[str, Any]) -> Dict[str, Any]:
@@ -50,36 +71,23 @@ class SafetyAnalyzer:
         min_lng = min(location['lng'], location['lng']) - 0.01
         max_lng = max(location['lng'], location['lng']) + 0.01
         
-        # Fetch recent incidents
-        incidents = requests.get(
-            self.endpoints['crime'],
-            params={
-                '$where': f"""
-                    latitude between {min_lat} and {max_lat}
-                    AND longitude between {min_lng} and {max_lng}
-                    AND date >= '{(current_time - timedelta(days=30)).strftime('%Y-%m-%d')}'
-                """,
-                '$limit': 1000
-            }
-        ).json()
-        
-        # Fetch street lights
-        lights = requests.get(
-            self.endpoints['lighting'],
-            params={
-                '$where': f"latitude between {min_lat} and {max_lat} AND longitude between {min_lng} and {max_lng}",
-                '$limit': 1000
-            }
-        ).json()
-        
-        # Fetch safe spaces (businesses)
-        businesses = requests.get(
-            self.endpoints['businesses'],
-            params={
-                '$where': f"latitude between {min_lat} and {max_lat} AND longitude between {min_lng} and {max_lng}",
-                '$limit': 1000
-            }
-        ).json()
+        bbox = f"latitude between {min_lat} and {max_lat} AND longitude between {min_lng} and {max_lng}"
+
+        # Fetch recent incidents, street lights and safe spaces concurrently
+        incidents, lights, businesses = await asyncio.gather(
+            self._fetch_json(
+                self.endpoints['crime'],
+                {
+                    '$where': f"""
+                        {bbox}
+                        AND date >= '{(current_time - timedelta(days=30)).strftime('%Y-%m-%d')}'
+                    """,
+                    '$limit': 1000
+                }
+            ),
+            self._fetch_json(self.endpoints['lighting'], {'$where': bbox, '$limit': 1000}),
+            self._fetch_json(self.endpoints['businesses'], {'$where': bbox, '$limit': 1000})
+        )
         
         return {
             'incidents': self._process_incidents(incidents),
@@ -91,6 +99,118 @@ class SafetyAnalyzer:
             }
         }
 
+    async def collect_corridor_data(
+        self,
+        min_lat: float,
+        max_lat: float,
+        min_lng: float,
+        max_lng: float,
+        budget_ms: float = None
+    ) -> CorridorData:
+        """Fetch indexed incidents, lights and safe spaces for a bounding box
+
+        With a budget, raises asyncio.TimeoutError once it is spent; the
+        fetch itself carries on and still fills the cache for the next
+        request.
+        """
+        waiter = asyncio.wrap_future(self.corridor_future(min_lat, max_lat, min_lng, max_lng))
+        if budget_ms is None:
+            return await waiter
+        return await asyncio.wait_for(waiter, timeout=budget_ms / 1000)
+
+    def corridor_future(
+        self,
+        min_lat: float,
+        max_lat: float,
+        min_lng: float,
+        max_lng: float
+    ) -> Future:
+        """Corridor data for a bounding box as a future independent of any event loop
+
+        Callers for the same box share one fetch, which cannot be
+        cancelled by a caller giving up on it.
+        """
+        # Align to a 0.01 degree grid so nearby routes share one fetch
+        min_lat = math.floor(min_lat * 100) / 100
+        min_lng = math.floor(min_lng * 100) / 100
+        max_lat = math.ceil(max_lat * 100) / 100
+        max_lng = math.ceil(max_lng * 100) / 100
+
+        key = (min_lat, max_lat, min_lng, max_lng)
+        cached = _corridor_cache.get(key)
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return future
+
+        with _inflight_lock:
+            future = _inflight.get(key)
+            if future is None:
+                future = _inflight[key] = self._start_corridor_fetch(key)
+        return future
+
+    def _start_corridor_fetch(self, key: Tuple[float, float, float, float]) -> Future:
+        """Run the three SODA queries on the soda pool and cache the result when all are back"""
+        min_lat, max_lat, min_lng, max_lng = key
+        current_time = datetime.now()
+        bbox = f"latitude between {min_lat} and {max_lat} AND longitude between {min_lng} and {max_lng}"
+
+        pool = get_executor('soda')
+        fetches = [
+            pool.submit(self._get_json, self.endpoints['crime'], {
+                '$where': f"{bbox} AND date >= '{(current_time - timedelta(days=30)).strftime('%Y-%m-%d')}'",
+                '$select': 'latitude,longitude,incident_category',
+                '$limit': 5000
+            }),
+            pool.submit(self._get_json, self.endpoints['lighting'], {'$where': bbox, '$limit': 5000}),
+            pool.submit(self._get_json, self.endpoints['businesses'], {'$where': bbox, '$limit': 5000})
+        ]
+
+        # Running from the start: cancel() is a no-op, so no waiter can abort the fetch
+        result = Future()
+        result.set_running_or_notify_cancel()
+        remaining = [len(fetches)]
+        lock = threading.Lock()
+
+        def finish(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            try:
+                incidents, lights, businesses = (f.result() for f in fetches)
+                safe_types = {'GROCERY', 'PHARMACY', 'HOTEL', 'RESTAURANT', 'BANK'}
+                safe_spaces = [
+                    b for b in businesses
+                    if isinstance(b, dict) and b.get('business_type') in safe_types
+                ]
+                data = CorridorData(
+                    incidents=FeatureIndex.from_records(incidents, ('incident_category',)),
+                    lights=FeatureIndex.from_records(lights, ('status',)),
+                    safe_spaces=FeatureIndex.from_records(safe_spaces, ('business_name',))
+                )
+                _corridor_cache.set(key, data)
+                result.set_result(data)
+            except Exception as e:
+                self.logger.error(f"Corridor data fetch failed: {str(e)}")
+                result.set_exception(e)
+            finally:
+                with _inflight_lock:
+                    _inflight.pop(key, None)
+
+        for fetch in fetches:
+            fetch.add_done_callback(finish)
+        return result
+
+    def _get_json(self, url: str, params: Dict[str, Any]) -> List[Dict]:
+        """Blocking GET of a SODA endpoint"""
+        response = requests.get(url, params=params, timeout=Config.SODA_TIMEOUT_SECONDS)
+        return response.json()
+
+    async def _fetch_json(self, url: str, params: Dict[str, Any]) -> List[Dict]:
+        """GET a SODA endpoint on the bounded upstream pool"""
+        return await run_blocking('soda', self._get_json, url, params)
+
     def _process_incidents(self, incidents: List[Dict]) -> Dict[str, Any]:
         """Process crime incidents data"""
         df = pd.DataFrame(incidents)
@@ -136,35 +256,10 @@ class SafetyAnalyzer:
 
     def _create_area_safety_prompt(self, data: Dict[str, Any]) -> str:
         """Create prompt for Gemini analysis"""
-        return f"""
-        Analyze the safety of this area in San Francisco.
-        
-        Current Conditions:
-        - Time: {data['time_info']['current_time']}
-        - Period: {'Night' if data['time_info']['is_night'] else 'Day'}
-        
-        Safety Data:
-        - Recent Incidents: {data['incidents']['total']}
-        - Street Lighting: {data['lighting']['working']} working lights ({data['lighting']['coverage']:.1f}% coverage)
-        - Safe Spaces: {len(data['safe_spaces']['safe_spaces'])} locations
-        
-        Provide a safety analysis with:
-        1. Overall safety score (0-100)
-        2. Specific risks and their locations
-        3. Recommended precautions
-        4. Safe spaces in the area
-        5. Emergency resources
-        
-        Format the response as JSON with these exact keys:
-        {
-            "safety_score": number,
-            "risk_level": "low"|"medium"|"high",
-            "risks": [string],
-            "recommendations": [string],
-            "safe_spaces": [string],
-            "emergency_resources": [string]
-        }
-        """
+        return f"""Assess pedestrian safety of this San Francisco area.
+{area_context(data).render()}
+Reply with JSON only, short strings:
+{{"safety_score":<0-100>,"risk_level":"low|medium|high","risks":[<=3],"recommendations":[<=3],"safe_spaces":[<=3],"emergency_resources":[<=3]}}"""
 
     def _process_gemini_response(self, response: str) -> Dict[str, Any]:
         """Process Gemini's response into structured data"""
@@ -174,13 +269,15 @@ class SafetyAnalyzer:
             end_idx = response.rfind('}') + 1
             if start_idx != -1 and end_idx != -1:
                 return json.loads(response[start_idx:end_idx])
-            return self._get_fallback_analysis()
-        except:
-            return self._get_fallback_analysis()
+        except ValueError:
+            pass
+        record_parse_failure('segment_analysis')
+        return self._get_fallback_analysis()
 
     def _get_fallback_analysis(self) -> Dict[str, Any]:
         """Provide fallback analysis if AI processing fails"""
         return {
+            "source": "fallback",
             "safety_score": 70,
             "risk_level": "medium",
             "risks": [
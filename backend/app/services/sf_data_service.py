@@ -1,4 +1,5 @@
 import asyncio
+import contextlib
 from typing import Dict, List, Optional, Tuple
 import aiohttp
 import pandas as pd
@@ -21,9 +22,14 @@ class SFDataService:
         self,
         dataset_name: str,
         query_params: Dict,
-        timeout: int = 30
+        timeout: int = 30,
+        session: Optional[aiohttp.ClientSession] = None
     ) -> List[Dict]:
-        """Fetch data from SF OpenData API with logging"""
+        """Fetch data from SF OpenData API with logging
+
+        Pass `session` to reuse its connection pool instead of opening a
+        new one for the request.
+        """
         if dataset_name not in self.datasets:
             self.logger.log_error(
                 "InvalidDataset",
@@ -37,8 +43,8 @@ class SFDataService:
         try:
             self.logger.log_api_request(dataset_name, query_params)
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=query_params, timeout=timeout) as response:
+            async with self._session(session) as client:
+                async with client.get(url, params=query_params, timeout=timeout) as response:
                     response_time = (time.time() - start_time) * 1000  # Convert to ms
                     
                     self.logger.log_api_response(
@@ -72,12 +78,19 @@ class SFDataService:
             )
             return []
 
+    def _session(self, session: Optional[aiohttp.ClientSession]):
+        """Context for a caller's shared session (left open) or a new one"""
+        if session is None:
+            return aiohttp.ClientSession()
+        return contextlib.nullcontext(session)
+
     async def get_area_safety_data(
         self,
         lat: float,
         lng: float,
         radius_meters: int = 500,
-        time_window_days: int = 30
+        time_window_days: int = 30,
+        session: Optional[aiohttp.ClientSession] = None
     ) -> Dict:
         """Get safety data for an area with logging"""
         start_time = time.time()
@@ -94,9 +107,9 @@ class SFDataService:
 
         try:
             datasets = await asyncio.gather(
-                self.fetch_dataset('police_incidents', self._build_incident_query(lat, lng, radius_meters, time_window_days)),
-                self.fetch_dataset('street_lights', self._build_light_query(lat, lng, radius_meters)),
-                self.fetch_dataset('311_cases', self._build_cases_query(lat, lng, radius_meters, time_window_days))
+                self.fetch_dataset('police_incidents', self._build_incident_query(lat, lng, radius_meters, time_window_days), session=session),
+                self.fetch_dataset('street_lights', self._build_light_query(lat, lng, radius_meters), session=session),
+                self.fetch_dataset('311_cases', self._build_cases_query(lat, lng, radius_meters, time_window_days), session=session)
             )
             
             safety_data = self.analyze_safety_data(*datasets)
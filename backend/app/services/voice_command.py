@@ -1,16 +1,17 @@
 # backend/app/services/voice_command.py
 
-import google.generativeai as genai
 from typing import Dict, Any
 import logging
 import json
 from datetime import datetime
+from .model_registry import model_registry, TEXT_MODEL
+from .llm_usage import record_fallback, record_parse_failure
 
 class VoiceCommandService:
     def __init__(self, api_key: str):
         self.logger = logging.getLogger(__name__)
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
+        model_registry.configure(api_key)
+        self.model_name = TEXT_MODEL
         
         # Define command patterns
         self.command_patterns = {
@@ -43,23 +44,29 @@ class VoiceCommandService:
             }}
             """
 
-            response = self.model.generate_content(prompt)
-            return self._parse_response(response.text)
+            response = await model_registry.generate_async(
+                prompt,
+                self.model_name,
+                call_site='voice_command'
+            )
+            return self._parse_response(response.text, 'voice_command')
 
         except Exception as e:
             self.logger.error(f"Voice command processing error: {str(e)}")
+            record_fallback('voice_command', error=e)
             return self._get_fallback_response()
 
-    def _parse_response(self, response: str) -> Dict[str, Any]:
+    def _parse_response(self, response: str, call_site: str, template: str = None) -> Dict[str, Any]:
         """Parse Gemini's response into structured data"""
         try:
             start_idx = response.find('{')
             end_idx = response.rfind('}') + 1
             if start_idx != -1 and end_idx != -1:
                 return json.loads(response[start_idx:end_idx])
-            return self._get_fallback_response()
-        except:
-            return self._get_fallback_response()
+        except ValueError:
+            pass
+        record_parse_failure(call_site, template)
+        return self._get_fallback_response()
 
     def _get_fallback_response(self) -> Dict[str, Any]:
         """Provide fallback response if processing fails"""
@@ -103,8 +110,14 @@ class VoiceCommandService:
             }}
             """
 
-            response = self.model.generate_content(prompt)
-            return self._parse_response(response.text)
+            response = await model_registry.generate_async(
+                prompt,
+                self.model_name,
+                call_site='voice_command',
+                template='voice_multilingual'
+            )
+            return self._parse_response(response.text, 'voice_command', 'voice_multilingual')
         except Exception as e:
             self.logger.error(f"Multilingual command processing error: {str(e)}")
+            record_fallback('voice_command', 'voice_multilingual', error=e)
             return self._get_fallback_response()
\ No newline at end of file
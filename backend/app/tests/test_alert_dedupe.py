@@ -0,0 +1,92 @@
+# test_alert_dedupe.py
+from contextlib import contextmanager
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app.models import AlertBurst
+from app.services.alert_dedupe import AlertDeduper
+
+
+def make_deduper(tmp_path, **kwargs):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bursts.db'}")
+    AlertBurst.__table__.create(engine, checkfirst=True)
+
+    @contextmanager
+    def session_factory():
+        with Session(engine, expire_on_commit=False) as session, session.begin():
+            yield session
+
+    return AlertDeduper(session_factory, **kwargs), session_factory
+
+
+def test_repeats_and_retries_collapse_into_the_first_alert(tmp_path):
+    deduper, session_factory = make_deduper(tmp_path, window_seconds=60)
+
+    burst, opener = deduper.claim('alert', 1, 'tap-1')
+    assert opener
+    deduper.opened(burst, {'alert_id': 42}, alert_id=42)
+
+    retry, opener = deduper.claim('alert', 1, 'tap-1')
+    assert not opener and retry['update_count'] == 0
+    repeat, opener = deduper.claim('alert', 1, 'tap-2')
+    assert not opener and repeat['result'].result() == {'alert_id': 42}
+    assert repeat['update_count'] == 1
+
+    # Another user is not part of the burst
+    assert deduper.claim('alert', 2)[1]
+
+    with session_factory() as session:
+        row = session.query(AlertBurst).filter_by(alert_id=42).one()
+        assert (row.update_count, row.idempotency_keys) == (1, '["tap-1", "tap-2"]')
+
+    # A restarted process still recognises the keys
+    restarted, _ = make_deduper(tmp_path, window_seconds=60)
+    burst, opener = restarted.claim('alert', 1, 'tap-2')
+    assert not opener and burst['result'].result() == {'alert_id': 42}
+
+
+def test_closed_or_abandoned_bursts_start_over(tmp_path):
+    deduper, _ = make_deduper(tmp_path, window_seconds=60)
+
+    burst, _ = deduper.claim('alert', 1)
+    deduper.opened(burst, {'alert_id': 1}, alert_id=1)
+    deduper.close('alert', 1)
+    burst, opener = deduper.claim('alert', 1, 'key')
+    assert opener
+
+    deduper.abandon(burst, RuntimeError('db down'))
+    assert deduper.claim('alert', 1, 'key')[1]
+
+
+def test_sos_duplicate_that_times_out_leaves_the_burst_intact(tmp_path, monkeypatch):
+    import asyncio
+    import threading
+    from app.config import Config
+    from app.services import monitoring_service
+
+    deduper, _ = make_deduper(tmp_path, window_seconds=60)
+    monkeypatch.setattr(monitoring_service, 'alert_deduper', deduper)
+    monkeypatch.setattr(Config, 'ALERT_BURST_WAIT_SECONDS', 0.05)
+    service = monitoring_service.MonitoringService('test-key')
+    release = threading.Event()
+
+    async def slow_emergency(location, user_report=None):
+        await asyncio.to_thread(release.wait, 5)
+        return {'guidance': ['real'], 'source': 'model'}
+
+    service.emergency_service.handle_emergency = slow_emergency
+    location = {'lat': 37.78, 'lng': -122.41}
+
+    async def scenario():
+        opener = asyncio.ensure_future(service.handle_sos('user-1', location))
+        while ('sos', 'user-1') not in deduper._bursts:
+            await asyncio.sleep(0.01)
+        timed_out = await service.handle_sos('user-1', location)
+        release.set()
+        first = await opener
+        again = await service.handle_sos('user-1', location)
+        return timed_out, first, again
+
+    timed_out, first, again = asyncio.run(scenario())
+    assert timed_out['duplicate'] and timed_out['source'] == 'fallback'
+    assert first['guidance'] == ['real'] and not first.get('duplicate')
+    assert again['duplicate'] and again['guidance'] == ['real']
@@ -0,0 +1,60 @@
+# test_area_analysis.py
+import asyncio
+import threading
+import time
+from app.config import Config
+from app.services import gemini_service, safety_analyzer
+from app.services.gemini_service import GeminiService
+from app.services.safety_analyzer import SafetyAnalyzer
+from app.utils.cache import TTLCache
+
+LOCATION = {'lat': 37.7411, 'lng': -122.4711}
+
+
+def test_cold_area_answers_within_budget_and_warms_the_cache(monkeypatch):
+    corridor_cache = TTLCache(ttl_seconds=900)
+    monkeypatch.setattr(safety_analyzer, '_corridor_cache', corridor_cache)
+    monkeypatch.setattr(Config, 'AREA_LOCAL_BUDGET_MS', 20)
+    release = threading.Event()
+
+    def slow_get_json(self, url, params):
+        release.wait(5)
+        return [{'latitude': str(LOCATION['lat']), 'longitude': str(LOCATION['lng']), 'status': 'WORKING'}]
+
+    monkeypatch.setattr(SafetyAnalyzer, '_get_json', slow_get_json)
+    service = GeminiService('test-key')
+
+    started = time.monotonic()
+    cold = asyncio.run(service.local_area_analysis(LOCATION))
+    assert time.monotonic() - started < 1
+    assert cold['source'] == 'local' and cold['confidence_score'] == 0.3
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while not len(corridor_cache) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    warm = asyncio.run(service.local_area_analysis(LOCATION))
+    assert warm['source'] == 'local' and warm['confidence_score'] == 0.6
+
+
+def test_unparseable_batch_falls_back_to_single_area_prompts(monkeypatch):
+    service = GeminiService('test-key')
+    prompts = []
+
+    class Response:
+        def __init__(self, text):
+            self.text = text
+
+    def fake_generate(prompt, *args, **kwargs):
+        prompts.append(kwargs['call_site'])
+        if kwargs['call_site'] == 'area_batch':
+            return Response('Here are the areas: [{"index": 0, "safety_score": 80')
+        lat = prompt.split('lat ')[1].split(',')[0]
+        return Response(f'{{"area_safety_score": {80 if lat.startswith("37.74") else 60}}}')
+
+    monkeypatch.setattr(gemini_service.model_registry, 'generate', fake_generate)
+    results = service._analyze_area_batch([LOCATION, {'lat': 37.7811, 'lng': -122.4111}])
+
+    assert results == [{'area_safety_score': 80}, {'area_safety_score': 60}]
+    assert prompts == ['area_batch', 'area_analysis', 'area_analysis']
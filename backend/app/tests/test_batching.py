@@ -0,0 +1,90 @@
+# test_batching.py
+from concurrent.futures import Future, ThreadPoolExecutor
+import time
+import pytest
+from app.utils.batching import MicroBatcher
+
+
+def test_items_submitted_together_share_a_batch():
+    batches = []
+
+    def handler(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(handler, ThreadPoolExecutor(2), window_ms=50, max_items=10)
+    futures = [batcher.submit(i) for i in range(5)]
+
+    assert [f.result(timeout=2) for f in futures] == [0, 2, 4, 6, 8]
+    assert batches == [[0, 1, 2, 3, 4]]
+
+
+def test_full_batch_closes_early_and_keys_are_deduplicated():
+    batches = []
+
+    def handler(items):
+        batches.append(list(items))
+        return items
+
+    batcher = MicroBatcher(handler, ThreadPoolExecutor(2), window_ms=5000, max_items=2)
+    first = batcher.submit('a', key='a')
+    duplicate = batcher.submit('a', key='a')
+    second = batcher.submit('b', key='b')
+
+    assert first is duplicate
+    assert second.result(timeout=2) == 'b'
+    assert batches == [['a', 'b']]
+
+
+def test_handler_failure_reaches_every_caller():
+    def handler(items):
+        return items[:1]
+
+    batcher = MicroBatcher(handler, ThreadPoolExecutor(1), window_ms=20, max_items=10)
+    futures = [batcher.submit(i) for i in range(3)]
+
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=2)
+
+
+def test_batches_never_exceed_max_items():
+    batches = []
+
+    def handler(items):
+        batches.append(len(items))
+        return items
+
+    batcher = MicroBatcher(handler, ThreadPoolExecutor(2), window_ms=50, max_items=3)
+    futures = [batcher.submit(i) for i in range(7)]
+
+    assert [f.result(timeout=2) for f in futures] == list(range(7))
+    assert max(batches) <= 3 and sum(batches) == 7
+
+
+def test_batches_wait_for_admission_without_holding_a_thread():
+    tickets, released = [], []
+
+    def admit():
+        tickets.append(Future())
+        return tickets[-1]
+
+    pool = ThreadPoolExecutor(1)
+    batcher = MicroBatcher(
+        lambda items: items, pool, window_ms=10, max_items=1,
+        admit=admit, release=lambda: released.append(True)
+    )
+    first = batcher.submit('a')
+    second = batcher.submit('b')
+    while len(tickets) < 2:
+        time.sleep(0.01)
+
+    # Nothing admitted yet, so the single pool thread is free
+    assert pool.submit(lambda: 'free').result(timeout=1) == 'free'
+    tickets[1].set_result('background')
+    assert second.result(timeout=2) == 'b' and not first.done()
+
+    tickets[0].set_exception(RuntimeError('shed'))
+    with pytest.raises(RuntimeError):
+        first.result(timeout=2)
+    assert released == [True]
@@ -0,0 +1,86 @@
+# test_corridor_scorer.py
+import numpy as np
+from app.services.corridor_scorer import CorridorScorer, CorridorData, FeatureIndex
+
+
+def make_index(coords, **attributes):
+    return FeatureIndex(np.array(coords, dtype=float).reshape(-1, 2), attributes)
+
+
+# Roughly 111m due north, then 111m due east
+POLYLINE = np.array([[37.0, -122.0], [37.001, -122.0], [37.001, -121.99875]])
+
+
+def test_features_counted_per_segment_within_buffer():
+    data = CorridorData(
+        incidents=make_index([
+            [37.0005, -122.0001],   # ~9m from the first segment
+            [37.0005, -122.0010],   # ~89m away, outside the buffer
+            [37.0011, -121.9995],   # ~11m from the second segment
+        ]),
+        lights=make_index([[37.0009, -122.0], [37.001, -121.999]], status=np.array(['WORKING', 'BROKEN'])),
+        safe_spaces=make_index([]),
+    )
+    metrics = CorridorScorer(buffer_meters=30).score_segments(POLYLINE, data)
+
+    assert metrics['incidents'].tolist() == [1, 1]
+    assert metrics['lights'].tolist() == [1, 2]
+    assert metrics['working_lights'].tolist() == [1, 1]
+    assert np.allclose(metrics['length'], [110.5, 111.0], atol=1.5)
+
+
+def test_breaks_are_ignored():
+    data = CorridorData(make_index([[37.001, -121.999]]), make_index([]), make_index([]))
+    breaks = np.array([False, True])
+    metrics = CorridorScorer(buffer_meters=30).score_segments(POLYLINE, data, breaks=breaks)
+
+    assert metrics['length'][1] == 0
+    assert metrics['incidents'].tolist() == [0, 0]
+
+
+def test_weighted_score_uses_segment_length():
+    scorer = CorridorScorer()
+    assert scorer.weighted_score(np.array([100.0, 40.0]), np.array([300.0, 100.0])) == 85.0
+    assert scorer.weighted_score(np.array([50.0]), np.array([0.0])) is None
+
+
+def test_area_counts_features_within_radius():
+    data = CorridorData(
+        incidents=make_index([[37.0005, -122.0], [37.003, -122.0]]),   # ~55m and ~330m away
+        lights=make_index([[37.0, -122.0005], [37.0, -121.9995]], status=np.array(['WORKING', 'BROKEN'])),
+        safe_spaces=make_index([[37.0, -122.0001]], business_name=np.array(['Corner Pharmacy'])),
+    )
+    area = CorridorScorer().score_area((37.0, -122.0), data, radius_meters=100)
+
+    assert area['incidents'] == 1
+    assert (area['lights'], area['working_lights']) == (2, 1)
+    assert data.safe_spaces.attributes['business_name'][area['safe_spaces']].tolist() == ['Corner Pharmacy']
+    assert 0 <= area['score'] < 100
+
+
+def test_step_metrics_do_not_depend_on_polyline_detail():
+    # One ~200m street due north, with an incident and a light beside it
+    data = CorridorData(
+        incidents=make_index([[37.0009, -122.0001]]),
+        lights=make_index([[37.0011, -121.9999]], status=np.array(['WORKING'])),
+        safe_spaces=make_index([]),
+    )
+    scorer = CorridorScorer(buffer_meters=50)
+
+    results = []
+    for vertices in (2, 5, 21, 81):
+        points = np.column_stack([np.linspace(37.0, 37.0018, vertices), np.full(vertices, -122.0)])
+        metrics = scorer.score_steps(points, data, np.zeros(vertices - 1, dtype=int), 1)
+        results.append((int(metrics['incidents'][0]), int(metrics['lights'][0]), round(float(metrics['score'][0]), 6)))
+        assert np.isclose(metrics['length'][0], 199, atol=1)
+
+    assert results[0][:2] == (1, 1)
+    assert len(set(results)) == 1
+
+
+def test_joins_between_steps_are_ignored():
+    data = CorridorData(make_index([[37.001, -121.999]]), make_index([]), make_index([]))
+    metrics = CorridorScorer(buffer_meters=30).score_steps(POLYLINE, data, np.array([0, -1]), 2)
+
+    assert metrics['length'][1] == 0
+    assert metrics['incidents'].tolist() == [0, 0]
@@ -0,0 +1,43 @@
+# test_data_version.py
+import time
+from app.services.data_version import DataVersionTracker
+
+
+def make_tracker(tmp_path, monkeypatch, updated_at=1700000000):
+    tracker = DataVersionTracker(path=str(tmp_path / 'data_version.json'))
+    monkeypatch.setattr(tracker, '_fetch_updated_at', lambda dataset_id: updated_at)
+    return tracker
+
+
+def wait_for_refresh(tracker):
+    deadline = time.monotonic() + 5
+    while tracker._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_restart_keeps_the_refreshed_stamp(tmp_path, monkeypatch):
+    tracker = make_tracker(tmp_path, monkeypatch)
+    tracker.current()
+    wait_for_refresh(tracker)
+    stamp = tracker.current()
+
+    restarted = make_tracker(tmp_path, monkeypatch)
+    monkeypatch.setattr(restarted, 'refresh', lambda: None)
+    # Served from the saved state: no refresh is due yet
+    assert restarted.current() == stamp
+    assert not restarted._refreshing
+
+
+def test_bump_reaches_every_worker(tmp_path, monkeypatch):
+    first = make_tracker(tmp_path, monkeypatch)
+    first.refresh()
+    second = make_tracker(tmp_path, monkeypatch)
+    assert second.current() == first.current()
+
+    second.bump()
+    assert first.current() == second.current()
+    assert first.current().split('.')[1] == '1'
+
+    # A refresh in one worker keeps the other's bump
+    first.refresh()
+    assert first.current().split('.')[1] == '1'
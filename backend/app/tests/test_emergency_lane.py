@@ -0,0 +1,48 @@
+# test_emergency_lane.py
+import asyncio
+import threading
+import time
+from app.utils.emergency_lane import EmergencyLane
+
+
+def test_saturation_counts_queued_and_active_work():
+    lane = EmergencyLane(workers=1)
+    release = threading.Event()
+    first = lane.submit(release.wait, 5)
+    second = lane.submit(lambda: 'done')
+    deadline = time.monotonic() + 5
+    while lane.stats()['workers']['active'] == 0 and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+    stats = lane.stats()['workers']
+    assert (stats['active'], stats['queued'], stats['utilization']) == (1, 1, 1.0)
+
+    release.set()
+    assert first.result(5) and second.result(5) == 'done'
+    assert lane.stats()['workers']['active'] == 0
+
+
+def test_coroutines_run_on_the_lane_loop():
+    lane = EmergencyLane(workers=1)
+
+    async def loop_thread():
+        return threading.current_thread().name
+
+    assert asyncio.run(lane.run_async(loop_thread)) == 'emergency-lane-loop'
+    assert lane.stats()['loop'] == {'active': 0, 'queued': 0}
+
+
+def test_emergency_model_waits_are_reported(monkeypatch):
+    from app.services.model_registry import ModelRegistry
+    from app.utils.metrics import metrics
+
+    metrics.reset()
+    registry = ModelRegistry()
+    registry.configure('test-key')
+    monkeypatch.setattr(registry.get_model('lane-model'), 'generate_content', lambda contents, **kwargs: contents)
+    lane = EmergencyLane(workers=1)
+
+    assert lane.run(registry.generate, 'sos', 'lane-model', priority='emergency') == 'sos'
+    waits = lane.stats()['model']
+    assert waits['scheduler_wait_p95_ms'] is not None
+    assert 'lane-model' in waits['slot_wait_p95_ms']
@@ -0,0 +1,23 @@
+# test_emergency_routes.py
+from app.services.emergency_service import EmergencyService
+
+
+def test_sos_alert_then_poll_for_guidance(client, monkeypatch):
+    monkeypatch.setattr(
+        EmergencyService, '_generate_emergency_response',
+        lambda self, *args, **kwargs: {'guidance': ['Head to the station'], 'actions': [], 'emergency_contacts': ['911']}
+    )
+
+    response = client.post('/api/safety/emergency-alert', json={
+        'location': {'lat': 37.7601, 'lng': -122.4201},
+        'message': 'Being followed'
+    })
+    assert response.status_code == 200
+    sos = response.get_json()
+    assert sos['guidance'] and sos['guidance_id']
+
+    followup = client.get(f"/api/safety/emergency-guidance/{sos['guidance_id']}?wait=5")
+    assert followup.status_code == 200
+    assert followup.get_json()['guidance'] == ['Head to the station']
+
+    assert client.post('/api/safety/emergency-alert', json={}).status_code == 400
@@ -0,0 +1,140 @@
+# test_emergency_service.py
+import asyncio
+import threading
+import time
+import pytest
+from app.config import Config
+from app.services import emergency_service, response_cache
+from app.services.emergency_service import EmergencyService
+from app.services.emergency_warmer import EmergencyCacheWarmer
+from app.services.resource_index import get_resource_index
+from app.utils.emergency_lane import emergency_lane
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(response_cache, 'current_data_version', lambda: 'test')
+    cache = response_cache.ResponseCache(db_path=str(tmp_path / 'cache.db'))
+    monkeypatch.setattr(emergency_service, 'get_response_cache', lambda: cache)
+    return cache
+
+
+def test_sos_answers_locally_then_serves_model_guidance():
+    get_resource_index().load({
+        'police': [{'name': 'Mission Station', 'address': '630 Valencia St', 'latitude': 37.7628, 'longitude': -122.4220}]
+    })
+    service = EmergencyService('test-key')
+    release = threading.Event()
+
+    def slow_model(location, resources, user_report=None):
+        release.wait(5)
+        return {'guidance': ['Walk to Mission Station'], 'actions': ['Call 911'], 'emergency_contacts': ['911']}
+
+    service._generate_emergency_response = slow_model
+
+    async def scenario():
+        result = await service.handle_emergency({'lat': 37.7600, 'lng': -122.4200}, 'followed')
+        pending = await service.personalized_guidance(result['guidance_id'])
+        release.set()
+        ready = await service.personalized_guidance(result['guidance_id'], wait=5)
+        return result, pending, ready
+
+    result, pending, ready = asyncio.run(scenario())
+    assert result['source'] == 'local'
+    assert any(step.startswith('Nearest police: Mission Station') for step in result['guidance'])
+    assert pending['guidance_status'] == 'pending'
+    assert ready['guidance_status'] == 'ready'
+    assert ready['guidance'] == ['Walk to Mission Station']
+
+
+def test_sos_budget_covers_model_answering_in_time():
+    service = EmergencyService('test-key')
+    service._generate_emergency_response = lambda *args: {
+        'guidance': ['Stay put'], 'actions': [], 'emergency_contacts': ['911']
+    }
+    Config.SOS_BUDGET_MS, budget = 1000, Config.SOS_BUDGET_MS
+    try:
+        result = asyncio.run(service.handle_emergency({'lat': 37.76, 'lng': -122.42}))
+    finally:
+        Config.SOS_BUDGET_MS = budget
+    assert (result['source'], result['guidance']) == ('model', ['Stay put'])
+
+
+def test_warmed_cells_answer_sos_from_cache():
+    get_resource_index().load({
+        'police': [{'name': 'Mission Station', 'latitude': 37.7625, 'longitude': -122.4213}],
+        'safe_places': [
+            {'business_name': 'Pharmacy', 'latitude': 37.7627, 'longitude': -122.4211},
+            {'business_name': 'Hotel', 'latitude': 37.7900, 'longitude': -122.4000}
+        ]
+    })
+    service = EmergencyService('test-key')
+    calls = []
+
+    def model(location, resources, user_report=None, **kwargs):
+        calls.append(location)
+        return {'guidance': ['Go to Mission Station'], 'actions': [], 'emergency_contacts': ['911']}
+
+    service._generate_emergency_response = model
+    warmer = EmergencyCacheWarmer(service)
+    assert warmer.warm() == 4  # two populated cells, this hour and next
+    assert warmer.warm() == 0
+    assert len(get_resource_index().populated_cells(Config.RESPONSE_CACHE_CELL_DEGREES, limit=1)) == 1
+
+    calls.clear()
+    result = asyncio.run(service.handle_emergency({'lat': 37.7626, 'lng': -122.4212}))
+    assert (result['source'], result['guidance_status']) == ('cache', 'ready')
+    assert result['guidance'] == ['Go to Mission Station']
+    assert result['resources']['police'][0]['name'] == 'Mission Station'
+    assert calls == []
+    assert warmer.stats()['sos_hits'] >= 1
+
+
+@pytest.mark.parametrize('answer', [
+    {'guidance': ['Stay put']},
+    {'guidance': 'Stay put', 'actions': [], 'emergency_contacts': []},
+    {'actions': ['Call 911'], 'emergency_contacts': ['911']},
+    ['Stay put'],
+])
+def test_malformed_model_guidance_is_unavailable(answer):
+    service = EmergencyService('test-key')
+    service._generate_emergency_response = lambda *args: answer
+
+    async def scenario():
+        result = await service.handle_emergency({'lat': 37.76, 'lng': -122.42})
+        return result, await service.personalized_guidance(result['guidance_id'], wait=5)
+
+    result, followup = asyncio.run(scenario())
+    assert result['guidance']
+    if isinstance(answer, dict) and isinstance(answer.get('guidance'), list):
+        # Missing lists default to empty
+        assert followup['guidance_status'] == 'ready' and followup['emergency_contacts'] == []
+    else:
+        assert followup['guidance_status'] == 'unavailable'
+
+
+def test_sos_stays_in_budget_while_the_cache_is_busy(empty_cache, monkeypatch):
+    service = EmergencyService('test-key')
+    service._generate_emergency_response = lambda *args: None
+    monkeypatch.setattr(Config, 'SOS_BUDGET_MS', 100)
+    release = threading.Event()
+    load = empty_cache._load
+
+    def slow_load(*args):
+        release.wait(5)
+        return load(*args)
+
+    monkeypatch.setattr(empty_cache, '_load', slow_load)
+    # Analysis traffic holding the cache's write lock
+    empty_cache._lock.acquire()
+    try:
+        started = time.monotonic()
+        result = asyncio.run(service.handle_emergency({'lat': 37.76, 'lng': -122.42}))
+        elapsed = time.monotonic() - started
+    finally:
+        release.set()
+        empty_cache._lock.release()
+
+    assert elapsed < 0.5
+    assert result['source'] == 'local' and result['guidance']
+    assert emergency_lane.stats()['cache_read_p95_ms'] is not None
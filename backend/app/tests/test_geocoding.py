@@ -0,0 +1,106 @@
+# test_geocoding.py
+import asyncio
+from app.config import Config
+from app.models import db, GeocodeCache, Route
+from app.routes.safety_routes import resolve_endpoints
+from app.services import geocoding_service
+from app.services.geocoding_service import GeocodingService
+
+
+class FakeMaps:
+    """googlemaps.Client stand-in that records every upstream call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def geocode(self, address):
+        self.calls.append(address)
+        return [{'geometry': {'location': {'lat': 37.77, 'lng': -122.41}}, 'formatted_address': address.title()}]
+
+    def reverse_geocode(self, latlng):
+        self.calls.append(latlng)
+        return [{'formatted_address': '1 Market St'}]
+
+
+def make_geocoder(app, monkeypatch):
+    geocoding_service._memory_cache.clear()
+    monkeypatch.setattr(geocoding_service, '_pending_hits', {})
+    geocoder = GeocodingService()
+    geocoder.gmaps = FakeMaps()
+    app.geocoding_service = geocoder
+    return geocoder
+
+
+def test_memory_hits_reach_the_table(client, monkeypatch):
+    app = client.application
+    geocoder = make_geocoder(app, monkeypatch)
+    monkeypatch.setattr(Config, 'GEOCODE_HIT_FLUSH_EVERY', 3)
+
+    with app.app_context():
+        assert asyncio.run(geocoder.geocode('Mission St')) is not None
+        for _ in range(3):
+            asyncio.run(geocoder.geocode('Mission St'))
+        assert geocoder.gmaps.calls == ['Mission St']
+        entry = GeocodeCache.query.filter_by(query_key=geocoder.forward_key('Mission St')).one()
+        assert entry.hits == 3
+
+
+def test_geocode_endpoints_are_served_from_the_cache(client, monkeypatch):
+    geocoder = make_geocoder(client.application, monkeypatch)
+
+    for _ in range(2):
+        response = client.get('/api/safety/geocode?address=mission st')
+        assert response.status_code == 200
+        assert response.get_json()['data']['lat'] == 37.77
+        response = client.get('/api/safety/reverse-geocode?lat=37.7749&lng=-122.4194')
+        assert response.get_json()['data']['formatted_address'] == '1 Market St'
+    assert len(geocoder.gmaps.calls) == 2
+
+    assert client.get('/api/safety/geocode').status_code == 400
+    assert client.get('/api/safety/reverse-geocode?lat=x').status_code == 400
+
+
+def test_resolve_endpoints_only_geocodes_what_it_must(client, monkeypatch):
+    app = client.application
+    geocoder = make_geocoder(app, monkeypatch)
+
+    with app.test_request_context():
+        data = asyncio.run(resolve_endpoints({
+            'start_location': {'lat': 37.76, 'lng': -122.42, 'address': 'Dolores Park'},
+            'end_location': 'Ferry Building',
+            'end_coords': {'lat': 37.79, 'lng': -122.39}
+        }))
+        assert geocoder.gmaps.calls == []
+        assert data['start_coords'] == {'lat': 37.76, 'lng': -122.42}
+        assert data['start_location'] == 'Dolores Park'
+
+        # The fast tier uses cached geocodes only
+        data = asyncio.run(resolve_endpoints({'start_location': 'Mission St', 'end_location': 'Ferry Building'}, upstream=False))
+        assert geocoder.gmaps.calls == []
+        assert 'start_coords' not in data
+
+        data = asyncio.run(resolve_endpoints({'start_location': 'Mission St', 'end_location': 'Ferry Building'}))
+        assert sorted(geocoder.gmaps.calls) == ['Ferry Building', 'Mission St']
+        assert data['start_coords'] == data['end_coords'] == {'lat': 37.77, 'lng': -122.41}
+
+        data = asyncio.run(resolve_endpoints({'start_location': 'Mission St', 'end_location': 'Ferry Building'}, upstream=False))
+        assert data['end_coords'] == {'lat': 37.77, 'lng': -122.41}
+        assert len(geocoder.gmaps.calls) == 2
+
+
+def test_preload_geocodes_from_route_history(client, monkeypatch):
+    app = client.application
+    geocoding_service._memory_cache.clear()
+    maps = FakeMaps()
+    monkeypatch.setattr(geocoding_service.googlemaps, 'Client', lambda key: maps)
+
+    with app.app_context():
+        for start, end in [('Mission St', 'Ferry Building'), ('Ferry Building', 'Dolores Park')]:
+            db.session.add(Route(user_id=1, start_location=start, end_location=end, distance=1.0))
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['preload-geocodes'])
+    assert 'Preloaded 3 geocodes' in result.output
+    assert sorted(maps.calls) == ['Dolores Park', 'Ferry Building', 'Mission St']
+    with app.app_context():
+        assert GeocodeCache.query.count() == 3
@@ -0,0 +1,23 @@
+# test_incremental_json.py
+import json
+from app.utils.incremental_json import IncrementalJSONParser
+
+
+def test_fields_complete_as_chunks_arrive():
+    text = '```json\n{"safety_score": 82, "risk_level": "low", "recommendations": ["Stay, \\"alert\\"", "Use {main} roads"], "confidence_score": 0.7}\n```'
+    parser = IncrementalJSONParser()
+    seen = []
+    for i in range(0, len(text), 7):
+        seen.extend(key for key, _ in parser.feed(text[i:i + 7]))
+
+    assert seen == ['safety_score', 'risk_level', 'recommendations', 'confidence_score']
+    assert parser.complete
+    assert parser.fields == json.loads(text.strip('`json\n'))
+
+
+def test_score_is_available_before_the_object_closes():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"safety_score": 6') == []
+    assert parser.feed('1, "risk_level": "me') == [('safety_score', 61)]
+    assert parser.feed('dium", "primary_concerns": [') == [('risk_level', 'medium')]
+    assert not parser.complete
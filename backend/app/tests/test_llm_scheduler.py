@@ -0,0 +1,75 @@
+# test_llm_scheduler.py
+import time
+import pytest
+from app.services.llm_scheduler import LLMScheduler, LLMShedError
+
+
+def make_scheduler(**overrides):
+    options = dict(
+        rate_per_second=1000,
+        burst=100,
+        concurrency={'emergency': 1, 'monitoring': 1, 'interactive': 1, 'background': 1},
+        queue_limits={'emergency': None, 'monitoring': None, 'interactive': None, 'background': 2},
+        max_wait_seconds={'emergency': None, 'monitoring': None, 'interactive': None, 'background': None}
+    )
+    options.update(overrides)
+    return LLMScheduler(**options)
+
+
+def test_higher_classes_dispatch_first_when_quota_is_short():
+    scheduler = make_scheduler(rate_per_second=0.001, burst=1)
+    first = scheduler.request('interactive')
+    assert first.done()
+
+    background = scheduler.request('background')
+    interactive = scheduler.request('interactive')
+    emergency = scheduler.request('emergency')
+
+    # Emergency runs on quota debt; the rest wait for tokens
+    assert emergency.done()
+    assert not interactive.done() and not background.done()
+
+
+def test_per_class_concurrency_cap():
+    scheduler = make_scheduler()
+    first = scheduler.request('interactive')
+    second = scheduler.request('interactive')
+    other = scheduler.request('monitoring')
+
+    assert first.done() and other.done()
+    assert not second.done()
+
+    scheduler.release('interactive')
+    assert second.result(timeout=1) == 'interactive'
+
+
+def test_background_is_shed_when_queue_is_full():
+    scheduler = make_scheduler()
+    scheduler.request('background')
+    scheduler.request('background')
+    scheduler.request('background')
+
+    with pytest.raises(LLMShedError):
+        scheduler.request('background')
+
+
+def test_long_waits_are_shed():
+    scheduler = make_scheduler(max_wait_seconds={
+        'emergency': None, 'monitoring': None, 'interactive': None, 'background': 0.05
+    })
+    scheduler.request('background')
+    waiting = scheduler.request('background')
+
+    with pytest.raises(LLMShedError):
+        waiting.result(timeout=1)
+
+
+def test_tokens_refill_over_time():
+    scheduler = make_scheduler(rate_per_second=50, burst=1, concurrency={
+        'emergency': 5, 'monitoring': 5, 'interactive': 5, 'background': 5
+    })
+    scheduler.request('interactive')
+    started = time.monotonic()
+    scheduler.request('interactive').result(timeout=1)
+
+    assert time.monotonic() - started >= 0.01
@@ -0,0 +1,31 @@
+# test_llm_usage.py
+from app.utils.metrics import metrics
+from app.services.llm_usage import (
+    usage_tags, record_cache_hit, record_fallback, record_parse_failure, usage_summary
+)
+from app.services.model_registry import LLMDeadlineExceeded
+
+
+def test_summary_rolls_up_per_call_site_and_template():
+    metrics.reset()
+    tags = usage_tags('route_analysis', 'route_analysis.v2')
+    metrics.increment('llm.requests', tags={**tags, 'outcome': 'ok'})
+    metrics.increment('llm.requests', tags={**tags, 'outcome': 'error'})
+    metrics.observe('llm.prompt_tokens', 120, tags=tags)
+    metrics.observe('llm.prompt_tokens', 80, tags=tags)
+    metrics.observe('llm.latency_ms', 900, tags=tags)
+    record_cache_hit('route_analysis', 'route_analysis.v2')
+    record_fallback('route_analysis', 'route_analysis.v2', error=LLMDeadlineExceeded())
+    record_parse_failure('voice_command')
+
+    summary = usage_summary()
+    route = summary['route_analysis/route_analysis.v2']
+    assert (route['requests'], route['errors'], route['cache_hits']) == (2, 1, 1)
+    assert route['prompt_tokens'] == 200
+    assert route['latency_ms']['count'] == 1
+    assert route['fallback_reasons'] == {'deadline': 1}
+
+    voice = summary['voice_command/voice_command']
+    assert voice['parse_failures'] == 1
+    assert voice['fallback_reasons'] == {'parse': 1}
+    metrics.reset()
@@ -0,0 +1,183 @@
+# test_model_registry.py
+import asyncio
+import itertools
+import threading
+import time
+import pytest
+from app.config import Config
+from app.services import model_registry as registry_module
+from app.services.llm_scheduler import LLMScheduler
+from app.services.llm_usage import usage_tags
+from app.services.model_registry import LLMDeadlineExceeded, ModelRegistry, TEXT_MODEL
+from app.utils.metrics import metrics
+
+
+def test_models_are_shared_per_name_and_config():
+    registry = ModelRegistry()
+    registry.configure('test-key')
+
+    assert registry.get_model(TEXT_MODEL) is registry.get_model(TEXT_MODEL)
+    assert registry.get_model(TEXT_MODEL) is not registry.get_model('gemini-pro-vision')
+
+
+def test_generate_respects_concurrency_limit(monkeypatch):
+    monkeypatch.setitem(Config.GEMINI_CONCURRENCY, 'limited-model', 2)
+    registry = ModelRegistry()
+    registry.configure('test-key')
+
+    in_flight, peak, lock = [0], [0], threading.Lock()
+
+    def fake_generate(contents, **kwargs):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.02)
+        with lock:
+            in_flight[0] -= 1
+        return contents
+
+    monkeypatch.setattr(registry.get_model('limited-model'), 'generate_content', fake_generate)
+    threads = [
+        threading.Thread(target=registry.generate, args=('prompt', 'limited-model'))
+        for _ in range(6)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak[0] == 2
+
+
+def test_emergency_calls_do_not_wait_for_shared_model_slots(monkeypatch):
+    monkeypatch.setitem(Config.GEMINI_CONCURRENCY, 'busy-model', 1)
+    registry = ModelRegistry()
+    registry.configure('test-key')
+    release = threading.Event()
+
+    def fake_generate(contents, **kwargs):
+        if contents == 'slow':
+            release.wait(5)
+        return contents
+
+    monkeypatch.setattr(registry.get_model('busy-model'), 'generate_content', fake_generate)
+    blocker = threading.Thread(target=registry.generate, args=('slow', 'busy-model'))
+    blocker.start()
+    time.sleep(0.05)
+
+    started = time.monotonic()
+    assert registry.generate('sos', 'busy-model', priority='emergency') == 'sos'
+    assert time.monotonic() - started < 1
+    release.set()
+    blocker.join()
+
+
+def make_async_registry(monkeypatch, attempts):
+    """Registry whose n-th model call runs attempts[n]; scheduling never waits"""
+    monkeypatch.setattr(registry_module, 'llm_scheduler', LLMScheduler(
+        rate_per_second=1000,
+        burst=100,
+        concurrency={'emergency': 4, 'monitoring': 4, 'interactive': 4, 'background': 4},
+        queue_limits={'emergency': None, 'monitoring': None, 'interactive': None, 'background': None},
+        max_wait_seconds={'emergency': None, 'monitoring': None, 'interactive': None, 'background': None}
+    ))
+    registry = ModelRegistry()
+    counter = itertools.count()
+    monkeypatch.setattr(registry, '_call', lambda contents, *args, **kwargs: attempts[next(counter)]())
+    return registry
+
+
+def seed_latencies(monkeypatch, call_site, latency_ms=20):
+    """Enough fast samples for the call site that hedging kicks in after latency_ms"""
+    monkeypatch.setattr(Config, 'LLM_HEDGING', True)
+    monkeypatch.setattr(Config, 'LLM_HEDGE_MIN_SAMPLES', 3)
+    for _ in range(3):
+        metrics.observe('llm.latency_ms', latency_ms, tags=usage_tags(call_site, None))
+
+
+def answer_after(seconds, value=None, error=None):
+    def attempt():
+        time.sleep(seconds)
+        if error is not None:
+            raise error
+        return value
+    return attempt
+
+
+def test_deadline_raises_and_late_answer_reaches_on_late(monkeypatch):
+    registry = make_async_registry(monkeypatch, [answer_after(0.2, 'late')])
+    late = []
+
+    with pytest.raises(LLMDeadlineExceeded):
+        asyncio.run(registry.generate_async(
+            'prompt', call_site='deadline_site', deadline=0.05, hedge=False, on_late=late.append
+        ))
+
+    deadline = time.monotonic() + 2
+    while not late and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert late == ['late']
+
+
+def test_hedge_fires_once_the_call_site_has_samples(monkeypatch):
+    seed_latencies(monkeypatch, 'hedge_site')
+    registry = make_async_registry(monkeypatch, [answer_after(1.0, 'slow'), answer_after(0, 'hedged')])
+
+    result = asyncio.run(registry.generate_async('prompt', call_site='hedge_site', deadline=2))
+    assert result == 'hedged'
+    hedged = metrics.snapshot()['counters']['llm.hedged']
+    assert any(entry['tags'] == usage_tags('hedge_site', None) for entry in hedged)
+
+
+def test_first_successful_attempt_wins(monkeypatch):
+    seed_latencies(monkeypatch, 'winner_site')
+    registry = make_async_registry(monkeypatch, [
+        answer_after(0.06, error=ConnectionError('reset')),
+        answer_after(0.1, 'second'),
+    ])
+
+    assert asyncio.run(registry.generate_async('prompt', call_site='winner_site', deadline=2)) == 'second'
+
+
+def test_error_is_raised_when_every_attempt_fails(monkeypatch):
+    seed_latencies(monkeypatch, 'failing_site')
+    registry = make_async_registry(monkeypatch, [
+        answer_after(0.06, error=ConnectionError('reset')),
+        answer_after(0.1, error=TimeoutError('upstream')),
+    ])
+
+    with pytest.raises((ConnectionError, TimeoutError)):
+        asyncio.run(registry.generate_async('prompt', call_site='failing_site', deadline=2))
+
+
+def test_stream_holds_its_model_slot_until_drained(monkeypatch):
+    monkeypatch.setitem(Config.GEMINI_CONCURRENCY, 'stream-model', 1)
+    registry = make_async_registry(monkeypatch, [])
+    registry.configure('test-key')
+    monkeypatch.setattr(registry, '_call', ModelRegistry._call.__get__(registry))
+    limit = registry._limit('stream-model', 'interactive')
+
+    class Chunk:
+        def __init__(self, text):
+            self.text = text
+
+    def fake_generate(contents, stream=False, **kwargs):
+        for piece in ('{"a"', ': 1}'):
+            time.sleep(0.05)
+            yield Chunk(piece)
+
+    monkeypatch.setattr(registry.get_model('stream-model'), 'generate_content', fake_generate)
+
+    async def consume():
+        pieces = []
+        async for piece in registry.stream('prompt', 'stream-model', deadline=5):
+            if not pieces:
+                # Mid-stream: a second caller cannot take the slot
+                assert not limit.acquire(blocking=False)
+            pieces.append(piece)
+        return pieces
+
+    assert asyncio.run(consume()) == ['{"a"', ': 1}']
+    time.sleep(0.05)
+    assert limit.acquire(blocking=False)
+    limit.release()
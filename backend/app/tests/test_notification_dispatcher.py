@@ -0,0 +1,92 @@
+# test_notification_dispatcher.py
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app.config import Config
+from app.models import NotificationOutbox
+from app.services.notification_dispatcher import NotificationChannel, NotificationDispatcher
+
+
+class FlakySMS(NotificationChannel):
+    name = 'sms'
+    field = 'phone'
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.delivered = []
+
+    def send(self, recipient, message, payload, idempotency_key):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('gateway timeout')
+        self.delivered.append(idempotency_key)
+
+
+def make_dispatcher(tmp_path, channel):
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    NotificationOutbox.__table__.create(engine)
+
+    @contextmanager
+    def session_factory():
+        with Session(engine, expire_on_commit=False) as session, session.begin():
+            yield session
+
+    return NotificationDispatcher([channel], session_factory)
+
+
+def make_due(dispatcher):
+    with dispatcher.session_factory() as session:
+        for row in session.query(NotificationOutbox):
+            row.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+
+
+def test_enqueue_is_idempotent_and_skips_unreachable_contacts(tmp_path):
+    sms = FlakySMS(failures=0)
+    dispatcher = make_dispatcher(tmp_path, sms)
+    contacts = [{'id': 1, 'phone': '+15550001'}, {'id': 2, 'phone': '+15550002'}, {'id': 3, 'email': 'a@b.c'}]
+
+    for _ in range(2):
+        with dispatcher.session_factory() as session:
+            queued = dispatcher.enqueue(session, dispatcher.notifications_for('alert:7', contacts, 'SOS'))
+    assert queued == 0
+
+    assert dispatcher.dispatch_pending() == {'sent': 2, 'retrying': 0, 'failed': 0}
+    assert sorted(sms.delivered) == ['alert:7:1:sms', 'alert:7:2:sms']
+    assert dispatcher.dispatch_pending()['sent'] == 0
+    assert dispatcher.stats() == {'sent': 2}
+
+
+def test_failures_back_off_then_give_up(tmp_path):
+    dispatcher = make_dispatcher(tmp_path, FlakySMS(failures=Config.NOTIFY_MAX_ATTEMPTS))
+    with dispatcher.session_factory() as session:
+        dispatcher.enqueue(session, dispatcher.notifications_for('alert:8', [{'id': 1, 'phone': '+1555'}], 'SOS'))
+
+    assert dispatcher.dispatch_pending()['retrying'] == 1
+    # Not due again until the backoff has passed
+    assert dispatcher.dispatch_pending()['retrying'] == 0
+
+    for _ in range(Config.NOTIFY_MAX_ATTEMPTS - 1):
+        make_due(dispatcher)
+        dispatcher.dispatch_pending()
+    assert dispatcher.stats() == {'failed': 1}
+
+
+def test_contact_alert_history_follows_delivery(tmp_path):
+    import asyncio
+    from app.services.contact_manager import ContactManager
+
+    dispatcher = make_dispatcher(tmp_path, FlakySMS(failures=0))
+    contacts = ContactManager(dispatcher)
+    asyncio.run(contacts.add_contact('user-1', {'name': 'Sam', 'phone': '+15550001'}))
+
+    sent = asyncio.run(contacts.send_emergency_alert('user-1', {'lat': 37.77, 'lng': -122.42}))
+    assert sent['alerts_sent'] == 1
+    history = asyncio.run(contacts.get_alert_history('user-1'))
+    assert [row['status'] for row in history] == ['queued']
+
+    # The history row and its notification were committed together
+    assert dispatcher.stats() == {'pending': 1}
+    assert dispatcher.dispatch_pending()['sent'] == 1
+    history = asyncio.run(contacts.get_alert_history('user-1'))
+    assert [row['status'] for row in history] == ['sent']
@@ -0,0 +1,33 @@
+# test_prompt_context.py
+from app.services.prompt_context import PromptContext, area_context, estimate_tokens
+
+
+def test_lowest_priority_lines_are_dropped_to_fit_budget():
+    context = PromptContext(budget_tokens=10)
+    context.add('score', 72.3456, priority=0)
+    context.add('names', ['A very long safe space name'] * 3, priority=3)
+    context.add('period', 'night', priority=0)
+
+    rendered = context.render()
+    assert rendered == 'score: 72.346\nperiod: night'
+    assert estimate_tokens(rendered) <= 10
+
+
+def test_area_context_is_compact():
+    data = {
+        'incidents': {
+            'total': 40,
+            'categories': {'Larceny Theft': 25, 'Assault': 10, 'Burglary': 4, 'Fraud': 1},
+            'time_distribution': {'day': 10, 'night': 30}
+        },
+        'lighting': {'total': 12, 'working': 9, 'coverage': 75.0},
+        'safe_spaces': {'safe_spaces': [{'business_name': 'Corner Market'}]},
+        'time_info': {'current_time': '22:10', 'is_night': True}
+    }
+
+    rendered = area_context(data, budget_tokens=200).render()
+    assert 'incidents_30d: 40' in rendered
+    assert 'night_share: 0.75' in rendered
+    assert 'lights_working: 9/12' in rendered
+    assert 'Fraud' not in rendered
+    assert estimate_tokens(rendered) < 60
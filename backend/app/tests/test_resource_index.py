@@ -0,0 +1,72 @@
+# test_resource_index.py
+import logging
+import numpy as np
+from app.config import Config
+from app.services import resource_index
+from app.services.resource_index import (
+    EmergencyResourceIndex, KDTree, haversine_meters, to_unit_vectors
+)
+
+
+def test_kdtree_matches_brute_force():
+    rng = np.random.default_rng(7)
+    coords = np.column_stack([rng.uniform(37.70, 37.82, 500), rng.uniform(-122.52, -122.35, 500)])
+    tree = KDTree(to_unit_vectors(coords), leaf_size=8)
+
+    for lat, lng in rng.uniform([37.70, -122.52], [37.82, -122.35], (20, 2)):
+        _, ids = tree.query(to_unit_vectors([[lat, lng]])[0], k=5)
+        expected = np.argsort(haversine_meters(lat, lng, coords[:, 0], coords[:, 1]))[:5]
+        assert ids.tolist() == expected.tolist()
+
+
+def test_nearby_reports_haversine_distances(tmp_path):
+    index = EmergencyResourceIndex(str(tmp_path / 'snapshot.json'))
+    index.load({
+        'police': [
+            {'name': 'Mission Station', 'latitude': '37.7628', 'longitude': '-122.4220'},
+            {'name': 'Central Station', 'location': {'type': 'Point', 'coordinates': [-122.4096, 37.7986]}},
+            {'name': 'No location'}
+        ],
+        'hospitals': [{'name': 'SF General', 'latitude': 37.7557, 'longitude': -122.4050}]
+    })
+
+    found = index.nearby({'lat': 37.7600, 'lng': -122.4200}, k=2)
+    assert [p['name'] for p in found['police']] == ['Mission Station', 'Central Station']
+    assert abs(found['police'][0]['distance_m'] - 353) < 5
+    assert found['hospitals'][0]['distance'].endswith('km')
+    assert found['safe_places'] == []
+
+
+class FakeResponse:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.rows
+
+
+def test_snapshot_is_filtered_upstream_and_paged(tmp_path, monkeypatch, caplog):
+    calls = []
+
+    def fake_get(url, params, timeout):
+        calls.append((url, params))
+        remaining = 25 if 'g8m3' in url else 7
+        return FakeResponse([{'id': i} for i in range(max(0, min(params['$limit'], remaining - params['$offset'])))])
+
+    monkeypatch.setattr(resource_index.requests, 'get', fake_get)
+    monkeypatch.setattr(Config, 'EMERGENCY_SNAPSHOT_PAGE_SIZE', 10)
+    monkeypatch.setattr(Config, 'EMERGENCY_SNAPSHOT_LIMIT', 20)
+
+    with caplog.at_level(logging.WARNING):
+        snapshot = EmergencyResourceIndex(str(tmp_path / 'snapshot.json')).fetch_snapshot()
+
+    assert len(snapshot['police']) == len(snapshot['hospitals']) == 7
+    assert len(snapshot['safe_places']) == 20
+    safe_place_calls = [params for url, params in calls if 'g8m3' in url]
+    assert [params['$offset'] for params in safe_place_calls] == [0, 10]
+    assert "'PHARMACY'" in safe_place_calls[0]['$where'] and safe_place_calls[0]['$select']
+    assert 'safe_places stopped at the 20 row limit' in caplog.text
+    assert 'police' not in caplog.text
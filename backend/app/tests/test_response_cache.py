@@ -0,0 +1,72 @@
+# test_response_cache.py
+import asyncio
+import threading
+from datetime import datetime
+from app.services import response_cache
+from app.services.response_cache import ResponseCache
+
+
+def make_cache(tmp_path, monkeypatch, **kwargs):
+    monkeypatch.setattr(response_cache, 'current_data_version', lambda: 'test')
+    return ResponseCache(db_path=str(tmp_path / 'cache.db'), **kwargs)
+
+
+def test_nearby_coordinates_share_a_key(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path, monkeypatch)
+    when = datetime(2024, 5, 1, 21, 5)
+
+    a = cache.make_key('area', {'lat': 37.77491, 'lng': -122.41941}, when=when)
+    b = cache.make_key('area', {'lat': 37.77512, 'lng': -122.41902}, when=when.replace(minute=55))
+    far = cache.make_key('area', {'lat': 37.7851, 'lng': -122.41902}, when=when)
+    later = cache.make_key('area', {'lat': 37.77491, 'lng': -122.41941}, when=when.replace(hour=22))
+
+    assert a == b
+    assert a != far
+    assert a != later
+
+
+def test_entries_persist_and_count_hits(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path, monkeypatch)
+    key = cache.make_key('area', {'lat': 37.7749, 'lng': -122.4194})
+    assert cache.get('area', key) is None
+
+    cache.set('area', key, {'area_safety_score': 72})
+    reopened = make_cache(tmp_path, monkeypatch)
+
+    assert reopened.get('area', key) == {'area_safety_score': 72}
+    stats = reopened.stats()['area']
+    assert stats['hits'] >= 1 and stats['misses'] >= 1
+
+
+def test_persistent_backend_evicts_least_recently_used(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path, monkeypatch, max_entries=10)
+    for i in range(100):
+        cache.set('area', f'key-{i}', {'i': i})
+
+    fresh = make_cache(tmp_path, monkeypatch, max_entries=10)
+    assert fresh.get('area', 'key-99') == {'i': 99}
+    assert fresh.get('area', 'key-0') is None
+
+
+def test_async_access_keeps_sqlite_off_the_loop(tmp_path, monkeypatch):
+    writer = make_cache(tmp_path, monkeypatch)
+    reader = make_cache(tmp_path, monkeypatch)
+    threads = []
+    for cache, name in ((writer, '_write'), (reader, '_load')):
+        original = getattr(cache, name)
+
+        def traced(*args, _original=original):
+            threads.append(threading.current_thread())
+            return _original(*args)
+        monkeypatch.setattr(cache, name, traced)
+
+    async def scenario():
+        await writer.aset('area', 'key', {'score': 1})
+        assert await reader.aget('area', 'key') == {'score': 1}
+        # Now in memory: no second table read
+        assert await reader.aget('area', 'key') == {'score': 1}
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(scenario())
+    assert len(threads) == 2
+    assert loop_thread not in threads
@@ -0,0 +1,67 @@
+# test_route_graph.py
+from app.services.route_graph import RouteGraph, diverse_paths, path_overlap
+
+
+def make_step(start, end, distance):
+    return {
+        'start_location': {'lat': start[0], 'lng': start[1]},
+        'end_location': {'lat': end[0], 'lng': end[1]},
+        'distance': {'value': distance, 'text': f"{distance} m"},
+        'duration': {'value': distance, 'text': '1 min'},
+        'html_instructions': 'Walk'
+    }
+
+
+def make_route(points, distances):
+    steps = [
+        make_step(points[i], points[i + 1], distances[i])
+        for i in range(len(points) - 1)
+    ]
+    return {'summary': 'Test', 'legs': [{'steps': steps}]}
+
+
+# Two routes sharing the middle node B, giving four combinations
+A, B, C = (37.0, -122.0), (37.001, -122.001), (37.002, -122.002)
+UPPER_1, LOWER_1 = (37.0005, -122.0), (37.0, -122.0005)
+UPPER_2, LOWER_2 = (37.0015, -122.001), (37.001, -122.0015)
+
+ROUTE_1 = make_route([A, UPPER_1, B, UPPER_2, C], [100, 100, 100, 100])
+ROUTE_2 = make_route([A, LOWER_1, B, LOWER_2, C], [120, 120, 130, 130])
+
+
+def build_graph():
+    graph = RouteGraph()
+    graph.add_route(ROUTE_1)
+    graph.add_route(ROUTE_2)
+    return graph
+
+
+def test_k_shortest_paths_in_cost_order():
+    graph = build_graph()
+    weight = lambda edge: edge['distance']
+    paths = list(graph.k_shortest_paths(weight, deadline=float('inf')))
+
+    assert [cost for cost, _ in paths] == [400, 440, 460, 500]
+    assert len({tuple(path) for _, path in paths}) == 4
+
+
+def test_diverse_paths_prefers_low_overlap():
+    graph = build_graph()
+    paths = diverse_paths(graph, k=2, max_overlap=0.6, time_budget_ms=1000)
+
+    assert len(paths) == 2
+    assert graph.path_distance(paths[0]) == 400
+    # The fully disjoint route wins over the cheaper half-shared ones
+    assert path_overlap(graph, paths[1], paths[:1]) == 0.0
+
+
+def test_path_to_route_rebuilds_leg():
+    graph = build_graph()
+    path = graph.shortest_path(graph.source, graph.target, lambda e: e['distance'])[1]
+    route = graph.path_to_route(path, ROUTE_1)
+
+    leg = route['legs'][0]
+    assert leg['distance']['value'] == 400
+    assert leg['start_location'] == {'lat': A[0], 'lng': A[1]}
+    assert leg['end_location'] == {'lat': C[0], 'lng': C[1]}
+    assert route['overview_polyline']['points']
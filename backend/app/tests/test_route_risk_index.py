@@ -0,0 +1,34 @@
+# test_route_risk_index.py
+import random
+from app.services.route_risk_index import RouteRiskIndex
+
+
+def test_range_queries_match_brute_force():
+    rng = random.Random(7)
+    risks = [rng.uniform(0, 100) for _ in range(37)]
+    lengths = [rng.uniform(10, 500) for _ in range(37)]
+    index = RouteRiskIndex(risks, lengths)
+
+    for start in range(len(risks)):
+        for end in range(start + 1, len(risks) + 1):
+            expected_max = max(range(start, end), key=lambda i: risks[i])
+            weighted = sum(r * l for r, l in zip(risks[start:end], lengths[start:end]))
+
+            assert index.range_max(start, end)[0] == expected_max
+            assert abs(index.range_risk(start, end) - weighted / sum(lengths[start:end])) < 1e-9
+
+
+def test_remaining_summary():
+    index = RouteRiskIndex([10, 80, 30, 50], [100, 100, 200, 100])
+    summary = index.remaining(2)
+
+    assert summary['remaining_distance'] == 300
+    assert summary['remaining_risk'] == round((30 * 200 + 50 * 100) / 300, 2)
+    assert summary['riskiest_upcoming'] == {'index': 3, 'risk': 50}
+
+
+def test_empty_ranges():
+    index = RouteRiskIndex([])
+    assert index.range_risk(0) is None
+    assert index.range_max(0) is None
+    assert index.remaining(0)['riskiest_upcoming'] is None
@@ -0,0 +1,84 @@
+# test_route_service.py
+import asyncio
+import threading
+import time
+from app.services import route_service, safety_analyzer
+from app.services.route_service import RouteService
+from app.services.safety_analyzer import SafetyAnalyzer
+from app.utils.cache import TTLCache
+
+START = {'lat': 37.7601, 'lng': -122.4301}
+END = {'lat': 37.7621, 'lng': -122.4281}
+
+
+def test_budget_timeout_still_warms_the_corridor_cache(monkeypatch):
+    corridor_cache = TTLCache(ttl_seconds=900)
+    monkeypatch.setattr(safety_analyzer, '_corridor_cache', corridor_cache)
+    release = threading.Event()
+    fetched = []
+
+    def slow_get_json(self, url, params):
+        fetched.append(url)
+        release.wait(5)
+        return []
+
+    monkeypatch.setattr(SafetyAnalyzer, '_get_json', slow_get_json)
+    service = RouteService('AIza-test', 'test-key')
+
+    cold = asyncio.run(service.local_route_analysis(START, END, budget_ms=20))
+    assert cold['segments'] == []
+    release.set()
+    deadline = time.monotonic() + 5
+    while not len(corridor_cache) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    warm = asyncio.run(service.local_route_analysis(START, END, budget_ms=20))
+    assert len(warm['segments']) == 1
+    # One fetch per dataset: the timed-out one finished and was reused
+    assert len(fetched) == 3
+
+
+def make_point_service(monkeypatch, answers, ttl_seconds=900):
+    """RouteService whose per-point analyses come from answers, with a fresh segment cache"""
+    monkeypatch.setattr(route_service, '_segment_cache', TTLCache(ttl_seconds=ttl_seconds))
+    service = RouteService('AIza-test', 'test-key')
+    calls = []
+
+    async def analyze_area(location):
+        calls.append(location)
+        return answers[min(len(calls), len(answers)) - 1]
+
+    monkeypatch.setattr(service.safety_analyzer, 'analyze_area', analyze_area)
+    return service, calls
+
+
+def one_step_route():
+    return {'legs': [{'steps': [{'start_location': START, 'end_location': END, 'distance': {'value': 100}}]}]}
+
+
+ANALYSIS = {'safety_score': 80, 'risks': [], 'recommendations': [], 'safe_spaces': []}
+
+
+def test_segment_scores_are_cached_until_they_expire(monkeypatch):
+    service, calls = make_point_service(monkeypatch, [ANALYSIS], ttl_seconds=0.2)
+
+    first = asyncio.run(service._analyze_route_safety(one_step_route(), per_point=True))
+    assert asyncio.run(service._analyze_route_safety(one_step_route(), per_point=True)) == first
+    # Start and end point of the one step
+    assert len(calls) == 2
+
+    time.sleep(0.25)
+    asyncio.run(service._analyze_route_safety(one_step_route(), per_point=True))
+    assert len(calls) == 4
+
+
+def test_fallback_segments_are_not_cached(monkeypatch):
+    fallback = SafetyAnalyzer('test-key')._get_fallback_analysis()
+    service, calls = make_point_service(monkeypatch, [fallback, fallback, ANALYSIS])
+
+    degraded = asyncio.run(service._analyze_route_safety(one_step_route(), per_point=True))
+    assert degraded['segments'][0]['safety_score'] == fallback['safety_score']
+
+    recovered = asyncio.run(service._analyze_route_safety(one_step_route(), per_point=True))
+    assert len(calls) == 4
+    assert recovered['segments'][0]['safety_score'] == ANALYSIS['safety_score']
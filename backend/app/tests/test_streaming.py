@@ -0,0 +1,29 @@
+# test_streaming.py
+import asyncio
+from app.utils.streaming import iter_async, sse_event
+
+
+def test_sse_event_format():
+    assert sse_event('ranking', {'safest_index': 0}) == 'event: ranking\ndata: {"safest_index": 0}\n\n'
+
+
+def test_disconnect_cancels_tasks_left_on_the_loop():
+    cancelled = []
+
+    async def background():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def events():
+        asyncio.ensure_future(background())
+        yield 'routes'
+        yield 'narrative'
+
+    body = iter_async(events())
+    assert next(body) == 'routes'
+    # What the WSGI server does when the client goes away
+    body.close()
+    assert cancelled == [True]
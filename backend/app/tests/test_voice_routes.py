@@ -0,0 +1,16 @@
+# test_voice_routes.py
+from app.services.voice_command import VoiceCommandService
+
+
+def test_process_builds_the_voice_service(client, monkeypatch):
+    async def process_command(self, command, location):
+        return {'action': 'navigate', 'command': command, 'location': location}
+
+    monkeypatch.setattr(VoiceCommandService, 'process_command', process_command)
+    response = client.post('/api/voice/process', json={
+        'command': 'take me home',
+        'location': {'lat': 37.76, 'lng': -122.42}
+    })
+
+    assert response.status_code == 200
+    assert response.get_json()['command'] == 'take me home'
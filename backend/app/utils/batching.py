@@ -0,0 +1,127 @@
+# backend/app/utils/batching.py
+
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Group items submitted from any thread into batches for one handler call
+
+    A batch closes when max_items are waiting or window_ms has passed
+    since its first item. The handler receives the items and returns one
+    result per item, in order; it runs on the given executor so several
+    batches can be in flight. Items submitted with the same key while a
+    batch is open share one slot and one Future. With admit, each closed
+    batch first waits for the Future admit() returns (e.g. a scheduler
+    slot) without holding an executor thread, and release() is called
+    once the handler is done.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], List[Any]],
+        executor: ThreadPoolExecutor,
+        window_ms: float = 50,
+        max_items: int = 8,
+        name: str = 'batcher',
+        admit: Callable[[], Future] = None,
+        release: Callable[[], None] = None
+    ):
+        self.handler = handler
+        self.executor = executor
+        self.window = window_ms / 1000
+        self.max_items = max_items
+        self.name = name
+        self.admit = admit
+        self.release = release
+        self._pending: Dict[Hashable, Tuple[Any, Future]] = {}
+        self._opened_at: Optional[float] = None
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, item: Any, key: Hashable = None) -> Future:
+        """Queue an item; the Future resolves to its result"""
+        key = key if key is not None else id(item)
+        with self._cond:
+            if key in self._pending:
+                return self._pending[key][1]
+
+            future = Future()
+            self._pending[key] = (item, future)
+            if self._opened_at is None:
+                self._opened_at = time.monotonic()
+            self._ensure_thread()
+            self._cond.notify()
+            return future
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run,
+                name=f"{self.name}-collector",
+                daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                while len(self._pending) < self.max_items:
+                    remaining = self._opened_at + self.window - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                keys = list(self._pending)[:self.max_items]
+                batch = [self._pending.pop(key) for key in keys]
+                # Leftovers start the next batch straight away
+                self._opened_at = time.monotonic() - self.window if self._pending else None
+
+            if self.admit is None:
+                self.executor.submit(self._process, batch)
+                continue
+            try:
+                ticket = self.admit()
+            except Exception as e:
+                self._fail(batch, e)
+                continue
+            ticket.add_done_callback(lambda ticket, batch=batch: self._admitted(ticket, batch))
+
+    def _admitted(self, ticket: Future, batch: List[Tuple[Any, Future]]):
+        """Start an admitted batch; a refused one fails its callers"""
+        if ticket.cancelled():
+            self._fail(batch, RuntimeError(f"{self.name} batch was not admitted"))
+        elif ticket.exception() is not None:
+            self._fail(batch, ticket.exception())
+        else:
+            self.executor.submit(self._process, batch, True)
+
+    def _fail(self, batch: List[Tuple[Any, Future]], error: Exception):
+        logger.warning(f"{self.name} batch of {len(batch)} failed: {str(error)}")
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    def _process(self, batch: List[Tuple[Any, Future]], admitted: bool = False):
+        items = [item for item, _ in batch]
+        try:
+            results = self.handler(items)
+            if len(results) != len(batch):
+                raise ValueError(f"{self.name} handler returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            self._fail(batch, e)
+            return
+        finally:
+            if admitted and self.release is not None:
+                self.release()
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
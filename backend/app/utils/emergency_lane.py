@@ -0,0 +1,194 @@
+# backend/app/utils/emergency_lane.py
+
+from typing import Any, Awaitable, Callable, Dict, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+import asyncio
+import logging
+import threading
+import time
+import aiohttp
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from ..config import Config
+from .metrics import metrics
+
+
+class EmergencyLane:
+    """Execution resources reserved for SOS traffic
+
+    Emergency handlers run here instead of on the pools, loops and
+    connections analysis endpoints share: blocking work on a dedicated
+    thread pool, coroutines on a dedicated event loop thread, database
+    writes through a reserved connection pool and outbound HTTP through a
+    reserved connector. An analysis spike can fill every shared resource
+    without adding queueing delay to an SOS. Queue wait, run time and
+    in-flight counts are reported per kind of work.
+
+    Model calls are the exception: they still go through the LLM
+    scheduler, as its emergency class (which may overdraw the quota),
+    and through per-model slots reserved for that class. The time they
+    wait there is reported alongside the lane's own resources, as is the
+    time SOS lookups of warmed guidance spend reading the response cache
+    file analysis traffic also writes to.
+    """
+
+    def __init__(self, workers: int = None, db_connections: int = None, http_connections: int = None):
+        self.logger = logging.getLogger(__name__)
+        self.workers = workers or Config.EMERGENCY_POOL_SIZE
+        self.db_connections = db_connections or Config.EMERGENCY_DB_POOL_SIZE
+        self.http_connections = http_connections or Config.EMERGENCY_HTTP_CONNECTIONS
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='emergency-lane')
+        self._lock = threading.Lock()
+        self._queued = {'thread': 0, 'loop': 0}
+        self._active = {'thread': 0, 'loop': 0}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._http: Optional[aiohttp.ClientSession] = None
+        self.engine = None
+
+    def init_app(self, app, db):
+        """Reserve database connections to the app's database"""
+        with app.app_context():
+            url = db.engine.url
+        self.engine = create_engine(
+            url,
+            pool_size=self.db_connections,
+            max_overflow=0,
+            pool_timeout=Config.EMERGENCY_DB_POOL_TIMEOUT_SECONDS
+        )
+
+    @contextmanager
+    def session(self):
+        """ORM session on the reserved connections; commits on success"""
+        if self.engine is None:
+            raise RuntimeError("EmergencyLane.init_app has not been called")
+        session = Session(self.engine, expire_on_commit=False)
+        try:
+            yield session
+            session.commit()
+        except BaseException:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def _track(self, kind: str):
+        """Count the call as queued until it starts, then as active"""
+        queued_at = time.monotonic()
+        with self._lock:
+            self._queued[kind] += 1
+
+        def start():
+            with self._lock:
+                self._queued[kind] -= 1
+                self._active[kind] += 1
+            started = time.monotonic()
+            metrics.observe('emergency_lane.queue_wait_ms', (started - queued_at) * 1000, tags={'kind': kind})
+            return started
+
+        def finish(started: float, outcome: str):
+            with self._lock:
+                self._active[kind] -= 1
+            metrics.observe('emergency_lane.run_ms', (time.monotonic() - started) * 1000, tags={'kind': kind})
+            metrics.increment('emergency_lane.calls', tags={'kind': kind, 'outcome': outcome})
+
+        return start, finish
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """Run a blocking call on the lane's threads"""
+        start, finish = self._track('thread')
+
+        def run():
+            started = start()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                finish(started, 'error')
+                raise
+            finish(started, 'ok')
+            return result
+
+        return self._executor.submit(run)
+
+    def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Blocking call on the lane's threads, waited for by the caller"""
+        return self.submit(func, *args, **kwargs).result()
+
+    async def run_blocking(self, func: Callable, *args, **kwargs) -> Any:
+        """Blocking call on the lane's threads, awaited from any event loop"""
+        return await asyncio.wrap_future(self.submit(func, *args, **kwargs))
+
+    async def run_async(self, coro_fn: Callable[..., Awaitable], *args, **kwargs) -> Any:
+        """Run a coroutine on the lane's own event loop and await its result"""
+        start, finish = self._track('loop')
+
+        async def run():
+            started = start()
+            try:
+                result = await coro_fn(*args, **kwargs)
+            except BaseException:
+                finish(started, 'error')
+                raise
+            finish(started, 'ok')
+            return result
+
+        future = asyncio.run_coroutine_threadsafe(run(), self._get_loop())
+        return await asyncio.wrap_future(future)
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='emergency-lane-loop', daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    @property
+    def http(self) -> aiohttp.ClientSession:
+        """Reserved outbound HTTP session; only usable on the lane's loop"""
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.http_connections),
+                timeout=aiohttp.ClientTimeout(total=Config.SODA_TIMEOUT_SECONDS)
+            )
+        return self._http
+
+    def stats(self) -> Dict[str, Any]:
+        """Saturation of each reserved resource"""
+        with self._lock:
+            queued, active = dict(self._queued), dict(self._active)
+        pool = self.engine.pool if self.engine is not None else None
+        connector = self._http.connector if self._http is not None and not self._http.closed else None
+        return {
+            'workers': {
+                'size': self.workers,
+                'active': active['thread'],
+                'queued': queued['thread'],
+                'utilization': active['thread'] / self.workers
+            },
+            'loop': {'active': active['loop'], 'queued': queued['loop']},
+            'db': {
+                'size': self.db_connections,
+                'checked_out': pool.checkedout() if pool is not None else 0
+            },
+            'http': {
+                'limit': self.http_connections,
+                'in_use': len(connector._acquired) if connector is not None else 0
+            },
+            'model': self._model_waits(),
+            'cache_read_p95_ms': metrics.percentile('emergency.cache_read_ms', 95)
+        }
+
+    def _model_waits(self) -> Dict[str, Any]:
+        """p95 wait of emergency model calls in the scheduler and for a model slot"""
+        slot_waits = metrics.snapshot()['timings'].get('llm.queue_wait_ms', [])
+        return {
+            'scheduler_wait_p95_ms': metrics.percentile('llm.scheduler.wait_ms', 95, tags={'class': 'emergency'}),
+            'slot_wait_p95_ms': {
+                timing['tags']['model']: timing['p95']
+                for timing in slot_waits if timing['tags'].get('class') == 'emergency'
+            }
+        }
+
+
+emergency_lane = EmergencyLane()
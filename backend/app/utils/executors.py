@@ -0,0 +1,46 @@
+# backend/app/utils/executors.py
+
+from typing import Any, Callable, Dict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import threading
+from ..config import Config
+
+# Bounded pools per upstream so one slow dependency cannot starve the others
+POOL_SIZES = {
+    'maps': Config.MAPS_POOL_SIZE,
+    'soda': Config.SODA_POOL_SIZE,
+    'llm': Config.LLM_POOL_SIZE,
+    'notify': Config.NOTIFY_POOL_SIZE,
+    'cache': Config.CACHE_POOL_SIZE,
+}
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_lock = threading.Lock()
+
+
+def get_executor(name: str) -> ThreadPoolExecutor:
+    """Return the process-wide thread pool for an upstream, creating it lazily"""
+    executor = _executors.get(name)
+    if executor is not None:
+        return executor
+
+    with _lock:
+        if name not in _executors:
+            if name not in POOL_SIZES:
+                raise ValueError(f"Unknown executor pool: {name}")
+            _executors[name] = ThreadPoolExecutor(
+                max_workers=POOL_SIZES[name],
+                thread_name_prefix=f"{name}-pool"
+            )
+        return _executors[name]
+
+
+async def run_blocking(pool: str, func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking call on a named pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(pool),
+        functools.partial(func, *args, **kwargs)
+    )
@@ -0,0 +1,75 @@
+# backend/app/utils/incremental_json.py
+
+from typing import Any, Dict, List, Optional, Tuple
+import json
+
+
+class IncrementalJSONParser:
+    """Emit the top-level fields of a streamed JSON object as each one completes
+
+    Text before the opening brace (e.g. a ```json fence) is ignored. A
+    field is complete once the comma or closing brace after its value
+    arrives, so scalar fields like safety_score surface long before the
+    lists that follow them.
+    """
+
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self._buffer = ''
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._field_start: Optional[int] = None
+        self.complete = False
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """Add a chunk; returns the (key, value) pairs it completed"""
+        completed: List[Tuple[str, Any]] = []
+        if self.complete:
+            return completed
+
+        self._buffer += text
+        while self._pos < len(self._buffer) and not self.complete:
+            ch = self._buffer[self._pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif self._depth == 0:
+                # Waiting for the opening brace
+                if ch == '{':
+                    self._depth = 1
+                    self._field_start = self._pos + 1
+            elif ch == '"':
+                self._in_string = True
+            elif ch in '{[':
+                self._depth += 1
+            elif ch in '}]':
+                if self._depth == 1:
+                    self._emit(self._pos, completed)
+                    self.complete = True
+                self._depth -= 1
+            elif ch == ',' and self._depth == 1:
+                self._emit(self._pos, completed)
+                self._field_start = self._pos + 1
+
+            self._pos += 1
+
+        return completed
+
+    def _emit(self, end: int, completed: List[Tuple[str, Any]]):
+        segment = self._buffer[self._field_start:end].strip()
+        if not segment:
+            return
+        try:
+            field = json.loads('{' + segment + '}')
+        except ValueError:
+            return
+        for key, value in field.items():
+            self.fields[key] = value
+            completed.append((key, value))
@@ -0,0 +1,95 @@
+# backend/app/utils/metrics.py
+
+from typing import Any, Dict, Optional, Tuple
+from collections import defaultdict, deque
+import threading
+import numpy as np
+
+TagKey = Tuple[Tuple[str, str], ...]
+
+
+def _tag_key(tags: Optional[Dict[str, Any]]) -> TagKey:
+    return tuple(sorted((k, str(v)) for k, v in (tags or {}).items()))
+
+
+class Timing:
+    """Running count/total/max plus a window of recent samples for percentiles"""
+
+    def __init__(self, window: int = 500):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.samples.append(value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        return float(np.percentile(list(self.samples), q))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'avg': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95)
+        }
+
+
+class MetricsRegistry:
+    """Process-wide in-memory counters and timings, keyed by name and tags"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[TagKey, float]] = defaultdict(lambda: defaultdict(float))
+        self._timings: Dict[str, Dict[TagKey, Timing]] = defaultdict(dict)
+
+    def increment(self, name: str, value: float = 1, tags: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            self._counters[name][_tag_key(tags)] += value
+
+    def observe(self, name: str, value: float, tags: Optional[Dict[str, Any]] = None):
+        key = _tag_key(tags)
+        with self._lock:
+            timing = self._timings[name].get(key)
+            if timing is None:
+                timing = self._timings[name][key] = Timing()
+            timing.observe(value)
+
+    def percentile(self, name: str, q: float, tags: Optional[Dict[str, Any]] = None) -> Optional[float]:
+        with self._lock:
+            timing = self._timings.get(name, {}).get(_tag_key(tags))
+            return timing.percentile(q) if timing else None
+
+    def count(self, name: str, tags: Optional[Dict[str, Any]] = None) -> int:
+        with self._lock:
+            timing = self._timings.get(name, {}).get(_tag_key(tags))
+            return timing.count if timing else 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-friendly view of every metric"""
+        with self._lock:
+            return {
+                'counters': {
+                    name: [{'tags': dict(key), 'value': value} for key, value in series.items()]
+                    for name, series in self._counters.items()
+                },
+                'timings': {
+                    name: [{'tags': dict(key), **timing.to_dict()} for key, timing in series.items()]
+                    for name, series in self._timings.items()
+                }
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,35 @@
+# backend/app/utils/streaming.py
+
+from typing import Any, AsyncIterator, Iterator
+import asyncio
+import json
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Format a Server-Sent Events message"""
+    payload = json.dumps(data, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def iter_async(agen: AsyncIterator) -> Iterator:
+    """Drive an async generator from a synchronous (WSGI) response body"""
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        # Runs on client disconnect too, cancelling any pending work
+        try:
+            loop.run_until_complete(agen.aclose())
+        finally:
+            # Tasks the generator spawned would otherwise be destroyed mid-flight
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            if pending:
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
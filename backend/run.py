@@ -1,4 +1,4 @@
-from app import create_app
+from app import create_app, start_background_workers
 import os
 
 app = create_app()
@@ -6,6 +6,7 @@ app = create_app()
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8000))
     print(f"Starting server on port {port}...")
+    start_background_workers(app)
     app.run(
         host='0.0.0.0',
         port=port,
@@ -226,7 +226,7 @@ export default function HomePage() {
               currentLocation={currentLocation}
               onAlertSent={async (alert: SafetyAlert) => {
                 try {
-                  await aiService.sendEmergencyAlert(
+                  const response = await aiService.sendEmergencyAlert(
                     currentLocation,
                     alert.message,
                   );
@@ -234,6 +234,7 @@ export default function HomePage() {
                     title: "Emergency Alert Sent",
                     description: "Emergency services have been notified.",
                   });
+                  return response;
                 } catch (error) {
                   console.error("Failed to send emergency alert:", error);
                   toast({
@@ -2,7 +2,7 @@
 
 "use client";
 
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import { Card, CardContent } from "@/components/ui/card";
 import { Alert, AlertDescription } from "@/components/ui/alert";
 import { Badge } from "@/components/ui/badge";
@@ -21,6 +21,7 @@ import { VoiceCommand } from "@/components/VoiceCommand";
 import { SafePlacesSearch } from "@/components/SafePlacesSearch";
 import { useJsApiLoader } from "@react-google-maps/api";
 import { useMaps } from "@/contexts/MapsContext";
+import { readEventStream } from "@/lib/utils";
 
 // Update API base URL to match your Flask backend
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
@@ -51,6 +52,14 @@ interface RouteInfo {
   steps: google.maps.DirectionsStep[];
 }
 
+// One candidate from /safety/safe-route/stream; safety_score arrives later
+interface RouteOption {
+  summary: string;
+  distance: string;
+  duration: string;
+  safety_score?: number;
+}
+
 interface RouteResponse {
   status: string;
   data?: {
@@ -122,6 +131,9 @@ export default function SafeRoutePage() {
   const [startLocation, setStartLocation] = useState<Location | null>(null);
   const [locationError, setLocationError] = useState<string | null>(null);
   const { isLoaded, loadError } = useMaps();
+  const [routeOptions, setRouteOptions] = useState<RouteOption[]>([]);
+  const [safestIndex, setSafestIndex] = useState<number | null>(null);
+  const safeRouteAbort = useRef<AbortController | null>(null);
 
   const locationOptions = {
     enableHighAccuracy: true,
@@ -239,65 +251,157 @@ export default function SafeRoutePage() {
     }
   }, [isLoaded]);
 
+  const toSafetyAnalysis = (analysis: any): SafetyAnalysis => ({
+    ...analysis,
+    risks: analysis.primary_concerns || [],
+    safe_spaces: analysis.safe_spots || [],
+    safety_score: analysis.safety_score || 0,
+    risk_level: analysis.risk_level || "unknown",
+    primary_concerns: analysis.primary_concerns || [],
+    recommendations: analysis.recommendations || [],
+    safe_spots: analysis.safe_spots || [],
+    emergency_resources: analysis.emergency_resources || [],
+    confidence_score: analysis.confidence_score || 0,
+  });
+
+  // Streams the analysis: onPartial sees each field (score and risk level
+  // first) as soon as the model has produced it.
   const analyzeSafetyForRoute = async (
     start: Location,
     end: Location,
     routeDetails: RouteInfo,
+    onPartial?: (analysis: SafetyAnalysis) => void,
   ): Promise<SafetyAnalysis | null> => {
     try {
-      const response = await fetch(`${API_BASE_URL}/safety/analyze-route`, {
-        method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-        },
-        body: JSON.stringify({
-          start_location: {
-            lat: start.lat,
-            lng: start.lng,
-            address: start.address,
-          },
-          end_location: {
-            lat: end.lat,
-            lng: end.lng,
-            address: end.address,
+      const response = await fetch(
+        `${API_BASE_URL}/safety/analyze-route/stream`,
+        {
+          method: "POST",
+          headers: {
+            "Content-Type": "application/json",
           },
-          distance: routeDetails.distance,
-          duration: routeDetails.duration,
-          time_of_day: getTimeOfDay(),
-          steps: routeDetails.steps.map((step) => ({
-            instructions: step.instructions,
-            distance: step.distance?.text,
-            duration: step.duration?.text,
-          })),
-        }),
-      });
+          body: JSON.stringify({
+            start_location: {
+              lat: start.lat,
+              lng: start.lng,
+              address: start.address,
+            },
+            end_location: {
+              lat: end.lat,
+              lng: end.lng,
+              address: end.address,
+            },
+            distance: routeDetails.distance,
+            duration: routeDetails.duration,
+            time_of_day: getTimeOfDay(),
+            steps: routeDetails.steps.map((step) => ({
+              instructions: step.instructions,
+              distance: step.distance?.text,
+              duration: step.duration?.text,
+            })),
+          }),
+        },
+      );
 
       if (!response.ok) {
         throw new Error("Failed to analyze route safety");
       }
 
-      const data = await response.json();
-      if (data.status === "success" && data.data?.analysis) {
-        return {
-          ...data.data.analysis,
-          risks: data.data.analysis.primary_concerns || [],
-          safe_spaces: data.data.analysis.safe_spots || [],
-          safety_score: data.data.analysis.safety_score || 0,
-          risk_level: data.data.analysis.risk_level || "unknown",
-          primary_concerns: data.data.analysis.primary_concerns || [],
-          recommendations: data.data.analysis.recommendations || [],
-          safe_spots: data.data.analysis.safe_spots || [],
-          emergency_resources: data.data.analysis.emergency_resources || [],
-          confidence_score: data.data.analysis.confidence_score || 0,
-        };
+      let partial: Record<string, any> = {};
+      let result: SafetyAnalysis | null = null;
+      await readEventStream(response, (event, data) => {
+        if (event === "field") {
+          partial = { ...partial, ...data };
+          onPartial?.(toSafetyAnalysis(partial));
+        } else if (event === "result") {
+          result = toSafetyAnalysis(data);
+        } else if (event === "error") {
+          throw new Error(data.error || "Failed to analyze route");
+        }
+      });
+
+      if (!result) {
+        throw new Error("Route analysis ended without a result");
       }
-      throw new Error(data.error || "Failed to analyze route");
+      return result;
     } catch (err) {
       console.error("Error analyzing route safety:", err);
       return null;
     }
   };
 
+  // Streams the server's candidate routes, each route's safety as it is
+  // scored, the ranking and finally the AI narrative for the safest one.
+  // Resolves to false if the stream failed before ranking the routes.
+  const streamSafeRoute = async (
+    start: Location,
+    end: Location,
+    signal: AbortSignal,
+  ): Promise<boolean> => {
+    const params = new URLSearchParams({
+      start_lat: String(start.lat),
+      start_lng: String(start.lng),
+      end_lat: String(end.lat),
+      end_lng: String(end.lng),
+    });
+    let ranked = false;
+    let routes: RouteOption[] = [];
+    const scored: Record<number, any> = {};
+
+    try {
+      const response = await fetch(
+        `${API_BASE_URL}/safety/safe-route/stream?${params}`,
+        { signal },
+      );
+      if (!response.ok) {
+        throw new Error("Failed to find safe routes");
+      }
+
+      await readEventStream(response, (event, data) => {
+        if (signal.aborted) return;
+        if (event === "routes") {
+          routes = data.routes.map((route: any) => ({
+            summary: route.summary || "Walking route",
+            distance: route.legs?.[0]?.distance?.text || "",
+            duration: route.legs?.[0]?.duration?.text || "",
+          }));
+          setRouteOptions(routes);
+        } else if (event === "route_safety") {
+          scored[data.index] = data.safety;
+          routes = routes.map((route, index) =>
+            index === data.index
+              ? { ...route, safety_score: data.safety.safety_score }
+              : route,
+          );
+          setRouteOptions(routes);
+        } else if (event === "ranking") {
+          ranked = data.safest_index !== null;
+          setSafestIndex(data.safest_index);
+          const safest = scored[data.safest_index];
+          if (safest) {
+            // Local scores stand in until the narrative arrives
+            setSafetyAnalysis(
+              toSafetyAnalysis({
+                ...safest,
+                primary_concerns: safest.risks,
+                safe_spots: safest.safe_spaces,
+              }),
+            );
+          }
+        } else if (event === "narrative") {
+          setSafetyAnalysis(toSafetyAnalysis(data));
+        } else if (event === "error") {
+          throw new Error(data.error || "Failed to find safe routes");
+        }
+      });
+    } catch (err) {
+      if (!signal.aborted) {
+        console.error("Error streaming safe routes:", err);
+      }
+    }
+    return ranked;
+  };
+
   const handleLocationSelect = async (
     location: Omit<Location, "timestamp">,
   ) => {
@@ -311,35 +415,47 @@ export default function SafeRoutePage() {
     setLoading(true);
     setError(null);
     setDestination(locationWithTimestamp);
+    setRouteOptions([]);
+    setSafestIndex(null);
 
-    try {
-      // Wait for a short delay to allow Google Maps to initialize
-      await new Promise((resolve) => setTimeout(resolve, 100));
-
-      if (!routeInfo) {
-        setLoading(false);
-        return;
-      }
+    // A new destination supersedes the previous stream
+    safeRouteAbort.current?.abort();
+    const controller = new AbortController();
+    safeRouteAbort.current = controller;
 
+    try {
       setIsAnalyzing(true);
-      const analysis = await analyzeSafetyForRoute(
-        currentLocation,
+      const ranked = await streamSafeRoute(
+        startLocation || currentLocation,
         locationWithTimestamp,
-        routeInfo,
+        controller.signal,
       );
 
-      if (analysis) {
-        setSafetyAnalysis(analysis);
+      // Fall back to analyzing the route the map drew
+      if (!ranked && !controller.signal.aborted && routeInfo) {
+        const analysis = await analyzeSafetyForRoute(
+          startLocation || currentLocation,
+          locationWithTimestamp,
+          routeInfo,
+          setSafetyAnalysis,
+        );
+        if (analysis) {
+          setSafetyAnalysis(analysis);
+        }
       }
     } catch (err) {
       console.error("🔴 Route analysis error:", err);
       setError(err instanceof Error ? err.message : "Failed to analyze route");
     } finally {
-      setLoading(false);
-      setIsAnalyzing(false);
+      if (safeRouteAbort.current === controller) {
+        setLoading(false);
+        setIsAnalyzing(false);
+      }
     }
   };
 
+  useEffect(() => () => safeRouteAbort.current?.abort(), []);
+
   const handleRouteCalculated = async (route: google.maps.DirectionsResult) => {
     if (!route.routes?.[0]?.legs?.[0]) {
       setError("Could not calculate route");
@@ -357,12 +473,13 @@ export default function SafeRoutePage() {
     if (JSON.stringify(newRouteInfo) !== JSON.stringify(routeInfo)) {
       setRouteInfo(newRouteInfo);
 
-      // Only trigger safety analysis if we have a destination
-      if (destination && !isAnalyzing) {
+      // Only analyze the drawn route if the safe-route stream has not ranked one
+      if (destination && !isAnalyzing && safestIndex === null) {
         const analysis = await analyzeSafetyForRoute(
           currentLocation!,
           destination,
           newRouteInfo,
+          setSafetyAnalysis,
         );
         if (analysis) {
           setSafetyAnalysis(analysis);
@@ -503,6 +620,38 @@ export default function SafeRoutePage() {
       {/* Contextual Safety */}
       {destination && <ContextualSafety location={destination} />}
 
+      {/* Route Options */}
+      {routeOptions.length > 0 && (
+        <Card className="shadow-lg">
+          <CardContent className="pt-6 space-y-2">
+            <h2 className="text-lg font-semibold">Route options</h2>
+            {routeOptions.map((option, index) => (
+              <div
+                key={index}
+                className="flex items-center justify-between text-sm"
+              >
+                <span>
+                  {option.summary} · {option.distance} · {option.duration}
+                </span>
+                <span className="flex items-center gap-2">
+                  {option.safety_score === undefined ? (
+                    <Loader2 className="h-4 w-4 animate-spin" />
+                  ) : (
+                    <span>Safety {Math.round(option.safety_score)}</span>
+                  )}
+                  {index === safestIndex && (
+                    <Badge>
+                      <Shield className="h-3 w-3 mr-1" />
+                      Safest
+                    </Badge>
+                  )}
+                </span>
+              </div>
+            ))}
+          </CardContent>
+        </Card>
+      )}
+
       {/* Main Content */}
       <Tabs defaultValue="map" className="space-y-4">
         <TabsList className="grid w-full grid-cols-3 lg:w-[400px]">
@@ -44,6 +44,15 @@ const getFallbackAnalysis = (): SafetyContext => ({
   safe_spaces: ["Police station", "Hospital"],
 });
 
+const toSafetyContext = (data: any): SafetyContext => ({
+  safety_score: data.area_safety_score ?? 50,
+  risk_level: data.risk_level || "unknown",
+  primary_concerns: data.primary_concerns || [],
+  recommendations: data.recommendations || [],
+  safe_spots: data.safe_spots || [],
+  safe_spaces: data.safe_spaces || [],
+});
+
 export function ContextualSafety({ location }: ContextualSafetyProps) {
   const [context, setContext] = useState<SafetyContext | null>(null);
   const [error, setError] = useState<string | null>(null);
@@ -85,14 +94,11 @@ export function ContextualSafety({ location }: ContextualSafetyProps) {
         const responseData = await response.json();
 
         if (responseData.status === "success" && responseData.data) {
-          setContext({
-            safety_score: responseData.data.area_safety_score ?? 50,
-            risk_level: responseData.data.risk_level || "unknown",
-            primary_concerns: responseData.data.primary_concerns || [],
-            recommendations: responseData.data.recommendations || [],
-            safe_spots: responseData.data.safe_spots || [],
-            safe_spaces: responseData.data.safe_spaces || [],
-          });
+          setContext(toSafetyContext(responseData.data));
+          if (responseData.data.source === "local") {
+            // Instant local score; the model's analysis follows
+            pollEnrichedAnalysis();
+          }
         } else {
           setContext(getFallbackAnalysis());
         }
@@ -104,8 +110,30 @@ export function ContextualSafety({ location }: ContextualSafetyProps) {
       }
     };
 
+    const pollEnrichedAnalysis = async () => {
+      try {
+        const response = await fetch(
+          `${API_BASE_URL}/safety/analyze-area/enriched?lat=${location.lat}&lng=${location.lng}&wait=15`,
+          { credentials: "include" },
+        );
+        if (response.status !== 200 || cancelled) return;
+
+        const responseData = await response.json();
+        if (responseData.status === "success" && responseData.data) {
+          setContext(toSafetyContext(responseData.data));
+        }
+      } catch (error) {
+        // Keep showing the local analysis
+        console.warn("Enriched analysis unavailable:", error);
+      }
+    };
+
+    let cancelled = false;
     const timeoutId = setTimeout(fetchContextData, 500);
-    return () => clearTimeout(timeoutId);
+    return () => {
+      cancelled = true;
+      clearTimeout(timeoutId);
+    };
   }, [location]);
 
   if (loading) {
@@ -28,10 +28,12 @@ import {
   Circle,
 } from "lucide-react";
 import type { Location, SafetyAlert } from "@/types/index";
+import { aiService, type SOSGuidance } from "@/lib/ai.service";
 
 interface EmergencyAlertProps {
   currentLocation: Location;
-  onAlertSent: (alert: SafetyAlert) => void; // Changed from onEmergencyTriggered
+  // Resolves to the SOS response when the alert went to the backend
+  onAlertSent: (alert: SafetyAlert) => void | Promise<SOSGuidance | void>; // Changed from onEmergencyTriggered
 }
 
 export function EmergencyAlert({
@@ -62,6 +64,42 @@ export function EmergencyAlert({
   const [isOnline, setIsOnline] = useState(navigator.onLine);
   const [shakeDetected, setShakeDetected] = useState(false);
 
+  // Guidance from the SOS response, replaced by the personalized guidance once ready
+  const [guidance, setGuidance] = useState<SOSGuidance | null>(null);
+
+  // Poll for the personalized guidance while it is being generated
+  useEffect(() => {
+    const guidanceId = guidance?.guidance_id;
+    if (!guidanceId || guidance?.guidance_status !== "pending") return;
+
+    const controller = new AbortController();
+    const pollGuidance = async () => {
+      try {
+        const update = await aiService.getEmergencyGuidance(
+          guidanceId,
+          controller.signal,
+        );
+        if (!update || cancelled) return;
+        if (update.guidance_status === "pending") {
+          // Each poll waits server-side, so go straight back
+          pollGuidance();
+          return;
+        }
+        setGuidance((current) => current && { ...current, ...update });
+      } catch (error) {
+        // Keep showing the guidance from the SOS response
+        if (!cancelled) console.warn("Personalized guidance unavailable:", error);
+      }
+    };
+
+    let cancelled = false;
+    pollGuidance();
+    return () => {
+      cancelled = true;
+      controller.abort();
+    };
+  }, [guidance?.guidance_id, guidance?.guidance_status]);
+
   // Monitor network status
   useEffect(() => {
     const handleOnline = () => setIsOnline(true);
@@ -284,7 +322,10 @@ export function EmergencyAlert({
       console.error("Audio playback error:", error);
     }
 
-    onAlertSent(alert);
+    const response = await onAlertSent(alert);
+    if (response) {
+      setGuidance(response);
+    }
 
     // Reset states but keep recording if started
     setIsOpen(false);
@@ -358,6 +399,29 @@ export function EmergencyAlert({
   return (
     <div className="fixed bottom-6 right-6">
       <ShakeProgress />
+      {guidance && guidance.guidance.length > 0 && (
+        <div className="absolute bottom-20 right-0 w-80 bg-background border rounded-lg p-4 shadow-lg">
+          <div className="flex items-center justify-between mb-2">
+            <span className="font-semibold flex items-center gap-2">
+              <Shield className="h-4 w-4" />
+              Safety guidance
+            </span>
+            <Button variant="ghost" size="sm" onClick={() => setGuidance(null)}>
+              Dismiss
+            </Button>
+          </div>
+          <ol className="list-decimal ml-5 space-y-1 text-sm">
+            {guidance.guidance.map((step, i) => (
+              <li key={i}>{step}</li>
+            ))}
+          </ol>
+          {guidance.guidance_status === "pending" && (
+            <p className="text-xs text-muted-foreground mt-2">
+              Personalized guidance on the way...
+            </p>
+          )}
+        </div>
+      )}
       <Dialog
         open={isOpen}
         onOpenChange={(open) => {
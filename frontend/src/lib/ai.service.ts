@@ -76,6 +76,16 @@ interface EmergencyResource {
   };
 }
 
+export interface SOSGuidance {
+  guidance: string[];
+  immediate_actions: string[];
+  emergency_contacts: string[];
+  source: "local" | "cache" | "model" | "fallback";
+  // Set while the personalized guidance is still being generated
+  guidance_id: string | null;
+  guidance_status: "pending" | "ready" | "unavailable";
+}
+
 export type EmergencyResources = {
   police: EmergencyResource[];
   hospitals: EmergencyResource[];
@@ -165,7 +175,7 @@ export class AIService {
     }
   }
 
-  async sendEmergencyAlert(location: Location, message: string): Promise<void> {
+  async sendEmergencyAlert(location: Location, message: string): Promise<SOSGuidance> {
     const response = await fetch(`${this.apiUrl}/safety/emergency-alert`, {
       method: "POST",
       headers: {
@@ -185,6 +195,27 @@ export class AIService {
       const errorData = await response.json();
       throw new Error(errorData.error || "Failed to send emergency alert");
     }
+
+    return response.json();
+  }
+
+  // Long-polls the personalized guidance that follows an SOS answered from local data
+  async getEmergencyGuidance(
+    guidanceId: string,
+    signal?: AbortSignal,
+  ): Promise<Partial<SOSGuidance> | null> {
+    const response = await fetch(
+      `${this.apiUrl}/safety/emergency-guidance/${guidanceId}?wait=15`,
+      { credentials: "include", signal },
+    );
+    if (response.status === 202) {
+      return { guidance_status: "pending" };
+    }
+    if (!response.ok) {
+      // Unknown or expired id: keep the guidance already shown
+      return null;
+    }
+    return response.json();
   }
 
   async startRouteMonitoring(